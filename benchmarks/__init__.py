@@ -0,0 +1 @@
+# Package with benchmarks (run them as modules, e.g. `python -m benchmarks.bench_parsers`).
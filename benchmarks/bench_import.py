@@ -0,0 +1,84 @@
+# Benchmark of the CLI start-up.
+# Every command runs in a fresh interpreter (articles are read from
+# `tests/sample_data`, so there is no network) with `-X importtime`;
+# the time spent importing modules, the whole run and the heavy
+# dependencies which got loaded are reported.
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.common import repo_root, sample_data
+
+HEAVY_MODULES = ("requests", "lxml", "bs4", "numpy", "pandas",
+                 "matplotlib", "wordfreq", "http.server")
+
+# Pages are read from a local file instead of the web
+LOCAL_PAGE = f"""
+from wiki_scraper.scraper import Scraper
+Scraper.scrape = lambda self: Scraper(
+    self.phrase, base_url={str(sample_data / "team_rocket.html")!r},
+    use_local_file=True
+).scrape_from_file()
+"""
+
+COMMANDS = {
+    "import": ("import wiki_scraper", None),
+    "parse args": ("from wiki_scraper.cli import get_args\n"
+                   "get_args(['wiki_scraper.py', '--summary', 'x'])", None),
+    "summary": (LOCAL_PAGE, ["--summary", "Team Rocket", "--no-cache"]),
+    "table": (LOCAL_PAGE, ["--table", "Team Rocket", "--number", "1",
+                           "--no-cache"]),
+    "analyze": ("", ["--analyze-relative-word-frequency", "--mode",
+                     "article", "--count", "10"]),
+}
+
+
+def probe_code(setup: str, argv) -> str:
+    code = setup + "\n"
+    if argv is not None:
+        code += ("from wiki_scraper.main import main\n"
+                 f"main(['wiki_scraper.py'] + {argv!r})\n")
+    # the last line of the output lists the heavy modules loaded
+    code += ("import sys\n"
+             f"print('loaded:' + ','.join(m for m in {HEAVY_MODULES!r} "
+             f"if m in sys.modules))\n")
+    return code
+
+
+def run_probe(setup: str, argv, cwd) -> tuple[float, float, list[str]]:
+    # Returns (import seconds, wall seconds, heavy modules)
+    env = dict(os.environ, PYTHONPATH=str(repo_root))
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe_code(setup, argv)],
+        cwd=cwd, env=env, capture_output=True, text=True, check=True
+    )
+    wall = time.perf_counter() - start
+
+    imports = 0
+    for line in result.stderr.splitlines():
+        # top-level imports only (nested ones are in their cumulative time)
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if not name.startswith("  ") and cumulative.strip().isdigit():
+                imports += int(cumulative)
+    last_line = result.stdout.strip().splitlines()[-1]
+    modules = last_line.removeprefix("loaded:").split(",")
+    return imports / 1e6, wall, [m for m in modules if m]
+
+
+def main(repeat: int = 3):
+    print(f"CLI start-up (best of {repeat}, fresh interpreter each):")
+    with tempfile.TemporaryDirectory() as cwd:
+        for name, (setup, argv) in COMMANDS.items():
+            runs = [run_probe(setup, argv, cwd) for _ in range(repeat)]
+            imports = min(run[0] for run in runs)
+            wall = min(run[1] for run in runs)
+            modules = ", ".join(runs[-1][2]) or "-"
+            print(f"  {name:10} imports {imports * 1000:7.1f} ms"
+                  f"   run {wall * 1000:7.1f} ms   loads: {modules}")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,35 @@
+# Benchmark of lazy parsing in `Article`.
+# Compares `--summary` and `--table` work done through early-stopping
+# scans with the same work done on the full, clean tree.
+import sys
+from benchmarks.common import best_time, scaled_page
+from wiki_scraper.article import Article
+
+
+def summary(html: str, eager: bool):
+    article = Article(html, "Bench")
+    if eager:
+        article.container
+    article.get_first_paragraph()
+
+
+def table(html: str, eager: bool):
+    article = Article(html, "Bench")
+    if eager:
+        article.container
+    article.get_table_by_index(2)
+
+
+def main(copies: int = 100):
+    html = scaled_page(copies)
+    print(f"scaled page (x{copies}), {len(html) // 1024} KiB:")
+
+    for name, func in [("summary", summary), ("table", table)]:
+        eager = best_time(lambda: func(html, eager=True))
+        lazy = best_time(lambda: func(html, eager=False))
+        print(f"  {name:8} full tree {eager * 1000:8.2f} ms"
+              f"   lazy {lazy * 1000:8.2f} ms   x{eager / lazy:.1f}")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:2]))
@@ -0,0 +1,39 @@
+# Benchmark of `Article` parsing backends.
+# Compares every backend from `wiki_scraper.parsers.PARSERS`
+# on the sample pages and on a scaled-up synthetic article.
+import sys
+from benchmarks.common import best_time, sample_pages, scaled_page
+from wiki_scraper.article import Article
+from wiki_scraper.parsers import PARSERS
+
+BASELINE = "html.parser"
+
+
+def workloads(copies: int) -> dict[str, list[str]]:
+    return {
+        "sample pages": list(sample_pages().values()),
+        f"scaled page (x{copies})": [scaled_page(copies)],
+    }
+
+
+def full_use(html: str, parser: str):
+    article = Article(html, "Bench", parser=parser)
+    article.get_first_paragraph()
+    article.count_words()
+    article.get_wiki_links()
+
+
+def main(copies: int = 100):
+    for name, pages in workloads(copies).items():
+        print(f"\n{name}:")
+        baseline = None
+
+        for parser in [BASELINE] + [p for p in PARSERS if p != BASELINE]:
+            seconds = best_time(lambda: [full_use(h, parser) for h in pages])
+            baseline = baseline or seconds
+            print(f"  {parser:12} {seconds * 1000:9.2f} ms"
+                  f"   x{baseline / seconds:.1f}")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:2]))
@@ -0,0 +1,55 @@
+# Benchmark of the crawl pipeline on a local mirror.
+# A local server serves a chain of big synthetic articles; the same
+# crawl is run with parsing in the fetching threads and in a pool
+# of 1, 2, ... processes (up to the number of cores).
+import os
+import sys
+import time
+from benchmarks.common import CONTAINER_OPEN, scaled_page
+from tests.local_server import LocalWikiServer
+from wiki_scraper.crawler import async_auto_count_words
+from wiki_scraper.utils import WordCountStore
+
+
+def mirror_pages(pages: int, copies: int) -> dict[str, bytes]:
+    # Every page links to the next few ones (and to no other article)
+    html = scaled_page(copies).replace('href="/wiki/', 'href="/elsewhere/')
+    mirror = {}
+    for i in range(pages):
+        links = "".join(f'<a href="/wiki/Page_{j}">Page {j}</a> '
+                        for j in range(i + 1, min(pages, i + 4)))
+        mirror[f"Page_{i}"] = html.replace(
+            CONTAINER_OPEN, CONTAINER_OPEN + "<p>" + links + "</p>", 1
+        ).encode("utf-8")
+    return mirror
+
+
+def crawl(server, pages: int, parse_workers: int, store_path) -> float:
+    start = time.perf_counter()
+    with WordCountStore(store_path) as store:
+        async_auto_count_words("Page 0", depth=pages, wait=0,
+                               concurrency=8, parse_workers=parse_workers,
+                               base_url=server.base_url, store=store)
+    return time.perf_counter() - start
+
+
+def main(pages: int = 40, copies: int = 10):
+    import tempfile
+
+    cores = os.cpu_count() or 1
+    mirror = mirror_pages(pages, copies)
+    size = len(next(iter(mirror.values()))) // 1024
+    print(f"{pages} pages of {size} KiB, {cores} core(s):")
+
+    with LocalWikiServer(mirror) as server, \
+            tempfile.TemporaryDirectory() as tmp:
+        for workers in [0] + [2 ** i for i in range(cores.bit_length())]:
+            seconds = crawl(server, pages, workers,
+                            os.path.join(tmp, f"counts-{workers}.json"))
+            label = "threads" if workers == 0 else f"{workers} process(es)"
+            print(f"  {label:14} {seconds:7.2f} s"
+                  f"   {pages / seconds:7.1f} pages/s")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:3]))
@@ -0,0 +1,216 @@
+# Micro-benchmark suite of the parsing and counting hot paths.
+# Every case (full `Article` parse, `get_wiki_links`,
+# `get_first_paragraph`, `get_table_by_index`, `count_words`,
+# `update_word_counts`, `get_relative_freq_table`) is timed on all pages of
+# `tests/sample_data` together and on scaled-up synthetic pages.
+# The median of many runs of every case is compared with the baseline
+# (`benchmarks/baseline.json`): a case slower than its baseline by more
+# than the tolerance (and by more than timer noise) is flagged and
+# the run exits with status 1.
+#   python -m benchmarks.bench_suite [--only TEXT] [--tolerance 0.3]
+#   python -m benchmarks.bench_suite --save   (stores a new baseline)
+# Timings depend on the machine, so a baseline is worth comparing
+# only with runs on the machine (and Python) it was saved on.
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+from benchmarks.common import median_time, sample_pages, scaled_page
+from wiki_scraper.article import Article
+from wiki_scraper.utils import (WordCountStore, get_relative_freq_table,
+                                update_word_counts)
+
+baseline_path = Path(__file__).resolve().parent / "baseline.json"
+
+# Scaled pages, by the number of copies of the sample contents
+SCALES = (10, 50)
+
+# Slowdowns below that many seconds are noise (of the timer, and
+# of other processes on a busy machine)
+NOISE = 0.0005
+
+# Quick cases are called many times in a row, for about that long
+MIN_RUN = 0.05
+
+
+def page_sets() -> dict[str, list[str]]:
+    pages = {"sample": list(sample_pages().values())}
+    for copies in SCALES:
+        pages[f"scaled-x{copies}"] = [scaled_page(copies)]
+    return pages
+
+
+def article_cases(name: str, pages: list[str]) -> dict:
+    # Every call starts from a new `Article`, as every command does.
+    # Parsing is lazy, so `container` is asked for to time the full
+    # parse (what every crawled page goes through for its links).
+    def parse():
+        for html in pages:
+            Article(html, "Bench").container
+
+    def wiki_links():
+        for html in pages:
+            Article(html, "Bench").get_wiki_links()
+
+    def first_paragraph():
+        for html in pages:
+            Article(html, "Bench").get_first_paragraph()
+
+    def table():
+        for html in pages:
+            Article(html, "Bench").get_table_by_index(1)
+
+    def count_words():
+        for html in pages:
+            Article(html, "Bench").count_words()
+
+    return {
+        f"article.parse[{name}]": parse,
+        f"article.wiki_links[{name}]": wiki_links,
+        f"article.first_paragraph[{name}]": first_paragraph,
+        f"article.table_by_index[{name}]": table,
+        f"article.count_words[{name}]": count_words,
+    }
+
+
+def store_cases(name: str, pages: list[str], directory: Path) -> dict:
+    counts = [Article(html, "Bench").count_words() for html in pages]
+
+    # every update is appended to the log (as a crawl's batches are)
+    updated = WordCountStore(directory / f"updated-{name}.json",
+                             flush_every=1)
+
+    def update():
+        for page_counts in counts:
+            update_word_counts(page_counts, store=updated)
+
+    # totals of the pages, compacted into the JSON file and its snapshot
+    analyzed = WordCountStore(directory / f"analyzed-{name}.json")
+    for page_counts in counts:
+        analyzed.add(page_counts)
+    analyzed.compact()
+    # the table of wordfreq frequencies is loaded once per process
+    get_relative_freq_table(mode="article", n=1, store=analyzed)
+
+    return {
+        f"utils.update_word_counts[{name}]": update,
+        f"utils.relative_freq_article[{name}]":
+            lambda: get_relative_freq_table(mode="article", n=100,
+                                            store=analyzed),
+        f"utils.relative_freq_language[{name}]":
+            lambda: get_relative_freq_table(mode="language", n=100,
+                                            store=analyzed),
+    }, (updated, analyzed)
+
+
+def run_suite(only: str = "", repeat: int = 15) -> dict[str, float]:
+    # Median time (seconds) of every case whose name contains `only`
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        stores = []
+        try:
+            for name, pages in page_sets().items():
+                cases = article_cases(name, pages)
+                more_cases, more_stores = store_cases(name, pages,
+                                                      Path(directory))
+                cases.update(more_cases)
+                stores.extend(more_stores)
+
+                for case, func in cases.items():
+                    if only in case:
+                        results[case] = median_time(
+                            func, repeat=repeat, number=calls_per_run(func)
+                        )
+                        print(f"  {case:45} {results[case] * 1000:10.3f} ms",
+                              flush=True)
+        finally:
+            for store in stores:
+                store.close()
+    return results
+
+
+def calls_per_run(func) -> int:
+    # Number of calls which take about `MIN_RUN` seconds
+    # (the first call also warms up caches)
+    start = time.perf_counter()
+    func()
+    once = time.perf_counter() - start
+    return max(1, min(1000, int(MIN_RUN / max(once, 1e-6))))
+
+
+def compare(results: dict[str, float], baseline: dict[str, float],
+            tolerance: float) -> list[str]:
+    # Cases slower than the baseline by more than `tolerance`
+    # (a fraction) and by more than `NOISE`, with a line for each
+    regressions = []
+    for case, seconds in results.items():
+        base = baseline.get(case)
+        if base is None or base <= 0:
+            continue
+        if seconds > base * (1 + tolerance) and seconds - base > NOISE:
+            regressions.append(
+                f"  {case:45} {base * 1000:10.3f} ms -> "
+                f"{seconds * 1000:10.3f} ms  (x{seconds / base:.2f})"
+            )
+    return regressions
+
+
+def machine() -> dict[str, str]:
+    return {"python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmark suite.")
+    parser.add_argument("--save", action="store_true",
+                        help="Store the results as the new baseline.")
+    parser.add_argument("--baseline", type=Path, default=baseline_path,
+                        help="Path of the baseline (JSON).")
+    parser.add_argument("--tolerance", type=float, default=0.3,
+                        help="Allowed slowdown, as a fraction.")
+    parser.add_argument("--repeat", type=int, default=15,
+                        help="Runs of every case (the median counts).")
+    parser.add_argument("--only", type=str, default="",
+                        help="Run only cases whose names contain it.")
+    args = parser.parse_args(argv)
+
+    print(f"benchmark suite (median of {args.repeat}):")
+    results = run_suite(only=args.only, repeat=args.repeat)
+
+    if args.save:
+        saved = {}
+        if args.baseline.exists():
+            # with `--only`, other cases keep their baseline
+            saved = json.loads(args.baseline.read_text("utf-8"))["results"]
+        saved.update(results)
+        args.baseline.write_text(json.dumps(
+            {"machine": machine(), "results": saved}, indent=2
+        ) + "\n", encoding="utf-8")
+        print(f"baseline saved to {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"no baseline at {args.baseline} (save one with --save)")
+        return 0
+    baseline = json.loads(args.baseline.read_text("utf-8"))
+    if baseline.get("machine") != machine():
+        print("note: the baseline comes from another machine or Python: "
+              f"{baseline.get('machine')}")
+
+    regressions = compare(results, baseline["results"], args.tolerance)
+    if regressions:
+        print(f"slower than the baseline by more than "
+              f"{args.tolerance:.0%}:")
+        print("\n".join(regressions))
+        return 1
+    print(f"no case slower than the baseline by more than "
+          f"{args.tolerance:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
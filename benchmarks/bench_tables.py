@@ -0,0 +1,93 @@
+# Benchmark of table extraction.
+# Compares the engine of `wiki_scraper.tables` (one walk, DataFrames
+# built from the parsed cells) with the former way: the n-th table
+# scanned for anew on every call, serialized and parsed again
+# by `read_html`.
+# Results of both are checked to be equal.
+# Value counts of `--table` are compared with those of the flattened
+# table on synthetic stat tables of growing size.
+import sys
+from io import StringIO
+from pandas import Series
+from benchmarks.common import best_time, sample_data, scaled_page
+from wiki_scraper.article import Article
+from wiki_scraper.parsers import get_parser
+from wiki_scraper.tables import table_to_frame, value_counts
+
+
+def read_html_table(html: str, index: int):
+    # The former `get_table_by_index`: the table found by a scan,
+    # serialized and parsed again by `read_html`
+    from pandas import read_html
+
+    parser = get_parser()
+    table = parser.scan_tables(html, [index])[index]
+    return read_html(StringIO(parser.table_html(table)))[0]
+
+
+def read_html_tables(html: str) -> list:
+    parser = get_parser()
+    count = len(parser.tables(parser.parse(html)))
+    return [read_html_table(html, index) for index in range(1, count + 1)]
+
+
+def engine_tables(html: str) -> list:
+    return list(Article(html, "Bench").get_tables().values())
+
+
+def same_frames(left: list, right: list) -> bool:
+    return len(left) == len(right) and all(
+        a.equals(b) and list(a.columns) == list(b.columns)
+        for a, b in zip(left, right)
+    )
+
+
+def stat_table(rows: int):
+    # A table of Pokémon stats and types, built like extracted ones
+    types = ("Normal", "Fire", "Water", "Grass", "Electric", "Rock", "Bug")
+    header = ["#", "Type 1", "Type 2", "HP", "Attack", "Speed"]
+    body = [[str(i % 1025 + 1), types[i % 7], types[i * 3 % 5],
+             str(i * 7 % 255 + 1), str(i * 11 % 190 + 5),
+             str(i * 13 % 180 + 5)] for i in range(rows)]
+    return table_to_frame(([header], body, []))
+
+
+def main(copies: int = 20):
+    pages = {path.name: path.read_text(encoding="utf-8")
+             for path in sorted(sample_data.glob("table_*.html"))}
+    pages[f"scaled (x{copies})"] = scaled_page(copies)
+
+    print("all tables of a page (read_html path vs. engine):")
+    for name, html in pages.items():
+        old = best_time(lambda: read_html_tables(html))
+        new = best_time(lambda: engine_tables(html))
+        count = len(engine_tables(html))
+        same = same_frames(read_html_tables(html), engine_tables(html))
+        print(f"  {name:22} {count:4} tables  read_html {old * 1000:9.2f} ms"
+              f"  engine {new * 1000:8.2f} ms  x{old / new:5.1f}"
+              f"  {'same' if same else 'DIFFERENT'}")
+
+    print("the last table of a page (`--table`):")
+    for name, html in pages.items():
+        count = len(engine_tables(html))
+        if count == 0:
+            continue
+        old = best_time(lambda: read_html_table(html, count))
+        new = best_time(lambda: Article(html, "Bench")
+                        .get_table_by_index(count))
+        print(f"  {name:22} read_html {old * 1000:9.2f} ms"
+              f"  engine {new * 1000:8.2f} ms  x{old / new:5.1f}")
+
+    print("value counts (flattened table vs. per column):")
+    for rows in (100, 10_000, 100_000):
+        df = stat_table(rows)
+        old = best_time(lambda: Series(df.values.ravel()).value_counts())
+        new = best_time(lambda: value_counts(df))
+        same = Series(df.values.ravel()).value_counts().equals(
+            value_counts(df))
+        print(f"  {df.size:9} cells  flattened {old * 1000:9.2f} ms"
+              f"  per column {new * 1000:8.2f} ms  x{old / new:5.1f}"
+              f"  {'same' if same else 'DIFFERENT'}")
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,53 @@
+# Helpers shared by benchmarks: sample pages and timing.
+import statistics
+import time
+from pathlib import Path
+
+repo_root = Path(__file__).resolve().parent.parent
+sample_data = repo_root / "tests" / "sample_data"
+
+CONTAINER_OPEN = '<div class="mw-content-ltr mw-parser-output">'
+
+
+def sample_pages() -> dict[str, str]:
+    return {path.name: path.read_text(encoding="utf-8")
+            for path in sorted(sample_data.glob("*.html"))}
+
+
+def scaled_page(copies: int) -> str:
+    # Synthetic "big article": contents of all sample containers
+    # repeated `copies` times inside one container.
+    bodies = []
+    for html in sample_pages().values():
+        start = html.find(CONTAINER_OPEN)
+        if start != -1:
+            end = html.rfind("</div>")
+            bodies.append(html[start + len(CONTAINER_OPEN):end])
+
+    return ("<!doctype html><html><head><title>Scaled</title></head><body>"
+            "<div id='global-nav'><a href='/home'>Home</a></div>"
+            + CONTAINER_OPEN + "".join(bodies) * copies
+            + "</div></body></html>")
+
+
+def best_time(func, repeat: int = 5, number: int = 1) -> float:
+    # Best of `repeat` runs, each calling `func` `number` times (seconds)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def median_time(func, repeat: int = 5, number: int = 1) -> float:
+    # Median of `repeat` runs, each calling `func` `number` times
+    # (seconds); unlike the best run, one lucky run doesn't move it
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        times.append((time.perf_counter() - start) / number)
+    return statistics.median(times)
@@ -1,4 +1,5 @@
 from wiki_scraper.scraper import Scraper
+from wiki_scraper.cache import PageCache
 from json import dump, load
 from pathlib import Path
 
@@ -21,7 +22,9 @@ def update_dict_in_file(d: dict, path: str):
         with open(path, "r", encoding="utf-8") as f:
             data = load(f)
 
-    data.update(d)
+    # counts of several articles are added up
+    for word, count in d.items():
+        data[word] = data.get(word, 0) + count
     with open(path, "w", encoding="utf-8") as f:
         dump(data, f, ensure_ascii=False, indent=4)
 
@@ -35,8 +38,11 @@ def main():
     if Path(path_low_conf_score).exists():
         remove(path_low_conf_score)
 
+    # Repeated runs take the articles from the on-disk page cache
+    cache = PageCache()
+
     for phrase in phrase_big_article:
-        scraper1 = Scraper(phrase=phrase)
+        scraper1 = Scraper(phrase=phrase, cache=cache)
         article1 = scraper1.scrape()
         wiki_big_article_wc = article1.count_words()
         update_dict_in_file(
@@ -44,13 +50,14 @@ def main():
             path=path_big_article
         )
 
-    scraper2 = Scraper(phrase=phrase_low_conf_score)
+    scraper2 = Scraper(phrase=phrase_low_conf_score, cache=cache)
     article2 = scraper2.scrape()
     low_conf_score_article_wc = article2.count_words()
     update_dict_in_file(
         d=low_conf_score_article_wc,
         path=path_low_conf_score
     )
+    cache.close()
 
     print("Successfully wrote word count dictionaries to files!")
 
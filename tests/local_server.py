@@ -0,0 +1,162 @@
+# tests/local_server.py
+# Local HTTP server serving files from `tests/sample_data`
+# under wiki-like URLs (`/wiki/<Phrase>`), so that
+# web scraping and crawling can be tested without network.
+# It also answers `action=parse` requests to `/w/api.php`,
+# like the MediaWiki API does.
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import lxml.html
+from wiki_scraper.parsers import _is_container
+
+sample_data = Path(__file__).resolve().parent / "sample_data"
+
+# Small link graph built from the sample pages:
+# Villainous_team -> Team_* -> (Team_Rocket ->) Pikachu, Jessie, ...
+sample_pages = {
+    "Villainous_team": "villainous_team.html",
+    "Team_Rocket": "team_rocket.html",
+    "Team_Aqua": "table_simple_0.html",
+    "Team_Magma": "table_simple_1.html",
+    "Team_Galactic": "table_mid_0.html",
+    "Pikachu": "simple_article_1.html",
+    "Jessie": "simple_article_2.html",
+    "James": "simple_article_3.html",
+    "Meowth": "table_simple_2.html",
+}
+
+
+class LocalWikiServer:
+    def __init__(self, pages=None, redirects=None):
+        # `redirects` maps names to names of pages; like on a wiki,
+        # a redirect's URL serves the page it points to.
+        self.pages = sample_pages if pages is None else pages
+        self.redirects = {} if redirects is None else redirects
+        self.requested = []
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # keep-alive, so that connection reuse can be observed
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                server.requested.append(self.path)
+                if self.path.startswith("/w/api.php?"):
+                    self.send_api_answer()
+                    return
+
+                name = server.resolve(
+                    unquote(self.path).removeprefix("/wiki/")
+                )
+                if name not in server.pages:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                self.send_body(server.read_page(name), "text/html")
+
+            def send_api_answer(self):
+                # `action=parse` of MediaWiki: the container's content,
+                # `action=query`: normalized titles and redirects
+                query = parse_qs(urlsplit(self.path).query)
+                name = server.resolve(
+                    query.get("page", [""])[0].replace(" ", "_")
+                )
+
+                if query.get("action") == ["query"]:
+                    answer = server.query_titles(
+                        query.get("titles", [""])[0].split("|")
+                    )
+                elif query.get("action") != ["parse"]:
+                    answer = {"error": {"code": "badvalue",
+                                        "info": "Unsupported action."}}
+                elif name not in server.pages:
+                    answer = {"error": {"code": "missingtitle",
+                                        "info": "The page doesn't exist."}}
+                else:
+                    answer = {"parse": {
+                        "title": name.replace("_", " "),
+                        "text": container_content(server.read_page(name)),
+                    }}
+                self.send_body(json.dumps(answer).encode("utf-8"),
+                               "application/json")
+
+            def send_body(self, body: bytes, content_type: str):
+                self.send_response(200)
+                self.send_header("Content-Type",
+                                 content_type + "; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, daemon=True
+        )
+
+    def resolve(self, name: str) -> str:
+        return self.redirects.get(name, name)
+
+    def query_titles(self, titles: list[str]) -> dict:
+        normalized, redirects, pages = [], [], []
+        for title in titles:
+            name = title.replace(" ", "_")
+            name = name[:1].upper() + name[1:]
+            if name.replace("_", " ") != title:
+                normalized.append({"from": title,
+                                   "to": name.replace("_", " ")})
+            if name in self.redirects:
+                redirects.append({"from": name.replace("_", " "),
+                                  "to": self.redirects[name]
+                                  .replace("_", " ")})
+                name = self.redirects[name]
+
+            page = {"ns": 0, "title": name.replace("_", " ")}
+            if name not in self.pages:
+                page["missing"] = True
+            pages.append(page)
+        return {"batchcomplete": True, "query": {
+            "normalized": normalized, "redirects": redirects, "pages": pages
+        }}
+
+    def read_page(self, name: str) -> bytes:
+        # a page is a file from `sample_data` or its content
+        page = self.pages[name]
+        if isinstance(page, bytes):
+            return page
+        return (sample_data / page).read_bytes()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/wiki/"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def container_content(page: bytes) -> str:
+    # Inner HTML of the article container of a page
+    root = lxml.html.document_fromstring(page.decode("utf-8"))
+    container = next(filter(_is_container, root.iter("div")), None)
+    if container is None:
+        return ""
+
+    content = container.text or ""
+    for child in container:
+        content += lxml.html.tostring(child, encoding="unicode")
+    return content
@@ -2,12 +2,19 @@
 # Unit tests for class `Article`:
 # 1. focused on checking how it reads words,
 # 2. focused on reading tables,
-# 3. focused on counting words.
+# 3. focused on counting words,
+# 4. checking that all parsing backends give the same results,
+# 5. lazy parsing (early-stopping scans vs. the full tree),
+# 6. streaming word counting (same results as counting the whole text).
 import unittest
+from collections import Counter
 from pathlib import Path
+from re import findall
+from bs4 import BeautifulSoup
 from pandas import Series
-from wiki_scraper.article import Article
+from wiki_scraper.article import Article, _NOT_PARSED
 from wiki_scraper.scraper import Scraper
+from wiki_scraper.parsers import PARSERS, DEFAULT_PARSER
 
 
 class TestArticleWordReading(unittest.TestCase):
@@ -318,5 +325,131 @@ class TestPrintingValueFrequency(unittest.TestCase):
         self.assertEqual(flattened_df.sum(), 12)
 
 
+class TestParserBackends(unittest.TestCase):
+    tricky_html = """
+        <div class="mw-parser-output   mw-content-ltr">wrong order</div>
+        <div class="mw-content-ltr  mw-parser-output">
+            <p>Team <b>Rocket</b><!-- hidden words --> (<ruby>ロケット団
+            <rt>だん</rt><rp>(</rp></ruby>) isn't<script>var x;</script>
+            nice<style>p {}</style> at all .</p>
+            <table><tr><th>A</th><th>B</th></tr>
+            <tr><td>1 <a href="/wiki/Pikachu">Pikachu</a></td>
+            <td><a href="/wiki/File:P.png">f</a> <a>no href</a></td></tr>
+            </table>
+            <a href="https://example.com">External</a>
+        </div>
+        """
+
+    def setUp(self):
+        repo_root = Path(__file__).resolve().parent.parent
+        self.pages = sorted((repo_root / "tests" / "sample_data")
+                            .glob("*.html"))
+
+    @staticmethod
+    def results(html, parser):
+        article = Article(html, "Test", parser=parser)
+        tables = [article.get_table_by_index(i).to_dict() for i in range(4)]
+        return (article.get_first_paragraph(), article.count_words(),
+                article.get_wiki_links(), tables)
+
+    def test_backends_agree_on_sample_data(self):
+        for path in self.pages:
+            html = path.read_text(encoding="utf-8")
+            expected = self.results(html, "html.parser")
+
+            for parser in PARSERS:
+                with self.subTest(page=path.name, parser=parser):
+                    self.assertEqual(expected, self.results(html, parser))
+
+    def test_backends_agree_on_tricky_html(self):
+        expected = self.results(self.tricky_html, "html.parser")
+        self.assertEqual("Team Rocket ( ロケット団) isn't nice at all.",
+                         expected[0])
+        self.assertNotIn("hidden", expected[1])
+        self.assertNotIn("var", expected[1])
+        self.assertEqual(["/wiki/Pikachu"], expected[2])
+
+        for parser in PARSERS:
+            with self.subTest(parser=parser):
+                self.assertEqual(expected,
+                                 self.results(self.tricky_html, parser))
+
+    def test_lazy_scans_agree_with_full_tree(self):
+        pages = [p.read_text(encoding="utf-8") for p in self.pages]
+        for html in pages + [self.tricky_html]:
+            for parser in PARSERS:
+                with self.subTest(parser=parser):
+                    lazy = Article(html, "Test", parser=parser)
+                    eager = Article(html, "Test", parser=parser)
+                    eager.container  # builds the full tree
+
+                    self.assertEqual(eager.get_first_paragraph(),
+                                     lazy.get_first_paragraph())
+                    for i in range(4):
+                        self.assertTrue(eager.get_table_by_index(i).equals(
+                            lazy.get_table_by_index(i)
+                        ))
+
+    def test_summary_does_not_build_full_tree(self):
+        article = Article(self.tricky_html, "Test")
+        article.get_first_paragraph()
+        article.get_table_by_index(1)
+
+        self.assertIs(article._container, _NOT_PARSED)
+        self.assertIsNotNone(article.container)
+
+    def test_default_parser(self):
+        self.assertEqual(DEFAULT_PARSER, Article("", "").parser.name)
+
+    def test_unknown_parser(self):
+        with self.assertRaises(ValueError):
+            Article("", "", parser="no-such-parser")
+
+
+class TestStreamingWordCount(unittest.TestCase):
+    @staticmethod
+    def count_whole_text(html):
+        # Reference: counting over the text of the whole article
+        container = BeautifulSoup(html, "html.parser").find(
+            "div", class_="mw-content-ltr mw-parser-output"
+        )
+        if container is None:
+            return {}
+        for tag in container.find_all(["style", "script"]):
+            tag.decompose()
+
+        text = container.get_text(separator=" ", strip=True)
+        return dict(Counter(findall(r"[A-Za-z]+(?:'[A-Za-z]+)*",
+                                    text.lower())))
+
+    def check(self, html):
+        expected = self.count_whole_text(html)
+        for parser in PARSERS:
+            with self.subTest(parser=parser):
+                streamed = Article(html, "Test", parser=parser)
+                self.assertEqual(expected, streamed.count_words())
+
+                from_tree = Article(html, "Test", parser=parser)
+                from_tree.container
+                self.assertEqual(expected, from_tree.count_words())
+
+    def test_sample_data(self):
+        repo_root = Path(__file__).resolve().parent.parent
+        for path in sorted((repo_root / "tests" / "sample_data")
+                           .glob("*.html")):
+            self.check(path.read_text(encoding="utf-8"))
+
+    def test_words_split_by_tags(self):
+        self.check('<div class="mw-content-ltr mw-parser-output">'
+                   "<p>isn<b>'t</b> don't<i>s</i> KELVIN \u212a "
+                   "rock'n'roll '<br>quoted' Pok\u00e9mon</p>"
+                   "<!-- not counted --><script>var x;</script>end</div>")
+
+    def test_text_larger_than_batch(self):
+        words = " ".join(f"word{'x' * (i % 7)} it's" for i in range(40000))
+        self.check('<div class="mw-content-ltr mw-parser-output">'
+                   f"<p>{words}</p><p>{words[::-1]}</p></div>")
+
+
 if __name__ == "__main__":
     unittest.main()
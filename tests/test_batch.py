@@ -0,0 +1,158 @@
+# tests/test_batch.py
+# Unit tests for the batch mode (`batch.py`):
+# 1. reading jobs (comments, invalid and not allowed commands),
+# 2. running jobs in order, with shared downloads, store and cache,
+# 3. concurrent downloads and failing jobs not stopping the rest.
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from argparse import Namespace
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+from tests.local_server import LocalWikiServer
+from wiki_scraper import batch
+from wiki_scraper.article import Article
+from wiki_scraper.batch import read_jobs, run_batch
+from wiki_scraper.controller import Controller
+from wiki_scraper.scraper import Scraper
+from wiki_scraper.utils import WordCountStore, dict_path
+
+sample_data = Path(__file__).resolve().parent / "sample_data"
+
+
+def remove_word_counts():
+    for path in dict_path.parent.glob(dict_path.name + "*"):
+        if path.is_dir():
+            shutil.rmtree(path)
+        else:
+            path.unlink()
+
+
+class TestReadJobs(unittest.TestCase):
+    # 1. Reading jobs
+    def test_jobs(self):
+        lines = ["# summaries", "--summary \"Team Rocket\"", "",
+                 "  table Pikachu --number 2  ", "--table Pikachu",
+                 "summary \"Team", "--batch jobs.txt", "summary x --help",
+                 "--serve --port 0"]
+        jobs = list(read_jobs(lines))
+
+        self.assertEqual([2, 4, 5, 6, 7, 8, 9], [job[0] for job in jobs])
+        self.assertEqual("Team_Rocket", jobs[0][2].phrase)
+        self.assertEqual(("table", 2), (jobs[1][2].cmd, jobs[1][2].number))
+        self.assertEqual("table Pikachu --number 2", jobs[1][1])
+        for job in jobs[2:]:
+            self.assertIsNone(job[2])
+        self.assertIn("--number", jobs[2][3])
+        self.assertEqual("No closing quotation", jobs[3][3])
+        self.assertIn("`batch` can't run in a batch", jobs[4][3])
+        self.assertEqual("Not a command.", jobs[5][3])
+        # a server would never return
+        self.assertIn("`serve` can't run in a batch", jobs[6][3])
+        self.assertIn("auto-count-words", jobs[6][3])
+
+
+class TestRunBatch(unittest.TestCase):
+    def setUp(self):
+        remove_word_counts()
+        self.directory = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        # tables are saved in the working directory
+        os.chdir(self.directory.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.directory.cleanup()
+        remove_word_counts()
+
+    def run_jobs(self, lines, **kwargs):
+        output = StringIO()
+        with redirect_stdout(output):
+            stats = run_batch(read_jobs(lines), **kwargs)
+        return stats, output.getvalue()
+
+    # 2. Running jobs
+    def test_jobs_in_order(self):
+        lines = ["--summary \"Team Rocket\"", "table Team_Magma --number 2",
+                 "count-words Jessie", "--summary Team_Rocket",
+                 "summary Team_Rocket --fetch api",
+                 "--analyze-relative-word-frequency --mode article "
+                 "--count 3"]
+        with LocalWikiServer() as server:
+            stats, output = self.run_jobs(lines, base_url=server.base_url)
+            requested = list(server.requested)
+
+        self.assertEqual({"jobs": 6, "failed": 0}, stats)
+        headers = [line for line in output.splitlines()
+                   if line.startswith("[")]
+        self.assertEqual([f"[{i}] {line}" for i, line
+                          in enumerate(lines, start=1)], headers)
+        self.assertTrue(os.path.exists("Team_Magma.csv"))
+        self.assertIn("Team Rocket", output.split("[2]")[0])
+
+        # jobs of the same article (and fetch mode) share one download
+        self.assertEqual(1, requested.count("/wiki/Team_Rocket"))
+        self.assertEqual(1, sum(path.startswith("/w/api.php")
+                                for path in requested))
+        # the analysis sees counts of the job before it
+        with WordCountStore() as store:
+            self.assertGreater(store.total(), 0)
+        self.assertIn("paragraph", output.split("[6]")[1])
+
+    def test_shared_cache_and_store(self):
+        cache = Mock()
+        cache.get.return_value = None
+        cache.offline = False
+        html = (sample_data / "simple_article_2.html").read_text("utf-8")
+        store = WordCountStore()
+        try:
+            args = Namespace(cmd="count-words", phrase="Jessie")
+            Controller(args, article=Article(html, "Jessie"),
+                       cache=cache, store=store).run()
+            # the caller closes what it gave
+            cache.close.assert_not_called()
+            self.assertGreater(store.total(), 0)
+        finally:
+            store.close()
+
+    # 3. Concurrency and failures
+    def test_concurrent_downloads(self):
+        # all three downloads wait for each other, so they must overlap
+        barrier = threading.Barrier(3, timeout=10)
+        download = batch.download_article
+
+        def waiting_download(*args):
+            barrier.wait()
+            return download(*args)
+
+        lines = [f"--summary {phrase}"
+                 for phrase in ("Pikachu", "Jessie", "James")]
+        with LocalWikiServer() as server, \
+                patch("wiki_scraper.batch.download_article",
+                      waiting_download):
+            stats, _ = self.run_jobs(lines, concurrency=3,
+                                     base_url=server.base_url)
+        self.assertEqual({"jobs": 3, "failed": 0}, stats)
+
+    def test_failing_jobs(self):
+        lines = ["--summary No_such_page", "--table Pikachu",
+                 "--summary Pikachu"]
+        with LocalWikiServer() as server, \
+                patch.object(Scraper, "wait_seconds", 0):
+            stats, output = self.run_jobs(lines, base_url=server.base_url)
+
+        self.assertEqual({"jobs": 3, "failed": 2}, stats)
+        self.assertIn("ERROR (line 1): Article not found.", output)
+        self.assertIn("ERROR (line 2): Invalid command.", output)
+        # the last job runs anyway
+        self.assertNotIn("ERROR", output.split("[3]")[1])
+        self.assertGreater(len(output.split("[3]")[1].strip()), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+# tests/test_cache.py
+# Unit tests for class `PageCache`:
+# 1. storing, expiring and evicting pages,
+# 2. scraping through the cache (no network on repeated calls).
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from tests.local_server import LocalWikiServer
+from wiki_scraper.cache import PageCache
+from wiki_scraper.exceptions import ArticleNotFound
+from wiki_scraper.scraper import Scraper
+from wiki_scraper.session import CachedPage, HttpPool
+
+
+class TestPageCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_put_and_get(self):
+        cache = PageCache(directory=self.directory)
+        key = cache.key("https://bulbapedia.bulbagarden.net/wiki/", "pikachu")
+        cache.put(key, CachedPage(text="<p>Pikachu é</p>", etag='"1"'))
+
+        page = cache.get(key)
+        self.assertEqual("<p>Pikachu é</p>", page.text)
+        self.assertEqual('"1"', page.etag)
+        self.assertTrue(cache.is_fresh(page))
+
+    def test_key_is_normalized(self):
+        base_url = "https://bulbapedia.bulbagarden.net/wiki/"
+        self.assertEqual(PageCache.key(base_url, "team Rocket"),
+                         PageCache.key(base_url.rstrip("/"), "Team_Rocket"))
+
+    def test_persists_between_instances(self):
+        cache = PageCache(directory=self.directory)
+        cache.put("k", CachedPage(text="<p>saved</p>"))
+        cache.close()
+
+        self.assertEqual("<p>saved</p>",
+                         PageCache(directory=self.directory).get("k").text)
+
+    def test_identical_pages_share_blob(self):
+        cache = PageCache(directory=self.directory)
+        cache.put("Pikachu", CachedPage(text="<p>same</p>"))
+        cache.put("Pikachu_(Pokémon)", CachedPage(text="<p>same</p>"))
+
+        blobs = list((self.directory / "blobs").rglob("*.html.gz"))
+        self.assertEqual(1, len(blobs))
+        self.assertEqual(2, len(cache))
+
+    def test_ttl_expiry(self):
+        cache = PageCache(directory=self.directory, ttl=60)
+        cache.put("k", CachedPage(text="<p>old</p>"))
+
+        page = cache.get("k")
+        page.fetched_at = time.time() - 120
+        self.assertFalse(cache.is_fresh(page))
+
+        self.assertTrue(PageCache(directory=self.directory, ttl=None)
+                        .is_fresh(page))
+
+    def test_lru_eviction(self):
+        cache = PageCache(directory=self.directory, max_bytes=10 ** 9)
+        texts = {f"page{i}": f"<p>{i}</p>" * 50 for i in range(3)}
+        for key, text in texts.items():
+            cache.put(key, CachedPage(text=text))
+            time.sleep(0.01)
+
+        # `page0` becomes the most recently used one
+        cache.get("page0")
+        cache.max_bytes = cache.size() - 1
+        cache.put("page3", CachedPage(text="<p>3</p>"))
+
+        self.assertIsNone(cache.get("page1"))
+        self.assertIsNotNone(cache.get("page0"))
+        self.assertIsNotNone(cache.get("page3"))
+        self.assertLessEqual(cache.size(), cache.max_bytes)
+
+
+class TestScraperWithCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_repeated_scrape_uses_no_network(self):
+        cache = PageCache(directory=self.directory)
+        with LocalWikiServer() as server:
+            for _ in range(3):
+                article = Scraper(phrase="Team Rocket",
+                                  base_url=server.base_url,
+                                  session=HttpPool(), cache=cache).scrape()
+
+        self.assertEqual(1, len(server.requested))
+        self.assertIn("Team Rocket", article.html_content)
+
+    def test_offline_mode(self):
+        with LocalWikiServer() as server:
+            base_url = server.base_url
+            online_cache = PageCache(directory=self.directory)
+            Scraper(phrase="Pikachu", base_url=base_url,
+                    cache=online_cache).scrape()
+            online_cache.close()
+
+        cache = PageCache(directory=self.directory, ttl=0, offline=True)
+        article = Scraper(phrase="Pikachu", base_url=base_url,
+                          cache=cache).scrape()
+        self.assertEqual("This is the first paragraph. "
+                         "It contains some text for testing.",
+                         article.get_first_paragraph())
+
+        with self.assertRaises(ArticleNotFound):
+            Scraper(phrase="Jessie", base_url=base_url, cache=cache).scrape()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+# tests/test_charts.py
+# Unit tests for module `charts.py`:
+# 1. charts in PNG, SVG and text format (told by the suffix),
+# 2. one figure reused by a batch of charts, freed afterwards,
+# 3. unsupported formats rejected (also by the CLI).
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from pandas import DataFrame
+
+from wiki_scraper.charts import (ChartRenderer, chart_format,
+                                 render_charts, write_text_chart)
+from wiki_scraper.cli import get_args
+
+
+def sample_table(n: int = 3) -> DataFrame:
+    return DataFrame({
+        "word": [f"word{i}" for i in range(n)],
+        "frequency in the article": [0.5 / (i + 1) for i in range(n)],
+        "frequency in the wiki language": [0.1 / (i + 1) for i in range(n)],
+    })
+
+
+class TestCharts(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    # 1. Formats
+    def test_image_formats(self):
+        with ChartRenderer() as renderer:
+            renderer.render(sample_table(), self.dir / "chart.png")
+            renderer.render(sample_table(), self.dir / "chart.svg")
+            renderer.render(sample_table(), self.dir / "chart")
+
+        self.assertEqual(b"\x89PNG",
+                         (self.dir / "chart.png").read_bytes()[:4])
+        self.assertIn(b"<svg", (self.dir / "chart.svg").read_bytes()[:500])
+        self.assertEqual(b"\x89PNG", (self.dir / "chart").read_bytes()[:4])
+
+    def test_text_chart(self):
+        path = self.dir / "chart.txt"
+        write_text_chart(sample_table(2), path, title="Top 2")
+
+        lines = path.read_text(encoding="utf-8").splitlines()
+        self.assertEqual("Top 2", lines[0])
+        # the biggest value has the longest bar
+        self.assertEqual("word0  5.000e-01  " + "#" * 40, lines[2])
+        self.assertEqual("       1.000e-01  " + "=" * 8, lines[3])
+        self.assertEqual(6, len(lines))
+
+    def test_no_pyplot(self):
+        # only checked if nothing else loaded pyplot in this process
+        had_pyplot = "matplotlib.pyplot" in sys.modules
+        render_charts([(sample_table(), self.dir / "chart.png", "")])
+        if not had_pyplot:
+            self.assertNotIn("matplotlib.pyplot", sys.modules)
+
+    # 2. Batches
+    def test_batch_reuses_one_figure(self):
+        renderer = ChartRenderer()
+        renderer.render(sample_table(3), self.dir / "a.png")
+        figure = renderer._figure
+        renderer.render(sample_table(40), self.dir / "b.svg")
+
+        self.assertIs(figure, renderer._figure)
+        # cleared after every chart
+        self.assertEqual([], figure.axes)
+
+        renderer.close()
+        self.assertIsNone(renderer._figure)
+
+    def test_render_charts(self):
+        charts = [(sample_table(n), self.dir / f"top{n}.{fmt}", f"Top {n}")
+                  for n, fmt in [(3, "png"), (50, "svg"), (500, "txt")]]
+
+        self.assertEqual([path for _, path, _ in charts],
+                         render_charts(charts))
+        for _, path, _ in charts:
+            self.assertGreater(path.stat().st_size, 0)
+
+    # 3. Unsupported formats
+    def test_unsupported_format(self):
+        self.assertEqual("svg", chart_format("chart.SVG"))
+        with self.assertRaises(ValueError):
+            chart_format("chart.gif")
+
+        with self.assertRaises(SystemExit):
+            get_args(["wiki_scraper.py", "--analyze-relative-word-frequency",
+                      "--mode", "article", "--count", "5",
+                      "--chart", "chart.gif"])
+
+
+if __name__ == "__main__":
+    unittest.main()
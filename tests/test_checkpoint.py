@@ -0,0 +1,184 @@
+# tests/test_checkpoint.py
+# Unit tests for resumable crawls (`CrawlCheckpoint`):
+# 1. a crawl which died (or was killed) is resumed without counting any
+#    page twice (and without retrying missing articles),
+# 2. resuming a missing or another crawl's checkpoint fails.
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from tests.local_server import LocalWikiServer, sample_pages
+from wiki_scraper.checkpoint import CrawlCheckpoint
+from wiki_scraper.crawler import async_auto_count_words
+from wiki_scraper.exceptions import (ArticleNotFound, InvalidCheckpoint,
+                                     PageUnavailable)
+from wiki_scraper.scraper import Scraper
+from wiki_scraper.utils import WordCountStore, auto_count_words
+
+
+def serial_crawl(**kwargs):
+    return auto_count_words(**kwargs)
+
+
+def concurrent_crawl(**kwargs):
+    return async_auto_count_words(concurrency=3, **kwargs)
+
+
+class TestResumableCrawl(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = Path(self.tmp.name)
+        self.checkpoint_path = self.directory / "checkpoint.json"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def crawl(self, crawler, server, store_name, checkpoint=None):
+        with WordCountStore(self.directory / store_name) as store:
+            crawler(start_phrase="Villainous team", depth=2, wait=0,
+                    base_url=server.base_url, store=store,
+                    checkpoint=checkpoint)
+            return store.load()
+
+    def crawl_failing(self, crawler, server, fail_on: int):
+        original_scrape = Scraper.scrape
+        calls = []
+
+        def scrape(scraper):
+            calls.append(scraper.phrase)
+            if len(calls) == fail_on:
+                raise PageUnavailable("Connection lost.")
+            return original_scrape(scraper)
+
+        checkpoint = CrawlCheckpoint(self.checkpoint_path, every=2)
+        with mock.patch.object(Scraper, "scrape", scrape):
+            with self.assertRaises(PageUnavailable):
+                self.crawl(crawler, server, "resumed.json", checkpoint)
+
+    # 1. Resuming
+    def test_resume_gives_same_totals(self):
+        for crawler in (serial_crawl, concurrent_crawl):
+            for fail_on in (1, 4, 8):
+                with self.subTest(crawler=crawler.__name__, fail_on=fail_on):
+                    for path in self.directory.iterdir():
+                        # stores keep snapshots in directories
+                        if path.is_dir():
+                            shutil.rmtree(path)
+                        else:
+                            path.unlink()
+
+                    with LocalWikiServer() as server:
+                        expected = self.crawl(crawler, server, "full.json")
+
+                        self.crawl_failing(crawler, server, fail_on)
+                        self.assertTrue(self.checkpoint_path.exists())
+
+                        checkpoint = CrawlCheckpoint(self.checkpoint_path,
+                                                     resume=True)
+                        resumed = self.crawl(crawler, server, "resumed.json",
+                                             checkpoint)
+
+                    self.assertEqual(expected, resumed)
+                    self.assertEqual(9, checkpoint.pages)
+                    self.assertFalse(self.checkpoint_path.exists())
+
+    def test_committed_pages_are_not_fetched_again(self):
+        with LocalWikiServer() as server:
+            self.crawl_failing(serial_crawl, server, fail_on=6)
+            fetched_before = list(server.requested)
+
+            self.crawl(serial_crawl, server, "resumed.json",
+                       CrawlCheckpoint(self.checkpoint_path, resume=True))
+
+        self.assertEqual(5, len(fetched_before))
+        self.assertEqual(9, len(server.requested))
+        self.assertEqual(len(server.requested), len(set(server.requested)))
+
+    def test_killed_crawl_counts_nothing_twice(self):
+        # A killed crawl saves nothing more: its files stay as they were.
+        # They are copied at that moment (the crawl itself goes on).
+        killed = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, killed)
+        original_scrape = Scraper.scrape
+        calls = []
+
+        def scrape(scraper):
+            calls.append(scraper.phrase)
+            if len(calls) == 6:
+                shutil.copytree(self.directory, killed, dirs_exist_ok=True)
+            return original_scrape(scraper)
+
+        with LocalWikiServer() as server:
+            expected = self.crawl(serial_crawl, server, "full.json")
+
+            # the store would flush after every page by itself
+            with WordCountStore(self.directory / "counts.json",
+                                flush_every=1) as store, \
+                    mock.patch.object(Scraper, "scrape", scrape):
+                serial_crawl(start_phrase="Villainous team", depth=2,
+                             wait=0, base_url=server.base_url, store=store,
+                             checkpoint=CrawlCheckpoint(self.checkpoint_path,
+                                                        every=3))
+                self.assertEqual(1, store.flush_every)
+
+            with WordCountStore(killed / "counts.json") as store:
+                serial_crawl(start_phrase="Villainous team", depth=2,
+                             wait=0, base_url=server.base_url, store=store,
+                             checkpoint=CrawlCheckpoint(
+                                 killed / self.checkpoint_path.name,
+                                 resume=True))
+                resumed = store.load()
+
+        self.assertEqual(expected, resumed)
+
+    def test_missing_article_is_not_retried(self):
+        # a dead link: `Jessie` is linked, but there is no such page
+        pages = {name: path for name, path in sample_pages.items()
+                 if name != "Jessie"}
+        for crawler in (serial_crawl, concurrent_crawl):
+            with self.subTest(crawler=crawler.__name__):
+                checkpoint = CrawlCheckpoint(self.checkpoint_path, every=2)
+                with LocalWikiServer(pages=pages) as server, \
+                        mock.patch.object(Scraper, "wait_seconds", 0):
+                    with self.assertRaises(ArticleNotFound):
+                        self.crawl(crawler, server, f"{crawler.__name__}.json",
+                                   checkpoint)
+                    self.assertEqual(1, len(checkpoint.failed))
+                    self.assertTrue(checkpoint.failed[0].endswith("/Jessie"))
+
+                    fetched_before = len(server.requested)
+                    checkpoint = CrawlCheckpoint(self.checkpoint_path,
+                                                 resume=True)
+                    self.crawl(crawler, server, f"{crawler.__name__}.json",
+                               checkpoint)
+                    resumed = server.requested[fetched_before:]
+
+                # the crawl finishes, without asking for the page again
+                self.assertNotIn("/wiki/Jessie", resumed)
+                self.assertEqual(8, checkpoint.pages)
+                self.assertFalse(self.checkpoint_path.exists())
+
+    # 2. Invalid checkpoints
+    def test_missing_checkpoint(self):
+        with LocalWikiServer() as server:
+            with self.assertRaises(InvalidCheckpoint):
+                self.crawl(serial_crawl, server, "counts.json",
+                           CrawlCheckpoint(self.checkpoint_path, resume=True))
+        self.assertEqual([], server.requested)
+
+    def test_checkpoint_of_another_crawl(self):
+        with LocalWikiServer() as server:
+            self.crawl_failing(serial_crawl, server, fail_on=3)
+
+            with self.assertRaises(InvalidCheckpoint):
+                auto_count_words("Villainous team", depth=1, wait=0,
+                                 base_url=server.base_url,
+                                 store=WordCountStore(self.directory / "x"),
+                                 checkpoint=CrawlCheckpoint(
+                                     self.checkpoint_path, resume=True))
+
+
+if __name__ == "__main__":
+    unittest.main()
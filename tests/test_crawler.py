@@ -0,0 +1,178 @@
+# tests/test_crawler.py
+# Unit tests for crawling (`--auto-count-words`):
+# 1. serial and concurrent crawls (also with parsing in processes)
+#    giving the same totals,
+# 2. per-host rate limiting (also adaptive, and never for cache hits).
+import json
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+from tests.local_server import LocalWikiServer
+from wiki_scraper.crawler import async_auto_count_words
+from wiki_scraper.cache import PageCache
+from wiki_scraper.ratelimit import (AdaptiveRateLimiter, HostRateLimiter,
+                                    parse_retry_after)
+from wiki_scraper.scraper import Scraper
+from wiki_scraper.utils import auto_count_words, dict_path
+
+
+def read_word_counts() -> dict:
+    with open(dict_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class TestConcurrentCrawl(unittest.TestCase):
+    def setUp(self):
+        if dict_path.exists():
+            os.remove(dict_path)
+
+    def tearDown(self):
+        if dict_path.exists():
+            os.remove(dict_path)
+
+    def crawl_serial(self, server, depth):
+        auto_count_words("Villainous team", depth=depth, wait=0,
+                         base_url=server.base_url)
+        return read_word_counts()
+
+    def test_same_totals_as_serial(self):
+        with LocalWikiServer() as server:
+            for depth in range(3):
+                with self.subTest(depth=depth):
+                    if dict_path.exists():
+                        os.remove(dict_path)
+                    expected = self.crawl_serial(server, depth)
+
+                    os.remove(dict_path)
+                    async_auto_count_words("Villainous team", depth=depth,
+                                           wait=0, concurrency=4,
+                                           base_url=server.base_url)
+
+                    self.assertEqual(expected, read_word_counts())
+
+    def test_process_pool_parsing_same_totals(self):
+        with LocalWikiServer() as server:
+            expected = self.crawl_serial(server, depth=2)
+
+            os.remove(dict_path)
+            async_auto_count_words("Villainous team", depth=2, wait=0,
+                                   concurrency=4, parse_workers=2,
+                                   base_url=server.base_url)
+
+        self.assertEqual(expected, read_word_counts())
+
+    def test_each_page_fetched_once(self):
+        with LocalWikiServer() as server:
+            async_auto_count_words("Villainous team", depth=2, wait=0,
+                                   concurrency=8, base_url=server.base_url)
+
+        self.assertEqual(9, len(server.requested))
+        self.assertEqual(len(server.requested), len(set(server.requested)))
+
+    def test_depth_zero_fetches_start_only(self):
+        with LocalWikiServer() as server:
+            async_auto_count_words("Team Rocket", depth=0, wait=0,
+                                   concurrency=4, base_url=server.base_url)
+
+        self.assertEqual(["/wiki/Team_Rocket"], server.requested)
+        self.assertIn("rocket", read_word_counts())
+
+
+class TestHostRateLimiter(unittest.TestCase):
+    def test_slots_are_spaced_per_host(self):
+        limiter = HostRateLimiter(interval=10)
+
+        self.assertEqual(0, limiter.reserve("http://a.org/wiki/X"))
+        self.assertAlmostEqual(10, limiter.reserve("http://a.org/wiki/Y"),
+                               delta=0.5)
+        self.assertAlmostEqual(20, limiter.reserve("http://a.org/wiki/Z"),
+                               delta=0.5)
+        # Another host has its own slots
+        self.assertEqual(0, limiter.reserve("http://b.org/wiki/X"))
+
+    def test_zero_interval_never_waits(self):
+        limiter = HostRateLimiter(interval=0)
+        for _ in range(5):
+            self.assertEqual(0, limiter.reserve("http://a.org/wiki/X"))
+
+
+class TestAdaptiveRateLimiter(unittest.TestCase):
+    url = "http://a.org/wiki/X"
+
+    def test_retry_after(self):
+        self.assertEqual(120, parse_retry_after("120"))
+        future = datetime.now(timezone.utc) + timedelta(seconds=90)
+        self.assertAlmostEqual(90, parse_retry_after(
+            format_datetime(future, usegmt=True)), delta=2)
+        self.assertEqual(0, parse_retry_after(
+            "Wed, 21 Oct 2015 07:28:00 GMT"))
+        for value in (None, "", "soon"):
+            self.assertIsNone(parse_retry_after(value))
+
+    def test_backs_off_on_429(self):
+        limiter = AdaptiveRateLimiter(interval=0.5)
+        limiter.observe(self.url, 429, latency=0.1)
+        self.assertEqual(1.0, limiter.current_interval(self.url))
+        limiter.observe(self.url, 503, latency=0.1, retry_after=30)
+        self.assertEqual(2.0, limiter.current_interval(self.url))
+
+        # nothing is sent before `Retry-After` passes
+        self.assertAlmostEqual(30, limiter.reserve(self.url), delta=1)
+        self.assertAlmostEqual(32, limiter.reserve(self.url), delta=1)
+        self.assertEqual(0, limiter.reserve("http://b.org/wiki/X"))
+
+    def test_speeds_up_while_fast(self):
+        limiter = AdaptiveRateLimiter(interval=2, max_rate=4)
+        for _ in range(100):
+            limiter.observe(self.url, 200, latency=0.05)
+        self.assertEqual(0.25, limiter.current_interval(self.url))
+
+        for _ in range(20):
+            limiter.observe(self.url, 200, latency=5)
+        self.assertGreater(limiter.current_interval(self.url), 1)
+
+    def test_never_faster_than_asked(self):
+        limiter = AdaptiveRateLimiter(interval=0.1, max_rate=4)
+        for _ in range(100):
+            limiter.observe(self.url, 200, latency=0.05)
+        self.assertEqual(0.1, limiter.current_interval(self.url))
+
+    @patch("wiki_scraper.scraper.time.sleep")
+    @patch("wiki_scraper.session.requests.Session.get")
+    def test_scraper_leaves_waiting_to_limiter(self, mock_get, mock_sleep):
+        mock_503 = Mock(status_code=503, headers={"Retry-After": "0"})
+        mock_200 = Mock(status_code=200, headers={},
+                        text="<div class='mw-content-ltr mw-parser-output'>"
+                             "<p>Back.</p></div>")
+        mock_get.side_effect = [mock_503, mock_200]
+
+        limiter = AdaptiveRateLimiter(interval=0)
+        article = Scraper(phrase="Generation", limiter=limiter).scrape()
+
+        self.assertEqual("Back.", article.get_first_paragraph())
+        self.assertEqual(0, mock_sleep.call_count)
+        self.assertGreaterEqual(limiter.current_interval(
+            "https://bulbapedia.bulbagarden.net/wiki/Generation"), 0.9)
+
+    def test_cache_hits_never_wait(self):
+        with tempfile.TemporaryDirectory() as tmp, \
+                LocalWikiServer() as server:
+            cache = PageCache(directory=Path(tmp))
+            auto_count_words("Villainous team", depth=2, wait=0,
+                             base_url=server.base_url, cache=cache)
+
+            start = time.monotonic()
+            auto_count_words("Villainous team", depth=2, wait=60,
+                             base_url=server.base_url, cache=cache)
+            self.assertLess(time.monotonic() - start, 10)
+        os.remove(dict_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+# tests/test_freq_table.py
+# Unit tests for the vectorized relative-frequency analysis:
+# 1. `FrequencyTable` gives the same frequencies as `word_frequency`,
+# 2. the table is saved to disk and loaded once per process,
+# 3. top-N selection keeps the order of `Counter.most_common`,
+# 4. the analysis table matches per-word `wordfreq` lookups.
+import tempfile
+import unittest
+from collections import Counter
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+from wordfreq import word_frequency, top_n_list
+
+from wiki_scraper import freq_table
+from wiki_scraper.freq_table import FrequencyTable, get_frequency_table
+from wiki_scraper.snapshot import top_n_indices
+from wiki_scraper.utils import WordCountStore, get_relative_freq_table
+
+WORDS = ["the", "pokemon", "electric", "don't", "mouse"]
+
+
+class TestFrequencyTable(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "wordfreq-en.npz"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_lookup_matches_word_frequency(self):
+        table = FrequencyTable.build("en", words=WORDS)
+        # the last two are not in the table
+        words = WORDS + ["pikachu", "qwzxkjv"]
+
+        expected = [word_frequency(word, "en") for word in words]
+        self.assertEqual(expected, table.lookup(words).tolist())
+
+    def test_save_and_load(self):
+        FrequencyTable.build("en", words=WORDS).save(self.path)
+
+        table = FrequencyTable.load(self.path)
+        self.assertEqual(len(WORDS), len(table))
+        self.assertEqual([word_frequency(w, "en") for w in WORDS],
+                         table.lookup(WORDS).tolist())
+
+    def test_other_wordfreq_version_is_not_loaded(self):
+        FrequencyTable.build("en", words=WORDS).save(self.path)
+
+        with mock.patch.object(freq_table, "version",
+                               return_value="0.0.0"):
+            self.assertIsNone(FrequencyTable.load(self.path))
+        self.assertIsNone(FrequencyTable.load(self.path.with_name("no")))
+
+    def test_table_is_loaded_once(self):
+        FrequencyTable.build("en", words=WORDS).save(self.path)
+
+        with mock.patch.object(FrequencyTable, "load",
+                               wraps=FrequencyTable.load) as load:
+            first = get_frequency_table("en", path=self.path)
+            second = get_frequency_table("en", path=self.path)
+
+        self.assertIs(first, second)
+        self.assertEqual(1, load.call_count)
+
+
+class TestTopN(unittest.TestCase):
+    def test_same_order_as_most_common(self):
+        counts = {"a": 3, "b": 5, "c": 3, "d": 1, "e": 5, "f": 3, "g": 0}
+        words = list(counts)
+        values = np.array(list(counts.values()))
+
+        for n in range(len(counts) + 2):
+            with self.subTest(n=n):
+                top = [(words[i], counts[words[i]])
+                       for i in top_n_indices(values, n)]
+                self.assertEqual(Counter(counts).most_common(n), top)
+
+    def test_json_store_top(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = WordCountStore(Path(tmp) / "word-counts.json")
+            store.add({"team": 2, "rocket": 7, "ash": 2, "misty": 1})
+
+            # ties are in alphabetical order
+            self.assertEqual([("rocket", 7), ("ash", 2)], store.top(2))
+
+
+class TestRelativeFreqTable(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = WordCountStore(Path(self.tmp.name) / "counts.json")
+        self.counts = {"the": 6, "pokemon": 3, "electric": 1}
+        self.store.add(self.counts)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_article_mode(self):
+        df = get_relative_freq_table(mode="article", n=2, store=self.store)
+
+        self.assertEqual(["the", "pokemon"], df["word"].tolist())
+        self.assertEqual([0.6, 0.3],
+                         df["frequency in the article"].tolist())
+        self.assertEqual(
+            [word_frequency("the", "en"), word_frequency("pokemon", "en")],
+            df["frequency in the wiki language"].tolist()
+        )
+
+    def test_language_mode(self):
+        df = get_relative_freq_table(mode="language", n=5, store=self.store)
+
+        words = top_n_list("en", 5)
+        self.assertEqual(words, df["word"].tolist())
+        self.assertEqual([word_frequency(w, "en") for w in words],
+                         df["frequency in the wiki language"].tolist())
+        self.assertEqual([self.counts.get(w, 0) / 10 for w in words],
+                         df["frequency in the article"].tolist())
+
+
+if __name__ == "__main__":
+    unittest.main()
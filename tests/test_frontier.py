@@ -0,0 +1,82 @@
+# tests/test_frontier.py
+# Unit tests for class `Frontier`:
+# 1. canonicalization of article URLs,
+# 2. deduplication and depth limit at enqueue time,
+# 3. spilling a long queue to disk (order is kept).
+import unittest
+
+from wiki_scraper.frontier import Frontier, canonicalize_url
+
+BASE_URL = "https://bulbapedia.bulbagarden.net/wiki/"
+
+
+class TestCanonicalizeUrl(unittest.TestCase):
+    def test_same_article_same_url(self):
+        spellings = [
+            BASE_URL + "Team_Rocket",
+            BASE_URL + "Team Rocket",
+            BASE_URL + "team_Rocket#History",
+            BASE_URL + "Team_Rocket?action=view",
+            BASE_URL + "Team%20Rocket",
+            BASE_URL + "_Team__Rocket_",
+        ]
+        for url in spellings:
+            with self.subTest(url=url):
+                self.assertEqual(BASE_URL + "Team_Rocket",
+                                 canonicalize_url(url, base_url=BASE_URL))
+
+    def test_percent_encoding(self):
+        self.assertEqual(canonicalize_url(BASE_URL + "Pokémon", BASE_URL),
+                         canonicalize_url(BASE_URL + "Pok%C3%A9mon",
+                                          BASE_URL))
+        self.assertEqual(BASE_URL + "Farfetch'd_(Pok%C3%A9mon)",
+                         canonicalize_url(BASE_URL + "Farfetch%27d_"
+                                          "(Pokémon)", BASE_URL))
+
+    def test_outside_base_url(self):
+        self.assertIsNone(canonicalize_url("https://example.com/wiki/X",
+                                           base_url=BASE_URL))
+        self.assertIsNone(canonicalize_url(BASE_URL + "#top",
+                                           base_url=BASE_URL))
+
+
+class TestFrontier(unittest.TestCase):
+    def test_duplicates_are_not_queued(self):
+        frontier = Frontier(base_url=BASE_URL)
+        self.assertTrue(frontier.push(BASE_URL + "Pikachu", 0))
+        self.assertFalse(frontier.push(BASE_URL + "pikachu#Biology", 1))
+        self.assertTrue(frontier.push(BASE_URL + "Meowth", 1))
+
+        self.assertEqual(2, len(frontier))
+        self.assertEqual((BASE_URL + "Pikachu", 0), frontier.pop())
+        # popped URLs stay seen
+        self.assertFalse(frontier.push(BASE_URL + "Pikachu", 2))
+        self.assertTrue(frontier.seen(BASE_URL + "Pikachu"))
+
+    def test_depth_limit(self):
+        frontier = Frontier(base_url=BASE_URL, max_depth=1)
+        self.assertFalse(frontier.push(BASE_URL + "Jessie", 2))
+        # a too deep URL may still be reached by a shorter path
+        self.assertTrue(frontier.push(BASE_URL + "Jessie", 1))
+
+    def test_spill_keeps_order(self):
+        frontier = Frontier(base_url=BASE_URL, max_in_memory=3)
+        urls = [BASE_URL + f"Page_{i}" for i in range(10)]
+        for depth, url in enumerate(urls):
+            frontier.push(url, depth)
+
+        popped = []
+        # pushes in the middle are queued behind spilled items
+        for i in range(5):
+            popped.append(frontier.pop())
+        frontier.push(BASE_URL + "Late", 99)
+        while len(frontier) > 0:
+            popped.append(frontier.pop())
+        frontier.close()
+
+        expected = [(url, depth) for depth, url in enumerate(urls)]
+        self.assertEqual(expected + [(BASE_URL + "Late", 99)], popped)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+# tests/test_imports.py
+# Tests of lazy imports, each in a fresh interpreter:
+# 1. importing the package, parsing arguments and the client of the
+#    server mode load no heavy module,
+# 2. every command loads only the dependencies it uses,
+# 3. names exported by the package are still there.
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+repo_root = Path(__file__).resolve().parent.parent
+sample_page = repo_root / "tests" / "sample_data" / "team_rocket.html"
+
+HEAVY_MODULES = {"requests", "lxml", "bs4", "numpy", "pandas",
+                 "matplotlib", "wordfreq", "http.server"}
+
+# Articles are read from a local file instead of the web
+LOCAL_PAGE = f"""
+from wiki_scraper.scraper import Scraper
+Scraper.scrape = lambda self: Scraper(
+    self.phrase, base_url={str(sample_page)!r}, use_local_file=True
+).scrape_from_file()
+"""
+
+
+def loaded_modules(code: str, argv=None) -> set[str]:
+    # Heavy modules loaded after running `code` (and `main(argv)`)
+    if argv is not None:
+        code += ("\nfrom wiki_scraper.main import main\n"
+                 f"main(['wiki_scraper.py'] + {argv!r})\n")
+    code += ("\nimport sys\n"
+             f"print('loaded:' + ','.join(m for m in {sorted(HEAVY_MODULES)!r}"
+             f" if m in sys.modules))\n")
+
+    with tempfile.TemporaryDirectory() as cwd:
+        result = subprocess.run(
+            [sys.executable, "-c", code], cwd=cwd, capture_output=True,
+            text=True, env=dict(os.environ, PYTHONPATH=str(repo_root))
+        )
+    if result.returncode != 0:
+        raise AssertionError(result.stderr)
+    last_line = result.stdout.strip().splitlines()[-1]
+    return set(filter(None, last_line.removeprefix("loaded:").split(",")))
+
+
+class TestLazyImports(unittest.TestCase):
+    # 1. Package and CLI
+    def test_import_package(self):
+        self.assertEqual(set(), loaded_modules("import wiki_scraper"))
+
+    def test_parse_args(self):
+        code = ("from wiki_scraper.cli import get_args\n"
+                "get_args(['wiki_scraper.py', '--summary', 'Pikachu'])")
+        self.assertEqual(set(), loaded_modules(code))
+
+    def test_client(self):
+        # no server is running, so the client only reports the error
+        code = ("from wiki_scraper.client import main\n"
+                "main(['client.py', '--server', '127.0.0.1:9',"
+                " '--summary', 'Pikachu'])")
+        self.assertEqual(set(), loaded_modules(code))
+
+    # 2. Commands
+    def test_summary(self):
+        loaded = loaded_modules(LOCAL_PAGE, ["--summary", "Team Rocket",
+                                             "--no-cache"])
+        self.assertEqual({"requests", "lxml"}, loaded)
+
+    def test_table(self):
+        loaded = loaded_modules(LOCAL_PAGE, ["--table", "Team Rocket",
+                                             "--number", "1", "--no-cache"])
+        self.assertIn("pandas", loaded)
+        self.assertFalse({"matplotlib", "wordfreq", "bs4"} & loaded)
+
+    # 3. Exported names
+    def test_exported_names(self):
+        code = ("import wiki_scraper\n"
+                "for name in wiki_scraper.__all__:\n"
+                "    assert getattr(wiki_scraper, name).__name__ == name\n"
+                "assert set(wiki_scraper.__all__) <= set(dir(wiki_scraper))\n"
+                "try:\n"
+                "    wiki_scraper.NoSuchName\n"
+                "except AttributeError:\n"
+                "    pass\n"
+                "else:\n"
+                "    raise AssertionError('NoSuchName')")
+        # `Scraper` and `Article` need requests and lxml, nothing more
+        self.assertFalse({"pandas", "matplotlib", "wordfreq"}
+                         & loaded_modules(code))
+
+
+if __name__ == "__main__":
+    unittest.main()
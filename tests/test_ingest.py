@@ -0,0 +1,126 @@
+# tests/test_ingest.py
+# Unit tests for bulk ingestion of local dumps (`ingest_dump`):
+# 1. directories, zip and tar archives giving the same totals,
+# 2. parsing in worker processes, per-article provenance,
+# 3. invalid dumps reported as errors, pages which can't be read
+#    skipped.
+import io
+import shutil
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from collections import Counter
+from contextlib import redirect_stdout
+from pathlib import Path
+
+from wiki_scraper.article import Article
+from wiki_scraper.exceptions import InvalidDump
+from wiki_scraper.ingest import ingest_dump, iter_dump
+from wiki_scraper.main import main
+from wiki_scraper.utils import WordCountStore, dict_path
+from wiki_scraper.word_index import SqliteWordCountStore
+
+sample_data = Path(__file__).resolve().parent / "sample_data"
+
+
+class TestIngestDump(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = Path(self.tmp.name)
+
+        self.expected = Counter()
+        for path in sample_data.glob("*.html"):
+            html = path.read_text(encoding="utf-8")
+            self.expected.update(Article(html, path.stem).count_words())
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def ingest(self, path, workers=0, name="counts.json"):
+        store = WordCountStore(self.directory / name)
+        stats = ingest_dump(path, workers=workers, store=store,
+                            progress=io.StringIO())
+        store.close()
+        self.assertEqual(11, stats["pages"])
+        return store.load()
+
+    # 1. Dump formats
+    def test_directory(self):
+        self.assertEqual(dict(self.expected), self.ingest(sample_data))
+
+    def test_zip_and_tar(self):
+        zip_path = self.directory / "dump.zip"
+        with zipfile.ZipFile(zip_path, "w") as archive:
+            for path in sample_data.glob("*.html"):
+                archive.write(path, "dump/" + path.name)
+
+        tar_path = self.directory / "dump.tar.gz"
+        with tarfile.open(tar_path, "w:gz") as archive:
+            archive.add(sample_data, arcname="dump")
+
+        for path in (zip_path, tar_path):
+            with self.subTest(path=path.name):
+                self.assertEqual(dict(self.expected),
+                                 self.ingest(path, name=path.name + ".json"))
+
+    # 2. Workers and provenance
+    def test_worker_processes(self):
+        self.assertEqual(dict(self.expected),
+                         self.ingest(sample_data, workers=2))
+
+    def test_articles_named_after_files(self):
+        with SqliteWordCountStore(self.directory / "index.sqlite3") as store:
+            ingest_dump(sample_data, workers=0, store=store, progress=None)
+            articles = {phrase for phrase, _ in store.articles_with("rocket")}
+
+        self.assertIn("Team_rocket", articles)
+
+    # 3. Invalid dumps
+    def test_not_a_dump(self):
+        path = self.directory / "notes.txt"
+        path.write_text("not a dump")
+        for dump in (path, self.directory / "missing"):
+            with self.subTest(dump=dump.name):
+                with self.assertRaises(InvalidDump):
+                    list(iter_dump(dump))
+
+    def test_page_not_utf8(self):
+        dump = self.directory / "dump"
+        shutil.copytree(sample_data, dump)
+        (dump / "Pokemon.html").write_bytes(
+            "<p>Pokémon</p>".encode("latin-1")
+        )
+        for workers in (0, 1):
+            with self.subTest(workers=workers):
+                # the page is skipped, the rest of the dump counted
+                progress = io.StringIO()
+                with WordCountStore(self.directory / f"{workers}.json") \
+                        as store:
+                    stats = ingest_dump(dump, workers=workers, store=store,
+                                        progress=progress)
+                    self.assertEqual(dict(self.expected), store.load())
+                self.assertEqual((11, 1), (stats["pages"], stats["skipped"]))
+                self.assertIn("skipped 'Pokemon'", progress.getvalue())
+
+    def test_reported_by_controller(self):
+        self.addCleanup(self.remove_word_counts)
+        output = io.StringIO()
+        with redirect_stdout(output):
+            main(["wiki_scraper.py", "--ingest",
+                  str(self.directory / "missing"), "--workers", "0"])
+        self.assertIn("ERROR: Cannot ingest the dump. Message:",
+                      output.getvalue())
+        self.assertIn("not found", output.getvalue())
+
+    @staticmethod
+    def remove_word_counts():
+        for path in dict_path.parent.glob(dict_path.name + "*"):
+            if path.is_dir():
+                shutil.rmtree(path)
+            else:
+                path.unlink()
+
+
+if __name__ == "__main__":
+    unittest.main()
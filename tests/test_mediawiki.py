@@ -0,0 +1,214 @@
+# tests/test_mediawiki.py
+# Unit tests for the `api` fetch mode (MediaWiki `api.php`):
+# 1. building API URLs and reading its answers,
+# 2. scraping and crawling through a local stub of the API,
+# 3. resolving titles of links (redirects) in batches.
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from tests.local_server import LocalWikiServer, sample_pages
+from wiki_scraper.cache import PageCache
+from wiki_scraper.exceptions import ArticleNotFound
+from wiki_scraper.crawler import async_auto_count_words
+from wiki_scraper.mediawiki import (TitleResolver, get_api_url,
+                                   html_from_parse_response,
+                                   titles_from_query_response)
+from wiki_scraper.scraper import Scraper
+from wiki_scraper.session import HttpPool
+from wiki_scraper.utils import WordCountStore, auto_count_words, dict_path
+
+
+class TestApiHelpers(unittest.TestCase):
+    def test_api_url(self):
+        self.assertEqual("https://bulbapedia.bulbagarden.net/w/api.php",
+                         get_api_url("https://bulbapedia.bulbagarden.net"
+                                     "/wiki/"))
+        self.assertEqual("http://127.0.0.1:8000/w/api.php",
+                         get_api_url("http://127.0.0.1:8000/wiki"))
+
+    def test_error_answer(self):
+        answer = json.dumps({"error": {"code": "missingtitle",
+                                       "info": "The page doesn't exist."}})
+        with self.assertRaises(ArticleNotFound):
+            html_from_parse_response(answer, "Nothing")
+        with self.assertRaises(ArticleNotFound):
+            html_from_parse_response("<html>not json</html>", "Nothing")
+
+    def test_both_format_versions(self):
+        for text in ("<p>Hi</p>", {"*": "<p>Hi</p>"}):
+            answer = json.dumps({"parse": {"title": "X", "text": text}})
+            self.assertIn("<p>Hi</p>", html_from_parse_response(answer, "X"))
+
+
+class TestApiFetchMode(unittest.TestCase):
+    def test_same_article_as_html_mode(self):
+        with LocalWikiServer() as server:
+            for name in sample_pages:
+                with self.subTest(name=name):
+                    page = Scraper(name, base_url=server.base_url).scrape()
+                    content = Scraper(name, base_url=server.base_url,
+                                      fetch_mode="api").scrape()
+
+                    self.assertEqual(page.count_words(),
+                                     content.count_words())
+                    self.assertEqual(page.get_first_paragraph(),
+                                     content.get_first_paragraph())
+                    self.assertEqual(page.get_wiki_links(),
+                                     content.get_wiki_links())
+                    self.assertLess(len(content.html_content),
+                                    len(page.html_content))
+
+    def test_missing_article_is_not_cached(self):
+        with tempfile.TemporaryDirectory() as tmp, \
+                LocalWikiServer() as server:
+            cache = PageCache(directory=Path(tmp))
+            for _ in range(2):
+                with self.assertRaises(ArticleNotFound):
+                    Scraper("Mewtwo", base_url=server.base_url,
+                            cache=cache, fetch_mode="api").scrape()
+
+            Scraper("Pikachu", base_url=server.base_url,
+                    cache=cache, fetch_mode="api").scrape()
+            article = Scraper("Pikachu", base_url=server.base_url,
+                              cache=cache, fetch_mode="api").scrape()
+
+        self.assertEqual(3, len(server.requested))
+        self.assertIn("paragraph", article.count_words())
+
+    def test_crawl_same_totals(self):
+        totals = []
+        with LocalWikiServer() as server:
+            for fetch_mode in ("html", "api"):
+                if dict_path.exists():
+                    os.remove(dict_path)
+                auto_count_words("Villainous team", depth=2, wait=0,
+                                 base_url=server.base_url,
+                                 fetch_mode=fetch_mode)
+                with open(dict_path, "r", encoding="utf-8") as f:
+                    totals.append(json.load(f))
+            os.remove(dict_path)
+
+        self.assertEqual(totals[0], totals[1])
+
+    def test_crawl_non_ascii_titles(self):
+        # links of pages are percent-encoded, titles sent to the API not
+        container = '<div class="mw-content-ltr mw-parser-output">{}</div>'
+        pages = {
+            "Start": container.format(
+                '<p>Start <a href="/wiki/Pok%C3%A9mon">link</a></p>'
+            ).encode("utf-8"),
+            "Pokémon": container.format("<p>Pocket monsters</p>")
+            .encode("utf-8"),
+        }
+        totals = []
+        with LocalWikiServer(pages=pages) as server:
+            for fetch_mode in ("html", "api"):
+                if dict_path.exists():
+                    os.remove(dict_path)
+                auto_count_words("Start", depth=1, wait=0,
+                                 base_url=server.base_url,
+                                 fetch_mode=fetch_mode)
+                with open(dict_path, "r", encoding="utf-8") as f:
+                    totals.append(json.load(f))
+            os.remove(dict_path)
+
+        self.assertIn("monsters", totals[1])
+        self.assertEqual(totals[0], totals[1])
+
+    def test_unknown_fetch_mode(self):
+        with self.assertRaises(ValueError):
+            Scraper("Pikachu", fetch_mode="wikitext")
+
+
+# Hub linking to one article under several names
+HUB = ('<html><body><div class="mw-content-ltr mw-parser-output">'
+       '<p>Hub of <a href="/wiki/Pikachu">Pikachu</a>, '
+       '<a href="/wiki/Pikachu_(Pok%C3%A9mon)">Pikachu</a>, '
+       '<a href="/wiki/Electric_mouse">mouse</a>, '
+       '<a href="/wiki/Missingno">Missingno</a> and '
+       '<a href="/wiki/Meowth">Meowth</a>.</p>'
+       '</div></body></html>').encode("utf-8")
+HUB_PAGES = {"Hub": HUB, "Pikachu": "simple_article_1.html",
+             "Meowth": "table_simple_2.html"}
+HUB_REDIRECTS = {"Pikachu_(Pokémon)": "Pikachu",
+                 "Electric_mouse": "Pikachu"}
+
+
+class TestTitleResolution(unittest.TestCase):
+    def test_query_answer(self):
+        answer = json.dumps({"query": {
+            "normalized": [{"from": "pikachu", "to": "Pikachu"}],
+            "redirects": [{"from": "Pikachu", "to": "Pikachu (Pokémon)"}],
+            "pages": [{"ns": 0, "title": "Pikachu (Pokémon)"},
+                      {"ns": 0, "title": "Nothing", "missing": True}],
+        }})
+        self.assertEqual({"pikachu": "Pikachu (Pokémon)", "Nothing": None},
+                         titles_from_query_response(answer,
+                                                    ["pikachu", "Nothing"]))
+
+    def test_titles_are_resolved_in_batches(self):
+        with LocalWikiServer(HUB_PAGES, HUB_REDIRECTS) as server:
+            resolver = TitleResolver(server.base_url, HttpPool())
+            titles = [f"Page {i}" for i in range(120)] + ["Electric mouse"]
+            resolved = resolver.resolve(titles)
+            # answers are remembered
+            resolver.resolve(["Electric mouse", "Page 3"])
+
+        self.assertEqual(3, resolver.num_queries)
+        self.assertEqual("Pikachu", resolved["Electric mouse"])
+        self.assertIsNone(resolved["Page 7"])
+
+    def test_queries_go_through_the_limiter(self):
+        class RecordingLimiter:
+            def __init__(self):
+                self.calls = []
+
+            def wait(self, url):
+                self.calls.append(("wait", url))
+
+            def observe(self, url, status, latency, retry_after=None):
+                self.calls.append(("observe", url, status))
+
+        limiter = RecordingLimiter()
+        with LocalWikiServer(HUB_PAGES, HUB_REDIRECTS) as server:
+            resolver = TitleResolver(server.base_url, HttpPool(),
+                                     limiter=limiter)
+            resolver.resolve([f"Page {i}" for i in range(60)])
+            self.assertTrue(all(
+                call[1].startswith(get_api_url(server.base_url))
+                for call in limiter.calls
+            ))
+        # nothing listens there, so the query gets no answer at all
+        TitleResolver("http://127.0.0.1:1/wiki/", HttpPool(),
+                      limiter=limiter).resolve(["Electric mouse"])
+
+        self.assertEqual(["wait", "observe"] * 3,
+                         [call[0] for call in limiter.calls])
+        self.assertEqual([200, 200, None],
+                         [call[2] for call in limiter.calls
+                          if call[0] == "observe"])
+
+    def test_redirects_are_crawled_once(self):
+        for crawler in (auto_count_words, async_auto_count_words):
+            with self.subTest(crawler=crawler.__name__), \
+                    tempfile.TemporaryDirectory() as tmp, \
+                    LocalWikiServer(HUB_PAGES, HUB_REDIRECTS) as server:
+                with WordCountStore(Path(tmp) / "counts.json") as store:
+                    crawler("Hub", depth=1, wait=0,
+                            base_url=server.base_url, store=store,
+                            resolve_titles=True)
+                    counts = store.load()
+
+                pages = [path for path in server.requested
+                         if path.startswith("/wiki/")]
+                self.assertEqual(["/wiki/Hub", "/wiki/Meowth",
+                                  "/wiki/Pikachu"], sorted(pages))
+                # counted once, like in the article itself
+                self.assertEqual(1, counts["testing"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,15 +1,19 @@
 # tests/test_scraper.py
 # Unit tests for class `Scraper`:
 # 1. local file scraping,
-# 2. mocking `requests.get`, checking all most important codes.
+# 2. mocking `requests.Session.get`, checking all most important codes,
+# 3. pooled session: connection reuse and conditional requests.
+import tempfile
 import unittest
 from pathlib import Path
 from unittest.mock import patch, Mock
 import requests
 
+from tests.local_server import LocalWikiServer
 from wiki_scraper.scraper import Scraper
 from wiki_scraper.article import Article
-from wiki_scraper.exceptions import ArticleNotFound
+from wiki_scraper.exceptions import ArticleNotFound, PageUnavailable
+from wiki_scraper.session import HttpPool, CachedPage
 
 
 class TestScraperLocal(unittest.TestCase):
@@ -41,13 +45,45 @@ class TestScraperLocal(unittest.TestCase):
         with self.assertRaises(ArticleNotFound):
             scraper.scrape()
 
+    def test_mapped_file_parses_like_text(self):
+        article = Scraper(base_url=str(self.sample_path),
+                          phrase="Team Rocket", use_local_file=True).scrape()
+        text = self.sample_path.read_text(encoding="utf-8")
+        expected = Article(html_content=text, phrase="Team Rocket")
+
+        self.assertEqual(expected.count_words(), article.count_words())
+        self.assertEqual(expected.get_first_paragraph(),
+                         article.get_first_paragraph())
+        self.assertEqual(text, article.html_content)
+
+    def test_scrape_from_file_not_utf8(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "latin1.html"
+            path.write_bytes("<p>Pokémon</p>".encode("latin-1"))
+            scraper = Scraper(base_url=str(path), phrase="Anything",
+                              use_local_file=True)
+
+            with self.assertRaises(ArticleNotFound):
+                scraper.scrape()
+
+    def test_scrape_from_empty_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "empty.html"
+            path.touch()
+            article = Scraper(base_url=str(path), phrase="Empty",
+                              use_local_file=True).scrape()
+
+        self.assertEqual({}, article.count_words())
+        self.assertEqual("", article.html_content)
+
 
 class TestScraperMockGet(unittest.TestCase):
-    @patch("wiki_scraper.scraper.requests.get")
+    @patch("wiki_scraper.session.requests.Session.get")
     def test_scrape_from_web_success(self, mock_get):
         # Mock response object
         mock_200 = Mock()
         mock_200.status_code = 200
+        mock_200.headers = {}
         mock_200.text = """
             <html>
                 <body>
@@ -77,7 +113,7 @@ class TestScraperMockGet(unittest.TestCase):
             timeout=Scraper.requests_timeout
         )
 
-    @patch("wiki_scraper.scraper.requests.get")
+    @patch("wiki_scraper.session.requests.Session.get")
     def test_scrape_from_web_not_found(self, mock_get):
         # Mock response object for 404
         mock_404 = Mock()
@@ -93,13 +129,31 @@ class TestScraperMockGet(unittest.TestCase):
             use_local_file=False
         )
 
-        with self.assertRaises(ArticleNotFound):
+        with self.assertRaises(ArticleNotFound) as raised:
             scraper.scrape()
 
         self.assertEqual(Scraper.num_attempts, mock_get.call_count)
+        # the server answered, so the article is missing for good
+        self.assertNotIsInstance(raised.exception, PageUnavailable)
+
+    @patch("wiki_scraper.scraper.time.sleep")
+    @patch("wiki_scraper.session.requests.Session.get")
+    def test_scrape_from_web_unreachable(self, mock_get, mock_sleep):
+        mock_get.side_effect = requests.ConnectionError("Connection lost")
+
+        scraper = Scraper(
+            base_url="https://bulbapedia.bulbagarden.net/wiki/",
+            phrase="Generation",
+            use_local_file=False
+        )
+
+        # still an `ArticleNotFound`, but worth retrying later
+        with self.assertRaises(PageUnavailable):
+            scraper.scrape()
+        self.assertEqual(Scraper.num_attempts, mock_get.call_count)
 
     @patch("wiki_scraper.scraper.time.sleep")
-    @patch("wiki_scraper.scraper.requests.get")
+    @patch("wiki_scraper.session.requests.Session.get")
     def test_scrape_from_web_retry(self, mock_get, mock_sleep):
         mock_429 = Mock()
         mock_429.status_code = 429
@@ -107,6 +161,7 @@ class TestScraperMockGet(unittest.TestCase):
 
         mock_200 = Mock()
         mock_200.status_code = 200
+        mock_200.headers = {}
         mock_200.text = """
             <html>
                 <body>
@@ -137,5 +192,81 @@ class TestScraperMockGet(unittest.TestCase):
         )
 
 
+class TestScraperPooledSession(unittest.TestCase):
+    def test_connection_reused_across_scrapers(self):
+        pool = HttpPool()
+        with LocalWikiServer() as server:
+            for phrase in ["Team_Rocket", "Pikachu", "Jessie"]:
+                Scraper(phrase=phrase, base_url=server.base_url,
+                        session=pool).scrape()
+
+        stats = pool.stats()
+        self.assertEqual(3, stats["requests"])
+        self.assertEqual(1, stats["connections opened"])
+        self.assertEqual(2, stats["connections reused"])
+
+    @patch("wiki_scraper.session.requests.Session.get")
+    def test_conditional_request_not_modified(self, mock_get):
+        url = "https://bulbapedia.bulbagarden.net/wiki/Generation"
+        pool = HttpPool()
+        pool.put_cached(url, CachedPage(
+            text="<p>cached</p>",
+            etag='"abc"',
+            last_modified="Wed, 21 Oct 2015 07:28:00 GMT",
+            size=13
+        ))
+
+        mock_304 = Mock()
+        mock_304.status_code = 304
+        mock_304.headers = {}
+        mock_get.return_value = mock_304
+
+        scraper = Scraper(phrase="Generation", session=pool)
+        article = scraper.scrape()
+
+        self.assertEqual("<p>cached</p>", article.html_content)
+        sent_headers = mock_get.call_args.kwargs["headers"]
+        self.assertEqual('"abc"', sent_headers["If-None-Match"])
+        self.assertEqual("Wed, 21 Oct 2015 07:28:00 GMT",
+                         sent_headers["If-Modified-Since"])
+        self.assertEqual(1, pool.stats()["not modified"])
+        self.assertEqual(13, pool.stats()["bytes saved"])
+
+    @patch("wiki_scraper.session.requests.Session.get")
+    def test_validators_are_remembered(self, mock_get):
+        mock_200 = Mock()
+        mock_200.status_code = 200
+        mock_200.text = "<p>fresh</p>"
+        mock_200.content = b"<p>fresh</p>"
+        mock_200.headers = {"ETag": '"v1"'}
+        mock_get.return_value = mock_200
+
+        pool = HttpPool()
+        Scraper(phrase="Generation", session=pool).scrape()
+        Scraper(phrase="Generation", session=pool).scrape()
+
+        first_headers = mock_get.call_args_list[0].kwargs["headers"]
+        second_headers = mock_get.call_args_list[1].kwargs["headers"]
+        self.assertNotIn("If-None-Match", first_headers)
+        self.assertEqual('"v1"', second_headers["If-None-Match"])
+
+    def test_remembered_bodies_are_capped(self):
+        pool = HttpPool(max_cached_bytes=100)
+        for name in "abc":
+            pool.put_cached(name, CachedPage(text=name * 40, etag='"v"'))
+        # the least recently used page is dropped
+        self.assertIsNone(pool.get_cached("a"))
+        self.assertIsNotNone(pool.get_cached("b"))
+
+        pool.put_cached("d", CachedPage(text="d" * 40, etag='"v"'))
+        self.assertIsNone(pool.get_cached("c"))
+        self.assertIsNotNone(pool.get_cached("b"))
+
+        # a page bigger than the cap isn't kept, and drops nothing
+        pool.put_cached("e", CachedPage(text="e" * 101, etag='"v"'))
+        self.assertIsNone(pool.get_cached("e"))
+        self.assertIsNotNone(pool.get_cached("d"))
+
+
 if __name__ == "__main__":
     unittest.main()
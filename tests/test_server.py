@@ -0,0 +1,282 @@
+# tests/test_server.py
+# Unit tests for the server mode (`server.py`) and its client:
+# 1. output of concurrent requests kept apart,
+# 2. commands answered with JSON (files written where the client is,
+#    errors, commands which aren't served, status),
+# 3. concurrent requests and the client printing like the CLI,
+# 4. refused requests (from web pages, files outside of the server's
+#    directory), keep-alive after errors and serving on a Unix socket.
+import json
+import os
+import shutil
+import socket
+import stat
+import tempfile
+import threading
+import unittest
+from contextlib import redirect_stdout
+from http.client import HTTPConnection
+from io import StringIO
+from unittest.mock import patch
+from urllib.request import urlopen
+
+from tests.local_server import LocalWikiServer
+from wiki_scraper import batch
+from wiki_scraper.client import main as client_main, send_command
+from wiki_scraper.scraper import Scraper
+from wiki_scraper.server import ThreadOutput, WikiServer
+from wiki_scraper.utils import dict_path
+
+
+def remove_word_counts():
+    for path in dict_path.parent.glob(dict_path.name + "*"):
+        if path.is_dir():
+            shutil.rmtree(path)
+        else:
+            path.unlink()
+
+
+class TestThreadOutput(unittest.TestCase):
+    # 1. Output of threads
+    def test_threads_capture_apart(self):
+        stream = StringIO()
+        output = ThreadOutput(stream)
+        barrier = threading.Barrier(2, timeout=10)
+        captured = {}
+
+        def work(name):
+            with output.capture() as buffer:
+                for _ in range(3):
+                    output.write(name)
+                    barrier.wait()
+            captured[name] = buffer.getvalue()
+
+        threads = [threading.Thread(target=work, args=(name,))
+                   for name in "ab"]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        output.write("rest")
+
+        self.assertEqual({"a": "aaa", "b": "bbb"}, captured)
+        self.assertEqual("rest", stream.getvalue())
+
+
+class TestWikiServer(unittest.TestCase):
+    def setUp(self):
+        remove_word_counts()
+        self.directory = tempfile.TemporaryDirectory()
+        self.wiki = LocalWikiServer().__enter__()
+        self.server = WikiServer(port=0, base_url=self.wiki.base_url,
+                                 output_root=self.directory.name)
+        self.server.__enter__()
+        self.address = self.server.url.removeprefix("http://")
+
+    def tearDown(self):
+        self.server.__exit__(None, None, None)
+        self.wiki.__exit__(None, None, None)
+        self.directory.cleanup()
+        remove_word_counts()
+
+    def send(self, *argv):
+        return send_command(self.address, list(argv),
+                            cwd=self.directory.name)
+
+    # 2. Commands
+    def test_summary(self):
+        answer = self.send("--summary", "Team Rocket")
+        self.assertTrue(answer["ok"])
+        self.assertIn("villainous", answer["output"])
+
+        # the article is downloaded again, on a kept-alive connection
+        self.assertTrue(self.send("summary", "Team_Rocket")["ok"])
+        self.assertGreaterEqual(
+            self.server.status()["http"]["connections reused"], 1
+        )
+
+    def test_table_written_where_the_client_is(self):
+        answer = self.send("--table", "Team Magma", "--number", "2")
+        self.assertTrue(answer["ok"])
+        self.assertIn("Name: count", answer["output"])
+        self.assertTrue(os.path.exists(
+            os.path.join(self.directory.name, "Team_Magma.csv")
+        ))
+
+    def test_count_and_analyze(self):
+        self.assertTrue(self.send("--count-words", "Jessie")["ok"])
+        # counts are flushed, and the analysis sees them
+        self.assertTrue(dict_path.with_name(dict_path.name + ".log")
+                        .exists())
+        answer = self.send("--analyze-relative-word-frequency", "--mode",
+                           "article", "--count", "3", "--chart", "top.txt")
+        self.assertTrue(answer["ok"])
+        self.assertIn("paragraph", answer["output"])
+        self.assertTrue(os.path.exists(
+            os.path.join(self.directory.name, "top.txt")
+        ))
+
+    def test_errors(self):
+        with patch.object(Scraper, "wait_seconds", 0):
+            answer = self.send("--summary", "No such page")
+        self.assertEqual("Article not found", answer["error"])
+        self.assertFalse(answer["ok"])
+
+        answer = self.send("--table", "Pikachu")
+        self.assertEqual("Invalid command", answer["error"])
+        self.assertIn("--number", answer["message"])
+
+        answer = self.send("--ingest", "dump")
+        self.assertEqual("Invalid command", answer["error"])
+        self.assertIn("isn't served", answer["message"])
+
+        # the server still works
+        self.assertTrue(self.send("--summary", "Pikachu")["ok"])
+
+    def test_status(self):
+        self.send("--summary", "Pikachu")
+        with urlopen(self.server.url + "/status") as response:
+            status = json.loads(response.read())
+        self.assertEqual(1, status["requests"])
+
+    # 3. Concurrency and the client
+    def test_concurrent_requests(self):
+        # all three downloads wait for each other, so they must overlap
+        barrier = threading.Barrier(3, timeout=10)
+        download = batch.download_article
+
+        def waiting_download(*args):
+            barrier.wait()
+            return download(*args)
+
+        answers = {}
+
+        def request(phrase):
+            answers[phrase] = self.send("--summary", phrase)
+
+        with patch("wiki_scraper.batch.download_article", waiting_download):
+            threads = [threading.Thread(target=request, args=(phrase,))
+                       for phrase in ("Pikachu", "Jessie", "James")]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertTrue(all(answer["ok"] for answer in answers.values()))
+        # every request got the output of its own command
+        outputs = {phrase: answer["output"]
+                   for phrase, answer in answers.items()}
+        self.assertEqual(3, len(set(outputs.values())))
+
+    def test_client(self):
+        output = StringIO()
+        with redirect_stdout(output):
+            client_main(["client.py", "--server", self.address,
+                         "--summary", "Team Rocket"])
+            client_main(["client.py", "--server", self.address,
+                         "--auto-count-words", "X", "--depth", "1",
+                         "--wait", "1"])
+        self.assertIn("villainous", output.getvalue())
+        self.assertIn("OK: wiki_scraper exited successfully!",
+                      output.getvalue())
+        self.assertIn("ERROR: `auto-count-words` isn't served.",
+                      output.getvalue())
+
+    # 4. Refused requests
+    def post(self, body: str, headers: dict) -> tuple[int, dict]:
+        connection = HTTPConnection(self.address, timeout=10)
+        try:
+            connection.request("POST", "/run", body=body, headers=headers)
+            response = connection.getresponse()
+            return response.status, json.loads(response.read())
+        finally:
+            connection.close()
+
+    def test_requests_from_web_pages(self):
+        body = json.dumps({"argv": ["--summary", "Pikachu"]})
+        json_type = {"Content-Type": "application/json"}
+        for status, headers in (
+                (415, {}),
+                (415, {"Content-Type": "text/plain"}),
+                (403, {**json_type, "Origin": "https://example.com"}),
+                (403, {**json_type, "Host": "example.com"}),
+                (403, {**json_type, "Host": "example.com:8765"}),
+        ):
+            with self.subTest(headers=headers):
+                answer = self.post(body, headers)
+                self.assertEqual(status, answer[0])
+                self.assertEqual("Request refused", answer[1]["error"])
+        # none of them ran
+        self.assertEqual(0, self.server.status()["requests"])
+
+        for host in ("localhost:8765", "127.0.0.1", "[::1]:8765"):
+            with self.subTest(host=host):
+                answer = self.post(body, {**json_type, "Host": host})
+                self.assertEqual(200, answer[0])
+
+    def test_files_outside_of_cwd(self):
+        outside = tempfile.TemporaryDirectory()
+        self.addCleanup(outside.cleanup)
+        analyze = ["--analyze-relative-word-frequency", "--mode", "article",
+                   "--count", "3", "--chart"]
+        for argv in (analyze + [os.path.join(outside.name, "top.txt")],
+                     analyze + ["../top.txt"],
+                     ["--table", "../Team_Magma", "--number", "2"]):
+            with self.subTest(argv=argv):
+                answer = self.send(*argv)
+                self.assertEqual("Invalid command", answer["error"])
+                self.assertNotIn("output", answer)
+        self.assertEqual([], os.listdir(outside.name))
+
+        # the client's directory must be in the server's one
+        table = ["--table", "Team_Magma", "--number", "2"]
+        os.symlink(outside.name, os.path.join(self.directory.name, "link"))
+        for cwd in ("relative", outside.name, "/",
+                    os.path.join(self.directory.name, "link")):
+            with self.subTest(cwd=cwd):
+                answer = send_command(self.address, table, cwd=cwd)
+                self.assertEqual("Invalid command", answer["error"])
+        self.assertEqual([], os.listdir(outside.name))
+
+        # commands which write no files run anywhere
+        answer = send_command(self.address, ["--summary", "Pikachu"],
+                              cwd=outside.name)
+        self.assertTrue(answer["ok"])
+
+    def test_keep_alive_after_not_found(self):
+        # the body of a request which isn't served is read as well
+        body = json.dumps({"argv": ["--summary", "Pikachu"]})
+        headers = {"Content-Type": "application/json"}
+        connection = HTTPConnection(self.address, timeout=10)
+        try:
+            for path, status in (("/other", 404), ("/run", 200)):
+                connection.request("POST", path, body=body, headers=headers)
+                response = connection.getresponse()
+                self.assertEqual(status, response.status)
+                response.read()
+        finally:
+            connection.close()
+        self.assertEqual(1, self.server.status()["requests"])
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "no Unix sockets")
+class TestUnixSocket(unittest.TestCase):
+    def test_serving_on_socket(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                LocalWikiServer() as wiki:
+            path = os.path.join(directory, "wiki.sock")
+            with WikiServer(base_url=wiki.base_url, socket_path=path,
+                            output_root=directory) as server:
+                self.assertEqual(f"unix:{path}", server.url)
+                # only its owner can connect
+                self.assertEqual(0o600, stat.S_IMODE(os.stat(path).st_mode))
+
+                answer = send_command(server.url, ["--summary", "Pikachu"],
+                                      cwd=directory)
+                self.assertTrue(answer["ok"])
+                self.assertIn("first paragraph", answer["output"])
+            self.assertFalse(os.path.exists(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
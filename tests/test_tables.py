@@ -0,0 +1,228 @@
+# tests/test_tables.py
+# Unit tests for the table-extraction engine (`tables.py`):
+# 1. the same DataFrames as `pandas.read_html` (spans, headers, footers,
+#    line breaks, hidden elements, number parsing),
+# 2. numbering of nested tables and their cells,
+# 3. many tables in one call (`Article.get_tables`) with every backend,
+# 4. value counts per column, the same as of the flattened table,
+# 5. output formats of `--table` (Parquet and Feather need pyarrow).
+import os
+import tempfile
+import unittest
+from argparse import Namespace
+from contextlib import redirect_stdout
+from importlib.util import find_spec
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+
+import lxml.html
+import numpy as np
+from pandas import DataFrame, Series, read_csv, read_html
+from pandas.testing import assert_series_equal
+
+from wiki_scraper.article import Article
+from wiki_scraper.controller import Controller
+from wiki_scraper.exceptions import MissingDependency
+from wiki_scraper.parsers import PARSERS
+from wiki_scraper.tables import (TABLE_FORMATS, check_table_format,
+                                 parse_table, table_to_frame, value_counts,
+                                 write_table)
+
+sample_data = Path(__file__).resolve().parent / "sample_data"
+
+TRICKY_TABLES = {
+    "rowspan": "<table><tr><th>a</th><th>b</th></tr>"
+               "<tr><td rowspan=2>1</td><td>2</td></tr>"
+               "<tr><td>3</td></tr></table>",
+    "header and footer": "<table><thead><tr><th colspan=2>Top</th></tr>"
+                         "<tr><th>x</th><th>y</th></tr></thead>"
+                         "<tbody><tr><td>1,000</td><td>n/a</td></tr>"
+                         "<tr><td>2.5</td><td>NaN</td></tr></tbody>"
+                         "<tfoot><tr><td>sum</td><td rowspan=3>z</td></tr>"
+                         "</tfoot></table>",
+    "text": "<table><tr><td>a<br>b</td>"
+            "<td>  c\n\n d <span style='display: none'>hid</span>e</td></tr>"
+            "<tr style='display:none'><td>h</td><td>h</td></tr>"
+            "<tr><td>x<style>.a{}</style>y</td><td>1</td><td>more</td></tr>"
+            "</table>",
+    "thead without tr": "<table><thead><th>A</th><th>B</th></thead>"
+                        "<tr><td>1</td><td>2</td></tr></table>",
+    "row headers": "<table><tr><th></th><th>h</th></tr>"
+                   "<tr><th>r</th><td>1</td></tr></table>",
+}
+
+
+def engine_frame(html: str):
+    return table_to_frame(parse_table(lxml.html.fragment_fromstring(html)))
+
+
+class TestTableEngine(unittest.TestCase):
+    def assertSameFrame(self, expected, actual):
+        self.assertEqual(list(expected.columns), list(actual.columns))
+        self.assertTrue(expected.equals(actual), f"\n{expected}\n{actual}")
+
+    # 1. Same results as `read_html`
+    def test_tricky_tables(self):
+        for name, html in TRICKY_TABLES.items():
+            with self.subTest(table=name):
+                self.assertSameFrame(read_html(StringIO(html))[0],
+                                     engine_frame(html))
+
+    def test_sample_data(self):
+        for path in sorted(sample_data.glob("*.html")):
+            html = path.read_text(encoding="utf-8")
+            tables = Article(html, "Sample").get_tables()
+            with self.subTest(page=path.name):
+                for index, table in tables.items():
+                    expected = read_html(StringIO(html))[index - 1]
+                    self.assertSameFrame(expected, table)
+
+    def test_cells(self):
+        header, body, footer = parse_table(lxml.html.fragment_fromstring(
+            TRICKY_TABLES["header and footer"]
+        ))
+        self.assertEqual([["Top", "Top"], ["x", "y"]], header)
+        self.assertEqual([["1,000", "n/a"], ["2.5", "NaN"]], body)
+        # a cell spanning rows below the footer makes rows of its own
+        self.assertEqual([["sum", "z"], ["z"], ["z"]], footer)
+
+    def test_table_without_text(self):
+        self.assertTrue(engine_frame("<table><tr><td></td></tr></table>")
+                        .empty)
+
+    # 2. Nested tables
+    def test_nested_tables(self):
+        html = ('<div class="mw-content-ltr mw-parser-output">'
+                "<table><tr><th>outer</th></tr><tr><td>a"
+                "<table><tr><th>inner</th></tr><tr><td>1</td></tr></table>"
+                "</td></tr></table>"
+                "<table><tr><th>last</th></tr><tr><td>2</td></tr></table>"
+                "</div>")
+        tables = Article(html, "Nested").get_tables()
+
+        self.assertEqual([1, 2, 3], list(tables))
+        # rows of the inner table are not rows of the outer one
+        self.assertEqual(["outer"], list(tables[1].columns))
+        self.assertEqual(["ainner1"], tables[1]["outer"].tolist())
+        self.assertEqual([1], tables[2]["inner"].tolist())
+        self.assertEqual([2], tables[3]["last"].tolist())
+
+    # 3. Many tables at once
+    def test_chosen_tables(self):
+        html = (sample_data / "table_simple_1.html").read_text("utf-8")
+        everything = Article(html, "Sample").get_tables()
+        self.assertEqual([1, 2], list(everything))
+
+        for parser in PARSERS:
+            with self.subTest(parser=parser):
+                # lazy scan and the full tree
+                lazy = Article(html, "Sample", parser=parser)
+                full = Article(html, "Sample", parser=parser)
+                full.container
+
+                for article in (lazy, full):
+                    chosen = article.get_tables([2, 7, 0, 2])
+                    self.assertEqual([2], list(chosen))
+                    self.assertTrue(everything[2].equals(chosen[2]))
+                    self.assertEqual({}, article.get_tables([]))
+
+
+def flattened_counts(df):
+    # The former way of `--table`
+    return Series(df.values.ravel()).value_counts()
+
+
+class TestValueCounts(unittest.TestCase):
+    # 4. Value counts
+    def test_sample_data(self):
+        for path in sorted(sample_data.glob("*.html")):
+            html = path.read_text(encoding="utf-8")
+            for index, table in Article(html, "Sample").get_tables().items():
+                with self.subTest(page=path.name, table=index):
+                    assert_series_equal(flattened_counts(table),
+                                        value_counts(table))
+
+    def test_mixed_columns(self):
+        tables = [
+            # equal counts in the order of first appearance, row by row
+            DataFrame({"a": ["b", "a", "c"], "b": ["a", "b", "d"]}),
+            # `1` and `1.0` are one value, `NaN`s are skipped
+            DataFrame({"a": [1, 2, 2], "b": [1.0, np.nan, 2.5]}),
+            DataFrame([[1, "1"], [np.nan, None]], columns=["x", "x"]),
+            DataFrame({"a": [np.nan, np.nan]}),
+            DataFrame({"a": [], "b": []}),
+            DataFrame(),
+        ]
+        for i, table in enumerate(tables):
+            with self.subTest(table=i):
+                assert_series_equal(flattened_counts(table),
+                                    value_counts(table))
+
+        counts = value_counts(tables[0])
+        self.assertEqual(["b", "a", "c", "d"], counts.index.tolist())
+        self.assertEqual([2, 2, 1, 1], counts.tolist())
+
+
+class TestTableFormats(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.table = DataFrame({"Type": ["Fire", "Water", "Fire"],
+                                "Power": [90, 110, 40]})
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory.name, name)
+
+    # 5. Output formats
+    def test_csv(self):
+        write_table(self.table, self.path("t.csv"))
+        self.assertTrue(self.table.equals(read_csv(self.path("t.csv"))))
+
+    @unittest.skipUnless(find_spec("pyarrow"), "pyarrow is not installed")
+    def test_columnar_formats(self):
+        from pandas import read_feather, read_parquet
+
+        write_table(self.table, self.path("t.parquet"), fmt="parquet")
+        write_table(self.table, self.path("t.feather"), fmt="feather")
+        self.assertTrue(self.table.equals(
+            read_parquet(self.path("t.parquet"))))
+        self.assertTrue(self.table.equals(
+            read_feather(self.path("t.feather"))))
+
+    def test_missing_dependency(self):
+        with patch("wiki_scraper.tables.find_spec", return_value=None):
+            check_table_format("csv")
+            for fmt in ("parquet", "feather"):
+                with self.assertRaises(MissingDependency):
+                    check_table_format(fmt)
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            write_table(self.table, self.path("t.xlsx"), fmt="xlsx")
+
+    def test_handle_table(self):
+        html = (sample_data / "table_simple_1.html").read_text("utf-8")
+        article = Article(html, "Sample")
+        formats = [fmt for fmt in TABLE_FORMATS
+                   if fmt == "csv" or find_spec("pyarrow")]
+
+        for fmt in formats:
+            with self.subTest(format=fmt):
+                args = Namespace(cmd="table", number=2, format=fmt,
+                                 phrase=self.path("Sample"))
+                controller = Controller(args)
+                controller.article = article
+                output = StringIO()
+                with redirect_stdout(output):
+                    controller.run()
+
+                self.assertTrue(os.path.exists(self.path("Sample." + fmt)))
+                expected = flattened_counts(article.get_table_by_index(2))
+                self.assertEqual(str(expected) + "\n", output.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
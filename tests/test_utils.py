@@ -1,12 +1,21 @@
 # tests/test_utils.py
 # Unit tests for functions in `utils.py`:
 # 1. updating `word_counts.json` file,
+# 2. batched, append-only `WordCountStore`,
+# 3. its binary, memory-mapped snapshot of the totals,
+# 4. atomic writes keeping the mode of files.
 import unittest
 from wiki_scraper.utils import update_word_counts
 from wiki_scraper.utils import dict_path
 from wiki_scraper.utils import analyze_relative_word_freq
+from wiki_scraper.utils import WordCountStore
+from wiki_scraper.utils import atomic_write
+from pathlib import Path
 import os
 import json
+import tempfile
+from unittest import mock
+import numpy as np
 
 
 class TestUpdatingWordCounts(unittest.TestCase):
@@ -36,7 +45,8 @@ class TestUpdatingWordCounts(unittest.TestCase):
         with open(dict_path, "r", encoding="utf-8") as f:
             data = json.load(f)
 
-        expected_data = {"hello": 2, "world": 3, "new": 1}
+        # counts are added, not overwritten
+        expected_data = {"hello": 2, "world": 7, "new": 1}
         self.assertEqual(expected_data, data)
 
     def test_update_word_counts_multiple_calls(self):
@@ -51,7 +61,7 @@ class TestUpdatingWordCounts(unittest.TestCase):
         with open(dict_path, "r", encoding="utf-8") as f:
             data2 = json.load(f)
 
-        expected_data = {"hello": 5, "world": 1, "python": 3}
+        expected_data = {"hello": 7, "world": 1, "python": 3}
         self.assertEqual(expected_data, data2)
 
     def test_update_word_counts_polish_characters(self):
@@ -65,6 +75,189 @@ class TestUpdatingWordCounts(unittest.TestCase):
         self.assertEqual(to_add, data)
 
 
+class TestWordCountStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "word-counts.json"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_updates_are_buffered(self):
+        store = WordCountStore(self.path, flush_every=3)
+        store.add({"a": 1})
+        store.add({"a": 2, "b": 1})
+
+        self.assertFalse(store.log_path.exists())
+        self.assertEqual({"a": 3, "b": 1}, store.load())
+
+        store.add({"c": 1})
+        self.assertTrue(store.log_path.exists())
+        self.assertFalse(self.path.exists())
+
+    def test_close_compacts_log(self):
+        with WordCountStore(self.path, flush_every=1) as store:
+            for _ in range(5):
+                store.add({"pikachu": 2, "ash": 1})
+
+        self.assertEqual({"pikachu": 10, "ash": 5}, self.read())
+        self.assertFalse(store.log_path.exists())
+
+    def test_compaction_on_log_size(self):
+        store = WordCountStore(self.path, flush_every=1, compact_bytes=50)
+        for i in range(10):
+            store.add({f"word{i}": 1, "common": 1})
+
+        self.assertTrue(self.path.exists())
+        self.assertEqual(10, store.load()["common"])
+
+    def test_log_is_read_by_other_instance(self):
+        store = WordCountStore(self.path, flush_every=1)
+        store.add({"team": 1})
+        store.add({"team": 2, "rocket": 1})
+
+        self.assertEqual({"team": 3, "rocket": 1},
+                         WordCountStore(self.path).load())
+
+    def test_truncated_log_line_is_ignored(self):
+        store = WordCountStore(self.path, flush_every=1)
+        store.add({"team": 1})
+        with open(store.log_path, "a", encoding="utf-8") as f:
+            f.write('{"team": 10, "ro')
+
+        self.assertEqual({"team": 1}, WordCountStore(self.path).load())
+
+    def compact_until(self, store, crash_in: str):
+        # The compaction is interrupted when it calls `crash_in`
+        with mock.patch(crash_in, side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                store.compact()
+        self.assertTrue(store.old_log_path.exists())
+
+    def test_interrupted_compaction_is_not_double_counted(self):
+        for crash_in in ("wiki_scraper.utils.atomic_write",
+                         "wiki_scraper.utils.WordCountStore._write_snapshot"):
+            with self.subTest(crash_in=crash_in):
+                for path in Path(self.tmp.name).glob("word-counts.json*"):
+                    if path.is_file():
+                        path.unlink()
+                with WordCountStore(self.path) as store:
+                    store.add({"team": 1})
+                store = WordCountStore(self.path, flush_every=1)
+                store.add({"team": 1})
+                # before or after the JSON file is written
+                self.compact_until(store, crash_in)
+
+                store = WordCountStore(self.path, flush_every=1)
+                self.assertEqual({"team": 2}, store.load())
+                self.assertEqual(2, store.total())
+                store.add({"team": 1})
+                store.close()
+                self.assertEqual({"team": 3}, self.read())
+                self.assertFalse(store.old_log_path.exists())
+
+    def test_compaction_within_one_mtime_tick(self):
+        # coarse timestamps give both files the same mtime
+        store = WordCountStore(self.path, flush_every=1)
+        store.add({"x": 1})
+        store.compact()
+        store.add({"x": 1})
+        stamp = self.path.stat().st_mtime_ns
+        os.utime(store.log_path, ns=(stamp, stamp))
+        store.close()
+
+        self.assertEqual({"x": 2}, WordCountStore(self.path).load())
+
+
+class TestWordCountSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "word-counts.json"
+        with WordCountStore(self.path) as store:
+            store.add({"team": 2, "rocket": 7, "łódź": 3})
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_snapshot_written_on_compaction(self):
+        store = WordCountStore(self.path)
+        self.assertTrue((store.snapshot_dir / "words.npy").exists())
+
+        # the snapshot is up to date, so it isn't rebuilt from the JSON file
+        with mock.patch.object(WordCountStore, "_write_snapshot",
+                               side_effect=AssertionError("rebuilt")):
+            self.assertEqual(12, store.total())
+            self.assertEqual([("rocket", 7), ("łódź", 3)], store.top(2))
+            self.assertEqual({"team": 2, "ash": 0},
+                             store.lookup(["team", "ash"]))
+
+        _, counts, _ = store._snapshot_with_delta()
+        self.assertIsInstance(counts, np.memmap)
+
+    def test_changed_json_rebuilds_snapshot(self):
+        # e.g. a file written by an older version
+        self.path.write_text(json.dumps({"team": 1, "misty": 4}, indent=4),
+                             encoding="utf-8")
+
+        store = WordCountStore(self.path)
+        self.assertEqual([("misty", 4), ("team", 1)], store.top(5))
+        self.assertEqual(5, store.total())
+
+    def test_missing_snapshot_is_rebuilt(self):
+        store = WordCountStore(self.path)
+        for file_path in store.snapshot_dir.iterdir():
+            file_path.unlink()
+
+        self.assertEqual(12, store.total())
+        self.assertTrue((store.snapshot_dir / "stamp.json").exists())
+
+    def test_pending_and_logged_updates_are_counted(self):
+        store = WordCountStore(self.path, flush_every=1)
+        store.add({"team": 10, "ash": 1})
+        store.flush_every = 100
+        store.add({"ash": 1, "brock": 7})
+
+        self.assertEqual(31, store.total())
+        self.assertEqual([("team", 12), ("brock", 7), ("rocket", 7)],
+                         store.top(3))
+        self.assertEqual({"ash": 2, "misty": 0},
+                         store.lookup(["ash", "misty"]))
+        self.assertEqual(store.load(), dict(store.top(10)))
+
+
+@unittest.skipIf(os.name == "nt", "no Unix file modes")
+class TestAtomicWrite(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "word-counts.json"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def mode(self):
+        return self.path.stat().st_mode & 0o777
+
+    def test_mode_of_new_file(self):
+        # the same as a file created with `open`
+        reference = Path(self.tmp.name) / "reference"
+        reference.write_bytes(b"")
+        atomic_write(self.path, b"{}")
+        self.assertEqual(reference.stat().st_mode & 0o777, self.mode())
+
+    def test_mode_of_replaced_file_is_kept(self):
+        self.path.write_bytes(b"{}")
+        for mode in (0o640, 0o664):
+            with self.subTest(mode=oct(mode)):
+                self.path.chmod(mode)
+                atomic_write(self.path, b'{"a": 1}')
+                self.assertEqual(mode, self.mode())
+                self.assertEqual(b'{"a": 1}', self.path.read_bytes())
+
+
 class TestAnalyzeRelativeWordFreq(unittest.TestCase):
     def test_analyze_relative_word_freq_article(self):
         analyze_relative_word_freq(mode="article", n=10, chart_path="chart_a.png")
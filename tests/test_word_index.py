@@ -0,0 +1,88 @@
+# tests/test_word_index.py
+# Unit tests for class `SqliteWordCountStore`:
+# 1. replacing counts of recounted articles,
+# 2. queries (totals, top words, lookups, provenance),
+# 3. same answers as the JSON `WordCountStore`.
+import tempfile
+import unittest
+from pathlib import Path
+
+from wiki_scraper.utils import WordCountStore, get_word_count_store
+from wiki_scraper.word_index import SqliteWordCountStore
+
+
+class TestSqliteWordCountStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "word-counts.sqlite3"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    # 1. Replacing counts
+    def test_recounted_article_is_replaced(self):
+        with SqliteWordCountStore(self.path) as store:
+            store.add({"pikachu": 3, "ash": 1}, article="Pikachu")
+            store.add({"rocket": 2}, article="Team Rocket")
+            store.add({"pikachu": 4}, article="Pikachu")
+
+            self.assertEqual({"pikachu": 4, "rocket": 2}, store.load())
+            self.assertEqual(6, store.total())
+
+    def test_counts_without_article_are_added(self):
+        with SqliteWordCountStore(self.path) as store:
+            store.add({"a": 1})
+            store.add({"a": 2, "b": 1})
+            self.assertEqual({"a": 3, "b": 1}, store.load())
+
+    def test_persists_between_instances(self):
+        with SqliteWordCountStore(self.path, flush_every=100) as store:
+            store.add({"meowth": 5}, article="Meowth")
+
+        with SqliteWordCountStore(self.path) as store:
+            self.assertEqual({"meowth": 5}, store.load())
+
+    # 2. Queries
+    def test_top_and_lookup(self):
+        with SqliteWordCountStore(self.path) as store:
+            store.add({"a": 5, "b": 2, "c": 7}, article="X")
+            store.add({"b": 4}, article="Y")
+
+            self.assertEqual([("c", 7), ("b", 6)], store.top(2))
+            self.assertEqual({"a": 5, "zzz": 0}, store.lookup(["a", "zzz"]))
+
+    def test_lookup_of_many_words(self):
+        words = [f"w{i}" for i in range(1200)]
+        with SqliteWordCountStore(self.path) as store:
+            store.add(dict.fromkeys(words, 1), article="Long")
+            self.assertEqual(dict.fromkeys(words, 1), store.lookup(words))
+
+    def test_articles_with(self):
+        with SqliteWordCountStore(self.path) as store:
+            store.add({"team": 1, "rocket": 3}, article="Jessie")
+            store.add({"rocket": 5}, article="Team Rocket")
+            store.add({"pikachu": 1}, article="Pikachu")
+
+            self.assertEqual([("Team Rocket", 5), ("Jessie", 3)],
+                             store.articles_with("rocket"))
+            self.assertEqual([], store.articles_with("mewtwo"))
+
+    # 3. Same answers as the JSON store
+    def test_same_answers_as_json_store(self):
+        updates = [({"a": 1, "b": 2}, "X"), ({"b": 3, "c": 9}, "Y")]
+        json_store = WordCountStore(Path(self.tmp.name) / "wc.json")
+        sqlite_store = get_word_count_store("sqlite", self.path)
+
+        for store in (json_store, sqlite_store):
+            with store:
+                for counts, article in updates:
+                    store.add(counts, article=article)
+
+                self.assertEqual({"a": 1, "b": 5, "c": 9}, store.load())
+                self.assertEqual(15, store.total())
+                self.assertEqual([("c", 9), ("b", 5)], store.top(2))
+                self.assertEqual({"a": 1, "d": 0}, store.lookup(["a", "d"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
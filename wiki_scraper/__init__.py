@@ -1,10 +1,17 @@
 # Package `wiki_scraper` implemented by Mateusz Burza.
 # It can be used to perform certain scraping operations and analyze some data.
-from wiki_scraper.scraper import Scraper
-from wiki_scraper.article import Article
-from wiki_scraper.controller import Controller
-from wiki_scraper.exceptions import ArticleNotFound
-from wiki_scraper.cli import get_args
+# Names below are imported on first use (module-level `__getattr__`),
+# so importing the package, or one of its modules, doesn't load
+# requests, lxml, pandas, matplotlib or wordfreq by itself.
+from importlib import import_module
+
+_LAZY_NAMES = {
+    "Scraper": "wiki_scraper.scraper",
+    "Article": "wiki_scraper.article",
+    "Controller": "wiki_scraper.controller",
+    "ArticleNotFound": "wiki_scraper.exceptions",
+    "get_args": "wiki_scraper.cli",
+}
 
 __all__ = [
     "Scraper",
@@ -13,3 +20,17 @@ __all__ = [
     "ArticleNotFound",
     "get_args",
 ]
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_NAMES:
+        raise AttributeError(f"module '{__name__}' has no attribute "
+                             f"'{name}'")
+    value = getattr(import_module(_LAZY_NAMES[name]), name)
+    # later lookups don't go through `__getattr__`
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
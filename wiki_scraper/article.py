@@ -1,68 +1,129 @@
 # Module containing implementation of class `Article`.
 # This class represents an article
 # and is responsible for parsing scrapped content.
+# Parsing itself is delegated to a backend from `wiki_scraper.parsers`.
 from collections import Counter
-from bs4 import BeautifulSoup
-from pandas import DataFrame, read_html
-from re import findall, sub
-from io import StringIO
+from re import compile, sub
+from wiki_scraper.parsers import DEFAULT_PARSER, get_parser
 
+# Marks a container which wasn't looked for yet
+_NOT_PARSED = object()
 
-class Article:
-    def __init__(self, html_content, phrase: str):
-        self.html_content = html_content
-        self.phrase = phrase
-        self._parsed_content = BeautifulSoup(self.html_content, "html.parser")
+# regex looking for words, allowing internal apostrophes
+WORD_PATTERN = compile(r"[A-Za-z]+(?:'[A-Za-z]+)*")
 
-        temp_container = self._parsed_content.find(
-            "div", class_="mw-content-ltr mw-parser-output"
-        )
+# Text nodes are counted in batches of about that many characters
+COUNT_BATCH_SIZE = 64 * 1024
 
-        if temp_container is None:
-            self.container = None
-            return
 
-        # Cleans unwanted tags from the container
-        # (stored as nodes in the BeautifulSoup tree)
-        for tag in temp_container.find_all(["style", "script"]):
-            tag.decompose()
-
-        self.container = temp_container
+class Article:
+    def __init__(self, html_content, phrase: str, parser=DEFAULT_PARSER):
+        # `html_content` is a `str` or UTF-8 bytes (e.g. a memory-mapped
+        # file), which are handed to the parser without decoding.
+        self._source = html_content
+        self._html_content = (html_content if isinstance(html_content, str)
+                              else None)
+        self.phrase = phrase
+        self.parser = get_parser(parser)
+
+        # Parsing is lazy: the whole clean tree is built on first access
+        # to `container`; a single paragraph or table is found
+        # by a scan which stops early.
+        self._container = _NOT_PARSED
+
+    @property
+    def html_content(self) -> str:
+        # Decoded only when somebody asks for the text of the page
+        if self._html_content is None:
+            self._html_content = str(self._source, "utf-8")
+        return self._html_content
+
+    @property
+    def container(self):
+        # Article's content (without `<style>` and `<script>` tags)
+        # as a node of the backend's tree, or `None` if not found.
+        if self._container is _NOT_PARSED:
+            self._container = self.parser.parse(self._source)
+        return self._container
 
     def get_first_paragraph(self) -> str:
-        if self.container is not None:
-            paragraph = self.container.find("p")
-            if paragraph is not None:
-                text = paragraph.get_text(separator=" ", strip=True)
-
-                # Remove spaces before punctuation marks
-                return sub(r'\s+([.,!?;:)])', r'\1', text)
+        if self._container is _NOT_PARSED:
+            text = self.parser.scan_first_paragraph(self._source)
+        elif self._container is not None:
+            text = self.parser.first_paragraph(self._container)
+        else:
+            text = None
+
+        if text is not None:
+            # Remove spaces before punctuation marks
+            return sub(r'\s+([.,!?;:)])', r'\1', text)
         return ""
 
-    def get_table_by_index(self, index: int) -> DataFrame:
-        if self.container is None:
-            return DataFrame()
+    def get_table_by_index(self, index: int):
+        # Returns a `DataFrame` (empty if there is no such table)
+        from pandas import DataFrame
 
-        tables = self.container.find_all("table")
+        return self.get_tables([index]).get(index, DataFrame())
 
-        if index < 1 or index > len(tables):
-            return DataFrame()
+    def get_tables(self, indices=None) -> dict:
+        # DataFrames of tables number `indices` (counted from 1, nested
+        # tables included), or of all tables if `None`, by number.
+        # Tables are found in one walk and read from the parsed cells
+        # (see `wiki_scraper.tables`); missing numbers are left out.
+        from wiki_scraper.tables import parse_table, table_to_frame
 
-        nth_table = tables[index - 1]
-        # function from `pandas`
-        df = read_html(StringIO(str(nth_table)))[0]
-        return df
+        if self._container is _NOT_PARSED:
+            tables = self.parser.scan_tables(self._source, indices)
+        elif self._container is not None:
+            tables = self.parser.pick_tables(
+                self.parser.tables(self._container), indices
+            )
+        else:
+            tables = {}
+
+        return {index: table_to_frame(parse_table(table))
+                for index, table in tables.items()}
 
     def count_words(self) -> dict[str, int]:
-        if self.container is None:
+        # Text nodes are stripped and joined with spaces, so no word spans
+        # two nodes; they are counted in small batches instead of building
+        # the text of the whole article. Without a built tree,
+        # the page is streamed instead.
+        if self._container is _NOT_PARSED:
+            strings = self.parser.scan_strings(self._source)
+        elif self._container is not None:
+            strings = self.parser.strings(self._container)
+        else:
             return {}
 
-        text = self.container.get_text(separator=" ", strip=True)
+        counts = Counter()
+        batch = []
+        batch_size = 0
+        for text in strings:
+            batch.append(text)
+            batch_size += len(text)
 
-        # regex looking for words, allowing internal apostrophes
-        pattern = r"[A-Za-z]+(?:'[A-Za-z]+)*"
-        words = findall(pattern, text.lower())
+            if batch_size >= COUNT_BATCH_SIZE:
+                counts.update(_find_words(batch))
+                batch = []
+                batch_size = 0
+        counts.update(_find_words(batch))
 
         # creates needed dictionary
-        return dict(Counter(words))
-        
\ No newline at end of file
+        return dict(counts)
+
+    def get_wiki_links(self) -> list[str]:
+        # Returns hrefs of links to other articles (in document order),
+        # skipping special pages like `File:` or `Category:`.
+        if self.container is None:
+            return []
+
+        links = []
+        for href in self.parser.links(self.container):
+            if href.startswith("/wiki/") and ':' not in href:
+                links.append(href)
+        return links
+
+
+def _find_words(strings: list[str]) -> list[str]:
+    return WORD_PATTERN.findall(" ".join(strings).lower())
@@ -0,0 +1,145 @@
+# Module containing the batch mode (the `batch` command).
+# Jobs are commands of the CLI, one per line of a file or of stdin
+# (e.g. `--summary "Team Rocket"` or `table Pikachu --number 2`);
+# empty lines and lines starting with `#` are skipped.
+# All jobs run in this process through `Controller`s sharing one HTTP
+# pool, page cache and word-count store (one per backend), so
+# interpreter start-up and imports are paid once. Articles are
+# downloaded ahead, `concurrency` at a time, while jobs run one by one
+# in their order (so outputs and store updates keep that order).
+# A job which fails (e.g. its article is not found) is reported
+# and the remaining ones run anyway.
+import shlex
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from wiki_scraper.cli import BATCH_COMMANDS, parse_command_quietly
+from wiki_scraper.controller import Controller
+from wiki_scraper.exceptions import describe_error, reported_error_types
+from wiki_scraper.utils import BULBAPEDIA_URL, get_word_count_store
+
+# Commands whose article is downloaded ahead
+ARTICLE_COMMANDS = ("summary", "table", "count-words")
+
+
+def open_jobs(path: str):
+    # Lines of the file of jobs; `-` is the standard input
+    if path == "-":
+        return nullcontext(sys.stdin)
+    return open(path, encoding="utf-8")
+
+
+def read_jobs(lines):
+    # Yields (line number, line, arguments, error); the arguments are
+    # `None` if the line isn't a valid command, and the error tells why
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            args, error = parse_command_quietly(shlex.split(line))
+        except ValueError as e:
+            # e.g. unbalanced quotes
+            args, error = None, str(e)
+        if args is not None and args.cmd not in BATCH_COMMANDS:
+            # e.g. `batch` or `serve`, which would block the batch
+            args, error = None, (f"`{args.cmd}` can't run in a batch, "
+                                 f"choose one of: "
+                                 f"{', '.join(BATCH_COMMANDS)}.")
+        yield number, line, args, error
+
+
+def run_batch(jobs, concurrency: int = 4, base_url=BULBAPEDIA_URL,
+              session=None, cache=None) -> dict[str, int]:
+    # Runs jobs of `read_jobs`; returns counts of jobs (run and failed)
+    from wiki_scraper.session import HttpPool
+
+    concurrency = max(1, concurrency)
+    own_session = session is None
+    if own_session:
+        session = HttpPool(pool_size=concurrency)
+    fetcher = (base_url, session, cache)
+
+    stores = {}
+    # downloads by article, shared by jobs waiting for the same one
+    downloads = {}
+    # jobs read but not run yet, oldest first
+    pending = deque()
+    jobs = iter(jobs)
+    stats = {"jobs": 0, "failed": 0}
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        try:
+            while True:
+                # downloads run at most `2 * concurrency` jobs ahead
+                while len(pending) < 2 * concurrency:
+                    job = next(jobs, None)
+                    if job is None:
+                        break
+                    key = _article_key(job[2])
+                    if key is not None and key not in downloads:
+                        downloads[key] = executor.submit(download_article,
+                                                         *key, *fetcher)
+                    pending.append((job, key))
+                if not pending:
+                    break
+
+                job, key = pending.popleft()
+                download = downloads.get(key)
+                if key is not None and all(key != other
+                                           for _, other in pending):
+                    # no other job needs the article any more
+                    del downloads[key]
+
+                stats["jobs"] += 1
+                if not _run_job(job, download, cache, stores):
+                    stats["failed"] += 1
+        finally:
+            for _, key in pending:
+                if key in downloads:
+                    downloads.pop(key).cancel()
+            for store in stores.values():
+                store.close()
+            if own_session:
+                session.close()
+    return stats
+
+
+def _article_key(args):
+    # (phrase, fetch mode) of the article the job needs, if any
+    if args is None or args.cmd not in ARTICLE_COMMANDS:
+        return None
+    return args.phrase, getattr(args, "fetch", "html")
+
+
+def download_article(phrase: str, fetch_mode: str, base_url: str, session,
+                     cache):
+    # Runs in a worker thread; the article is parsed lazily by the job
+    from wiki_scraper.scraper import Scraper
+
+    return Scraper(phrase=phrase, base_url=base_url, session=session,
+                   cache=cache, fetch_mode=fetch_mode).scrape()
+
+
+def _run_job(job, download, cache, stores) -> bool:
+    # Runs one job and reports its errors; returns whether it succeeded
+    number, line, args, error = job
+    print(f"\n[{number}] {line}")
+    if args is None:
+        print(f"ERROR (line {number}): Invalid command. Message:\n", error)
+        return False
+
+    try:
+        article = None if download is None else download.result()
+        store = None
+        if hasattr(args, "store"):
+            if args.store not in stores:
+                stores[args.store] = get_word_count_store(args.store)
+            store = stores[args.store]
+        Controller(args, article=article, cache=cache, store=store).run()
+    except reported_error_types() as e:
+        print(f"ERROR (line {number}): {describe_error(e)}. Message:\n",
+              str(e))
+        return False
+    return True
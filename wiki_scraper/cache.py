@@ -0,0 +1,163 @@
+# Module containing implementation of class `PageCache`.
+# It is a persistent, compressed cache of downloaded articles.
+# Pages are stored content-addressed (by SHA-256 of the HTML),
+# so redirects and duplicates share one blob on disk.
+# An index maps normalized phrases to blobs and keeps
+# validators (ETag, Last-Modified), fetch and access times.
+import gzip
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+from wiki_scraper.session import CachedPage
+from wiki_scraper.utils import atomic_write, format_phrase, repo_root
+
+cache_dir = repo_root / ".wiki_cache"
+
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+
+
+class PageCache:
+    index_name = "index.json"
+    # Index is written to disk every that many changes (and on `close`)
+    save_every = 50
+
+    def __init__(self, directory=cache_dir, ttl: float | None = DEFAULT_TTL,
+                 max_bytes: int = DEFAULT_MAX_BYTES, offline=False):
+        # `ttl=None` means that cached pages never expire.
+        # In `offline` mode pages are served from the cache only,
+        # even if they are expired.
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+
+        self._lock = threading.Lock()
+        self._unsaved = 0
+        self._index = self._load_index()
+
+    @staticmethod
+    def key(base_url: str, phrase: str) -> str:
+        return base_url.rstrip("/") + "/" + format_phrase(phrase)
+
+    def get(self, key: str) -> CachedPage | None:
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                return None
+
+            try:
+                with gzip.open(self._blob_path(entry["blob"]), "rb") as f:
+                    text = f.read().decode("utf-8")
+            except (OSError, EOFError, UnicodeDecodeError):
+                # Broken or removed blob -- behave as if it was never cached
+                del self._index[key]
+                self._changed()
+                return None
+
+            entry["accessed"] = time.time()
+            self._changed()
+
+        return CachedPage(
+            text=text,
+            etag=entry.get("etag"),
+            last_modified=entry.get("last_modified"),
+            size=entry["raw_size"],
+            fetched_at=entry["fetched"]
+        )
+
+    def is_fresh(self, page: CachedPage) -> bool:
+        if self.ttl is None:
+            return True
+        return time.time() - page.fetched_at < self.ttl
+
+    def put(self, key: str, page: CachedPage):
+        raw = page.text.encode("utf-8")
+        blob = hashlib.sha256(raw).hexdigest()
+        path = self._blob_path(blob)
+
+        with self._lock:
+            if not path.exists():
+                path.parent.mkdir(parents=True, exist_ok=True)
+                atomic_write(path, gzip.compress(raw))
+
+            now = time.time()
+            self._index[key] = {
+                "blob": blob,
+                "stored_size": path.stat().st_size,
+                "etag": page.etag,
+                "last_modified": page.last_modified,
+                "raw_size": len(raw),
+                "fetched": now,
+                "accessed": now,
+            }
+            self._evict()
+            self._changed()
+
+    def touch(self, key: str):
+        # Marks a revalidated (`304 Not Modified`) page as freshly fetched
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is not None:
+                entry["fetched"] = entry["accessed"] = time.time()
+                self._changed()
+
+    def size(self) -> int:
+        with self._lock:
+            return sum(self._blob_sizes().values())
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def close(self):
+        with self._lock:
+            if self._unsaved > 0:
+                self._save_index()
+
+    def _evict(self):
+        # Removes least recently used entries until blobs fit in `max_bytes`
+        sizes = self._blob_sizes()
+        total = sum(sizes.values())
+        if total <= self.max_bytes:
+            return
+
+        by_access = sorted(self._index,
+                           key=lambda k: self._index[k]["accessed"])
+
+        for key in by_access:
+            if total <= self.max_bytes:
+                break
+            blob = self._index.pop(key)["blob"]
+
+            if all(e["blob"] != blob for e in self._index.values()):
+                total -= sizes.pop(blob, 0)
+                self._blob_path(blob).unlink(missing_ok=True)
+
+    def _blob_sizes(self) -> dict[str, int]:
+        # Blobs shared by several entries are counted once
+        return {e["blob"]: e["stored_size"] for e in self._index.values()}
+
+    def _blob_path(self, blob: str) -> Path:
+        return self.directory / "blobs" / blob[:2] / (blob + ".html.gz")
+
+    def _load_index(self) -> dict:
+        try:
+            with open(self.directory / self.index_name, "r",
+                      encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _changed(self):
+        self._unsaved += 1
+        if self._unsaved >= self.save_every:
+            self._save_index()
+
+    def _save_index(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        data = json.dumps(self._index, ensure_ascii=False).encode("utf-8")
+        atomic_write(self.directory / self.index_name, data)
+        self._unsaved = 0
+
@@ -0,0 +1,138 @@
+# Module containing rendering of relative-frequency charts.
+# Charts are drawn with matplotlib's object-oriented API on the
+# non-interactive Agg canvas (pyplot and GUI backends are never loaded)
+# into PNG or SVG files; a text chart (`.txt`) is an alternative
+# for big N. `ChartRenderer` reuses one figure for many charts
+# (cleared after every chart), so batches don't pile figures up.
+# matplotlib is imported only when the first image is drawn.
+from pathlib import Path
+
+CHART_FORMATS = ("png", "svg", "txt")
+
+# Columns of the table drawn, with their colors
+SERIES = (
+    ("frequency in the article", "royalblue"),
+    ("frequency in the wiki language", "indianred"),
+)
+
+# Width of a chart in inches: it grows with N, but only up to a limit
+MIN_WIDTH = 10
+MAX_WIDTH = 24
+HEIGHT = 6
+
+# Above that many bars labels are turned vertical
+MAX_HORIZONTAL_LABELS = 20
+
+# Width of the longest bar in a text chart (in characters)
+TEXT_BAR_WIDTH = 40
+
+
+def chart_format(path) -> str:
+    # Format of a chart by the suffix of its path (PNG without a suffix)
+    suffix = Path(path).suffix.lower().lstrip(".")
+    if suffix == "":
+        return "png"
+    if suffix not in CHART_FORMATS:
+        raise ValueError(f"Unsupported chart format '.{suffix}', "
+                         f"choose one of: {', '.join(CHART_FORMATS)}.")
+    return suffix
+
+
+class ChartRenderer:
+    def __init__(self, dpi: int = 100):
+        self.dpi = dpi
+        self._figure = None
+
+    def render(self, data, path, title: str = ""):
+        # `data` is a table from `utils.get_relative_freq_table`
+        fmt = chart_format(path)
+        if fmt == "txt":
+            write_text_chart(data, path, title=title)
+            return
+
+        figure = self._get_figure()
+        try:
+            self._draw(figure, data, title)
+            # with no suffix the format isn't known from the path
+            figure.savefig(path, format=fmt, dpi=self.dpi)
+        finally:
+            figure.clear()
+
+    def close(self):
+        if self._figure is not None:
+            self._figure.clear()
+            self._figure = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _get_figure(self):
+        if self._figure is None:
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            from matplotlib.figure import Figure
+
+            self._figure = Figure()
+            FigureCanvasAgg(self._figure)
+        return self._figure
+
+    def _draw(self, figure, data, title: str):
+        words = data["word"].tolist()
+        n = len(words)
+        figure.set_size_inches(min(MAX_WIDTH, max(MIN_WIDTH, n * 0.4)),
+                               HEIGHT)
+
+        axes = figure.add_subplot()
+        width = 0.8 / len(SERIES)
+        for i, (column, color) in enumerate(SERIES):
+            offset = (i - (len(SERIES) - 1) / 2) * width
+            axes.bar([x + offset for x in range(n)],
+                     data[column].tolist(), width=width, color=color,
+                     label=column)
+
+        vertical = n > MAX_HORIZONTAL_LABELS
+        axes.set_xticks(range(n))
+        axes.set_xticklabels(words, rotation=90 if vertical else 0,
+                             fontsize="small" if vertical else None)
+        axes.set_title(title)
+        axes.set_ylabel("Frequency")
+        axes.legend()
+        figure.tight_layout()
+
+
+def write_text_chart(data, path, title: str = ""):
+    # Horizontal bars, one pair per word, scaled to the biggest value
+    words = data["word"].tolist()
+    columns = [data[column].tolist() for column, _ in SERIES]
+    marks = ("#", "=")
+
+    biggest = max((value for values in columns for value in values),
+                  default=0)
+    word_width = max((len(word) for word in words), default=4)
+
+    lines = [title] if title else []
+    lines.append(", ".join(f"'{mark}' {column}"
+                           for mark, (column, _) in zip(marks, SERIES)))
+    for row, word in enumerate(words):
+        for i, (values, mark) in enumerate(zip(columns, marks)):
+            value = values[row]
+            bar = mark * (round(value / biggest * TEXT_BAR_WIDTH)
+                          if biggest > 0 else 0)
+            label = word if i == 0 else ""
+            line = f"{label:<{word_width}}  {value:.3e}  {bar}"
+            lines.append(line.rstrip())
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def render_charts(charts) -> list:
+    # Renders every (data, path, title) with one figure; returns the paths
+    paths = []
+    with ChartRenderer() as renderer:
+        for data, path, title in charts:
+            renderer.render(data, path, title=title)
+            paths.append(path)
+    return paths
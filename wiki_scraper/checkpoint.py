@@ -0,0 +1,123 @@
+# Module containing implementation of class `CrawlCheckpoint`.
+# It saves the state of a crawl (`--auto-count-words`) to disk,
+# so that a crawl which died can be resumed (`--resume`).
+# A checkpoint holds the frontier with the depth of every queued page
+# (including pages taken from it but not committed yet) and the set
+# of seen URLs, and pages which failed for good (missing articles),
+# which aren't retried. It is written right after the word-count store
+# is flushed, and the store doesn't flush by itself in between (its
+# `flush_every` is held while the crawl runs): pages committed before
+# it are counted in the store's files, pages after it are still in the
+# frontier, so nothing is counted twice. Only a crash between the flush
+# and the write of the checkpoint makes `--resume` count the pages
+# since the previous checkpoint again.
+import json
+import math
+from pathlib import Path
+from wiki_scraper.exceptions import (ArticleNotFound, InvalidCheckpoint,
+                                     PageUnavailable)
+from wiki_scraper.utils import atomic_write, repo_root
+
+checkpoint_path = repo_root / "wiki_scraper" / "crawl-checkpoint.json"
+
+# Number of committed pages between two checkpoints
+DEFAULT_EVERY = 50
+
+
+class CrawlCheckpoint:
+    def __init__(self, path=None, every: int = DEFAULT_EVERY,
+                 resume: bool = False):
+        # With `resume` the crawl continues from the checkpoint at `path`,
+        # otherwise a new crawl starts (and overwrites it).
+        self.path = Path(checkpoint_path if path is None else path)
+        self.every = max(1, every)
+        self.resume = resume
+
+        self.params = None
+        self.pages = 0
+        # URLs of pages which failed for good
+        self.failed = []
+        # `flush_every` of the store, given back when the crawl ends
+        self._flush_every = None
+
+    def begin(self, frontier, store, start_url: str, depth: int,
+              base_url: str):
+        # Fills the frontier of a starting crawl; until `stop` or
+        # `finish`, the store is flushed only by `save`
+        self.params = {
+            "start_url": start_url,
+            "depth": depth,
+            "base_url": base_url,
+        }
+        if not self.resume:
+            self.pages = 0
+            self.failed = []
+            frontier.push(start_url, 0)
+        else:
+            state = self._read()
+            if state.get("params") != self.params:
+                raise InvalidCheckpoint(
+                    f"Checkpoint '{self.path}' belongs to another crawl "
+                    f"({state.get('params')})."
+                )
+            self.pages = state["pages"]
+            self.failed = state.get("failed", [])
+            frontier.load(state["frontier"])
+
+        self._flush_every = store.flush_every
+        store.flush_every = math.inf
+
+    def page_done(self, frontier, store, head=()):
+        # Called after every committed page; `head` as in `save`
+        self.pages += 1
+        if self.pages % self.every == 0:
+            self.save(frontier, store, head=head)
+
+    def stop(self, frontier, store, error, current=None, head=()):
+        # Called when the crawl fails with `error` while committing
+        # `current` (a page taken from the frontier, or `None`).
+        # An interrupted page is retried on `--resume`, but a missing
+        # article would fail every `--resume` again, so it's recorded
+        # as failed instead (it stays seen, so it isn't queued again).
+        if current is not None:
+            if isinstance(error, ArticleNotFound) and \
+                    not isinstance(error, PageUnavailable):
+                self.failed.append(current[0])
+            else:
+                head = [current, *head]
+        self.save(frontier, store, head=head)
+        self._release(store)
+
+    def save(self, frontier, store, head=()):
+        # `head` are pages taken from the frontier but not committed
+        store.flush()
+        state = {
+            "params": self.params,
+            "pages": self.pages,
+            "failed": self.failed,
+            "frontier": frontier.dump(head=head),
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(self.path, json.dumps(state).encode("utf-8"))
+
+    def finish(self, store):
+        # The crawl has finished, there is nothing to resume
+        store.flush()
+        self._release(store)
+        self.path.unlink(missing_ok=True)
+
+    def _release(self, store):
+        if self._flush_every is not None:
+            store.flush_every = self._flush_every
+            self._flush_every = None
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise InvalidCheckpoint(f"No checkpoint to resume at "
+                                    f"'{self.path}'.")
+        except ValueError as e:
+            raise InvalidCheckpoint(f"Checkpoint '{self.path}' "
+                                    f"is broken: {e}.")
@@ -2,18 +2,50 @@
 # Here I will parse arguments.
 import sys
 import argparse
-from wiki_scraper.utils import format_phrase
+from contextlib import redirect_stderr, redirect_stdout
+from io import StringIO
+from wiki_scraper.charts import chart_format
+from wiki_scraper.mediawiki import FETCH_MODES
+from wiki_scraper.ratelimit import DEFAULT_MAX_RATE
+from wiki_scraper.tables import TABLE_FORMATS
+from wiki_scraper.utils import format_phrase, STORE_BACKENDS
+
+# Address of the server mode (`serve`, see `server.py`, which isn't
+# imported here: it loads `http.server`) and the commands it serves.
+# Crawls, ingests and batches are too long for a request.
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+SERVED_COMMANDS = ("summary", "table", "count-words",
+                   "analyze-relative-word-frequency")
+# Commands which can be jobs of a batch (`batch.py`): everything
+# but nested batches and servers, which would never finish.
+BATCH_COMMANDS = SERVED_COMMANDS + ("auto-count-words", "ingest")
 
 parser_description = ("USAGE\n"
                       "You should call with one of the following options:\n"
                       "--summary `your_phrase`\n"
-                      "--table `your_phrase` --number n\n"
+                      "--table `your_phrase` --number n"
+                      " [--format `csv`|`parquet`|`feather`]\n"
                       "--count-words `your_phrase`\n"
                       "--analyze-relative-word-frequency"
                       " --mode [`article`, `language`] --count n "
-                      "[-- chart `path.png`]\n"
+                      "[--chart `path.png|svg|txt` ...]\n"
                       "--auto-count-words `your_begin_phrase`"
-                      " --depth n --wait t\n\n"
+                      " --depth n --wait t [--max-rate r] [--concurrency k]"
+                      " [--parse-workers p] [--resolve-titles]\n"
+                      "[--resume] [--checkpoint `path`]"
+                      " [--checkpoint-every n]\n"
+                      "--ingest `dump_dir_or_archive` [--workers n]\n"
+                      "--batch [`jobs_file`|-] [--concurrency k]\n"
+                      "--serve [--host h] [--port p] [--socket `path`]"
+                      " [--output-dir `dir`]"
+                      " (commands are sent by `python -m wiki_scraper.client`)"
+                      "\n\n"
+                      "Commands downloading articles accept:\n"
+                      "[--cache-dir `dir`] [--cache-ttl s] [--cache-size mb]"
+                      " [--offline] [--no-cache] [--fetch `html`|`api`]\n"
+                      "Commands using word counts accept:\n"
+                      "[--store `json`|`sqlite`]\n\n"
                       "Other use cases won't be served.\n")
 
 
@@ -26,8 +58,18 @@ def parse_args(argv: list[str]) -> argparse.Namespace:
 
     sub = parser.add_subparsers(dest="cmd", required=True)
 
+    # options shared by all commands which download articles
+    cache_options = get_cache_options_parser()
+    fetch_options = get_fetch_options_parser()
+    # options shared by all commands which use word counts
+    store_options = get_store_options_parser()
+
     # SUMMARY
-    p_summary = sub.add_parser("summary", help="Get article summary.")
+    p_summary = sub.add_parser(
+        "summary",
+        help="Get article summary.",
+        parents=[cache_options, fetch_options]
+    )
     p_summary.add_argument(
         "phrase",
         type=alphanumeric_phrase,
@@ -35,7 +77,11 @@ def parse_args(argv: list[str]) -> argparse.Namespace:
     )
 
     # TABLE
-    p_table = sub.add_parser("table", help="Get table by index.")
+    p_table = sub.add_parser(
+        "table",
+        help="Get table by index.",
+        parents=[cache_options, fetch_options]
+    )
     p_table.add_argument(
         "phrase",
         type=alphanumeric_phrase,
@@ -47,11 +93,19 @@ def parse_args(argv: list[str]) -> argparse.Namespace:
         help="Index of the table to retrieve.",
         required=True
     )
+    p_table.add_argument(
+        "--format",
+        choices=TABLE_FORMATS,
+        default="csv",
+        help="Format of the saved table (`parquet` and `feather` "
+             "need pyarrow)."
+    )
 
     # COUNT WORDS
     p_count_words = sub.add_parser(
         "count-words",
-        help="Count words in the article."
+        help="Count words in the article.",
+        parents=[cache_options, fetch_options, store_options]
     )
     p_count_words.add_argument(
         "phrase",
@@ -62,7 +116,8 @@ def parse_args(argv: list[str]) -> argparse.Namespace:
     # ANALYZE RELATIVE WORD FREQUENCY
     p_analyze_relative_word_frequency = sub.add_parser(
         "analyze-relative-word-frequency",
-        help="Analyze relative word frequency."
+        help="Analyze relative word frequency.",
+        parents=[store_options]
     )
     p_analyze_relative_word_frequency.add_argument(
         "--mode",
@@ -78,15 +133,18 @@ def parse_args(argv: list[str]) -> argparse.Namespace:
     )
     p_analyze_relative_word_frequency.add_argument(
         "--chart",
-        type=str,
+        type=chart_path,
+        action="append",
         required=False,
-        help="Path to save the generated chart."
+        help="Path to save the generated chart (`.png`, `.svg`, "
+             "or `.txt` for a text chart); may be given many times."
     )
 
     # AUTO COUNT WORDS
     p_auto_count_words = sub.add_parser(
         "auto-count-words",
-        help="Automatically count words starting from a phrase."
+        help="Automatically count words starting from a phrase.",
+        parents=[cache_options, fetch_options, store_options]
     )
     p_auto_count_words.add_argument(
         "phrase",
@@ -105,10 +163,187 @@ def parse_args(argv: list[str]) -> argparse.Namespace:
         required=True,
         help="Wait time between requests."
     )
+    p_auto_count_words.add_argument(
+        "--max-rate",
+        type=float,
+        default=DEFAULT_MAX_RATE,
+        help="Requests per second to the wiki which the crawl doesn't "
+             "exceed when it speeds up (it starts with one per `--wait`)."
+    )
+    p_auto_count_words.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Number of requests kept in flight (1 means serial crawl)."
+    )
+    p_auto_count_words.add_argument(
+        "--parse-workers",
+        type=int,
+        default=0,
+        help="Number of processes parsing pages "
+             "(0 means parsing in the fetching threads)."
+    )
+    p_auto_count_words.add_argument(
+        "--resolve-titles",
+        action="store_true",
+        help="Resolve redirects of links through the wiki's api.php "
+             "(50 titles per request), so no article is crawled twice."
+    )
+    p_auto_count_words.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue the crawl saved in the checkpoint."
+    )
+    p_auto_count_words.add_argument(
+        "--checkpoint",
+        type=str,
+        default=None,
+        help="Path of the crawl checkpoint."
+    )
+    p_auto_count_words.add_argument(
+        "--checkpoint-every",
+        type=int,
+        default=50,
+        help="Number of pages between two checkpoints."
+    )
+
+    # INGEST
+    p_ingest = sub.add_parser(
+        "ingest",
+        help="Count words in a local dump of articles (no HTTP).",
+        parents=[store_options]
+    )
+    p_ingest.add_argument(
+        "path",
+        type=str,
+        help="Directory, tar or zip archive of `.html` files."
+    )
+    p_ingest.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of parsing processes (default: number of cores, "
+             "0 means parsing in this process)."
+    )
+
+    # BATCH
+    p_batch = sub.add_parser(
+        "batch",
+        help="Run many commands (one per line of a file) in one process.",
+        parents=[cache_options]
+    )
+    p_batch.add_argument(
+        "path",
+        type=str,
+        nargs="?",
+        default="-",
+        help="File of jobs, e.g. `--summary \"Team Rocket\"` "
+             "(default: `-`, the standard input)."
+    )
+    p_batch.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Number of articles downloaded at a time."
+    )
+
+    # SERVE
+    p_serve = sub.add_parser(
+        "serve",
+        help="Serve commands over HTTP on localhost (see `client.py`).",
+        parents=[cache_options]
+    )
+    p_serve.add_argument(
+        "--host",
+        type=str,
+        default=DEFAULT_HOST,
+        help="Address to listen on."
+    )
+    p_serve.add_argument(
+        "--port",
+        type=int,
+        default=DEFAULT_PORT,
+        help="Port to listen on."
+    )
+    p_serve.add_argument(
+        "--socket",
+        type=str,
+        default=None,
+        help="Listen on this Unix socket (only you can connect) "
+             "instead of a port."
+    )
+    p_serve.add_argument(
+        "--output-dir",
+        dest="output_root",
+        type=str,
+        default=None,
+        help="Directory commands may write files in "
+             "(default: the current directory)."
+    )
 
     return parser.parse_args(argv)
 
 
+def get_cache_options_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(add_help=False)
+    group = parser.add_argument_group("page cache")
+    group.add_argument(
+        "--cache-dir",
+        type=str,
+        default=None,
+        help="Directory of the on-disk page cache."
+    )
+    group.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=None,
+        help="Seconds after which a cached page is revalidated."
+    )
+    group.add_argument(
+        "--cache-size",
+        type=float,
+        default=None,
+        help="Size cap of the page cache in megabytes."
+    )
+    group.add_argument(
+        "--offline",
+        action="store_true",
+        help="Serve articles from the page cache only."
+    )
+    group.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Don't use the page cache."
+    )
+    return parser
+
+
+def get_fetch_options_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(add_help=False)
+    group = parser.add_argument_group("fetching")
+    group.add_argument(
+        "--fetch",
+        choices=FETCH_MODES,
+        default="html",
+        help="Download whole pages (`html`) or the content only "
+             "through the wiki's api.php (`api`)."
+    )
+    return parser
+
+
+def get_store_options_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(add_help=False)
+    group = parser.add_argument_group("word-count store")
+    group.add_argument(
+        "--store",
+        choices=STORE_BACKENDS,
+        default="json",
+        help="Backend of the word-count store (`sqlite` keeps "
+             "counts per article; recounting an article replaces them)."
+    )
+    return parser
+
+
 def alphanumeric_phrase(phrase: str) -> str:
     chars_to_remove = [' ', '_', '-', '(', ')', 'é', '"', "'", '\'']
 
@@ -127,13 +362,24 @@ def alphanumeric_phrase(phrase: str) -> str:
     return phrase
 
 
+def chart_path(path: str) -> str:
+    try:
+        chart_format(path)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return path
+
+
 def normalize_legacy_flags(argv: list[str]) -> list[str]:
     mapping = {
         "--summary": "summary",
         "--table": "table",
         "--count-words": "count-words",
         "--analyze-relative-word-frequency": "analyze-relative-word-frequency",
-        "--auto-count-words": "auto-count-words"
+        "--auto-count-words": "auto-count-words",
+        "--ingest": "ingest",
+        "--batch": "batch",
+        "--serve": "serve"
     }
 
     if argv and (argv[0] in mapping):
@@ -143,7 +389,13 @@ def normalize_legacy_flags(argv: list[str]) -> list[str]:
 
 def get_args(argv: list[str] | None = None) -> argparse.Namespace:
     raw_argv = sys.argv[1:] if argv is None else argv[1:]
-    _argv = normalize_legacy_flags(raw_argv)
+    return parse_command(raw_argv)
+
+
+def parse_command(argv: list[str]) -> argparse.Namespace:
+    # Arguments of one command (`argv` without the program's name),
+    # e.g. of a job of the batch mode
+    _argv = normalize_legacy_flags(argv)
 
     args = parse_args(_argv)
 
@@ -152,3 +404,18 @@ def get_args(argv: list[str] | None = None) -> argparse.Namespace:
 
     args.phrase = format_phrase(args.phrase)
     return args
+
+
+def parse_command_quietly(argv: list[str]):
+    # (arguments, None) of a valid command, or (None, error) instead
+    # of argparse's usage message and exit
+    messages = StringIO()
+    try:
+        with redirect_stderr(messages), redirect_stdout(messages):
+            return parse_command(argv), None
+    except SystemExit:
+        # the error is on the last line (`--help` has none)
+        reports = [report.split(": error: ", 1)[1]
+                   for report in messages.getvalue().splitlines()
+                   if ": error: " in report]
+        return None, reports[-1] if reports else "Not a command."
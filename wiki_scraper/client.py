@@ -0,0 +1,91 @@
+# Module containing the thin client of the server mode.
+# `python -m wiki_scraper.client [--server HOST:PORT] COMMAND...`
+# takes a command as `wiki_scraper.py` does (e.g. `--summary "Pikachu"`),
+# checks it with the CLI's own parser (so errors and `--help` are
+# the same), sends it to a running `wiki_scraper.py --serve` and prints
+# what the command printed there. `--server unix:PATH` connects to
+# a server listening on a Unix socket (`--serve --socket PATH`).
+# Only the standard library is used, so the client starts quickly.
+import argparse
+import json
+import os
+import socket
+import sys
+from http.client import HTTPConnection, HTTPException
+from wiki_scraper.cli import (DEFAULT_HOST, DEFAULT_PORT, SERVED_COMMANDS,
+                              parse_command)
+
+# Commands may take long (e.g. a download with retries)
+TIMEOUT = 300
+
+
+def get_client_parser() -> argparse.ArgumentParser:
+    # Options of the client itself; the rest is the command
+    parser = argparse.ArgumentParser(add_help=False, allow_abbrev=False)
+    parser.add_argument(
+        "--server",
+        type=str,
+        default=os.environ.get("WIKI_SCRAPER_SERVER",
+                               f"{DEFAULT_HOST}:{DEFAULT_PORT}"),
+        help="Address of the server, `HOST:PORT` or `unix:PATH` "
+             "(default: `WIKI_SCRAPER_SERVER` or the default address "
+             "of `--serve`)."
+    )
+    return parser
+
+
+class UnixHTTPConnection(HTTPConnection):
+    # `HTTPConnection` to a server listening on a Unix socket
+    def __init__(self, socket_path: str, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def send_command(server: str, argv: list[str], cwd=None) -> dict:
+    # Answer of the server to the command (see `server.py`);
+    # errors are answered with JSON as well
+    body = json.dumps({"argv": argv, "cwd": cwd}).encode("utf-8")
+    if server.startswith("unix:"):
+        connection = UnixHTTPConnection(server.removeprefix("unix:"),
+                                        timeout=TIMEOUT)
+    else:
+        connection = HTTPConnection(server, timeout=TIMEOUT)
+    try:
+        connection.request("POST", "/run", body=body,
+                           headers={"Content-Type": "application/json"})
+        return json.loads(connection.getresponse().read())
+    finally:
+        connection.close()
+
+
+def main(argv=None):
+    argv = sys.argv if argv is None else argv
+    options, command = get_client_parser().parse_known_args(argv[1:])
+    # exits with the CLI's message if the command is wrong
+    args = parse_command(command)
+    if args.cmd not in SERVED_COMMANDS:
+        print(f"\nERROR: `{args.cmd}` isn't served. Message:\n",
+              f"Run it with wiki_scraper.py, or choose one of: "
+              f"{', '.join(SERVED_COMMANDS)}.")
+        return
+
+    try:
+        answer = send_command(options.server, command, cwd=os.getcwd())
+    except (HTTPException, OSError, ValueError) as e:
+        print("\nERROR: Cannot reach the server. Message:\n", str(e))
+        return
+
+    print(answer.get("output", ""), end="")
+    if answer["ok"]:
+        print("\nOK: wiki_scraper exited successfully!")
+    else:
+        print(f"\nERROR: {answer['error']}. Message:\n", answer["message"])
+
+
+if __name__ == "__main__":
+    main()
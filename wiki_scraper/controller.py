@@ -1,16 +1,25 @@
 # Module containing implementation of class `Controller`,
 # which manages the flow of the program.
-from pandas import Series
-from wiki_scraper.scraper import Scraper
-from wiki_scraper.utils import (OK, update_word_counts,
-                                analyze_relative_word_freq, auto_count_words)
+# Handlers import heavy modules themselves, so that every command
+# loads only what it uses (e.g. `--summary` needs no pandas).
+import os
+from wiki_scraper.ratelimit import DEFAULT_MAX_RATE
+from wiki_scraper.utils import (OK, update_word_counts, format_stats,
+                                analyze_relative_word_freq, auto_count_words,
+                                get_word_count_store)
 
 
 class Controller:
-    def __init__(self, args):
-        self.article = None
+    def __init__(self, args, article=None, cache=None, store=None):
+        # `article`, `cache` and `store` may be given by the caller
+        # (e.g. by the batch mode, which shares them between commands);
+        # given ones are not closed when the command ends.
+        self.article = article
         self.args = args
         self.phrase = args.phrase
+        self.cache = cache
+        self.store = store
+        self._shared = (cache, store)
 
     def run(self):
         handlers = {
@@ -19,9 +28,19 @@ class Controller:
             "count-words": self._handle_count_words,
             "analyze-relative-word-frequency": self._handle_relative_word_freq,
             "auto-count-words": self._handle_auto_count_words,
+            "ingest": self._handle_ingest,
+            "batch": self._handle_batch,
+            "serve": self._handle_serve,
         }
 
-        handlers[self.args.cmd]()
+        try:
+            handlers[self.args.cmd]()
+        finally:
+            shared_cache, shared_store = self._shared
+            if self.cache is not None and self.cache is not shared_cache:
+                self.cache.close()
+            if self.store is not None and self.store is not shared_store:
+                self.store.close()
         return OK
 
     def _handle_summary(self):
@@ -29,36 +48,138 @@ class Controller:
         print(self.article.get_first_paragraph())
 
     def _handle_table(self):
+        from wiki_scraper.tables import (check_table_format, value_counts,
+                                         write_table)
+
+        fmt = getattr(self.args, "format", "csv")
+        check_table_format(fmt)
         self._ensure_article()
         index = self.args.number
 
         df = self.article.get_table_by_index(index=index)
-        path = self.phrase + ".csv"
-        df.to_csv(path, index=False)
-        flattened_df = Series(df.values.ravel()).value_counts()
-        print(flattened_df)
+        # the server mode writes where its client is
+        path = os.path.join(getattr(self.args, "output_dir", ""),
+                            self.phrase + "." + fmt)
+        write_table(df, path, fmt=fmt)
+        print(value_counts(df))
 
     def _handle_count_words(self):
         self._ensure_article()
         to_add = self.article.count_words()
-        update_word_counts(to_add)
+        update_word_counts(to_add, store=self._get_store(),
+                           article=self.phrase)
 
     def _handle_relative_word_freq(self):
         mode = self.args.mode
         n = self.args.count
         chart_path = self.args.chart
-        analyze_relative_word_freq(mode=mode, n=n, chart_path=chart_path)
+        analyze_relative_word_freq(mode=mode, n=n, chart_path=chart_path,
+                                   store=self._get_store())
 
     def _handle_auto_count_words(self):
         start_phrase = self.phrase
         depth = self.args.depth
         wait = self.args.wait
-        auto_count_words(start_phrase=start_phrase, depth=depth, wait=wait)
+        concurrency = getattr(self.args, "concurrency", 1)
+        parse_workers = getattr(self.args, "parse_workers", 0)
+        fetch_mode = getattr(self.args, "fetch", "html")
+        resolve_titles = getattr(self.args, "resolve_titles", False)
+        max_rate = getattr(self.args, "max_rate", DEFAULT_MAX_RATE)
+        checkpoint = self._get_checkpoint()
+
+        if concurrency > 1 or parse_workers > 0:
+            from wiki_scraper.crawler import async_auto_count_words
+            stats = async_auto_count_words(start_phrase=start_phrase,
+                                           depth=depth, wait=wait,
+                                           concurrency=concurrency,
+                                           parse_workers=parse_workers,
+                                           cache=self._get_cache(),
+                                           store=self._get_store(),
+                                           checkpoint=checkpoint,
+                                           fetch_mode=fetch_mode,
+                                           resolve_titles=resolve_titles,
+                                           max_rate=max_rate)
+        else:
+            stats = auto_count_words(start_phrase=start_phrase, depth=depth,
+                                     wait=wait, cache=self._get_cache(),
+                                     store=self._get_store(),
+                                     checkpoint=checkpoint,
+                                     fetch_mode=fetch_mode,
+                                     resolve_titles=resolve_titles,
+                                     max_rate=max_rate)
+        print("HTTP: " + format_stats(stats))
+
+    def _handle_ingest(self):
+        from wiki_scraper.ingest import ingest_dump
+
+        stats = ingest_dump(self.args.path, workers=self.args.workers,
+                            store=self._get_store())
+        print("Ingest: " + format_stats(stats))
+
+    def _handle_batch(self):
+        from wiki_scraper.batch import open_jobs, read_jobs, run_batch
+
+        with open_jobs(self.args.path) as lines:
+            stats = run_batch(read_jobs(lines),
+                              concurrency=self.args.concurrency,
+                              cache=self._get_cache())
+        print("\nBatch: " + format_stats(stats))
+
+    def _handle_serve(self):
+        from wiki_scraper.server import WikiServer, warm_up
+
+        warm_up()
+        server = WikiServer(host=self.args.host, port=self.args.port,
+                            cache=self._get_cache(),
+                            socket_path=getattr(self.args, "socket", None),
+                            output_root=getattr(self.args, "output_root",
+                                                None))
+        print(f"Serving on {server.url} (Ctrl+C stops).", flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
 
     def _ensure_article(self):
         # Maybe without if, so as article will be refreshed each time?
         # Then checking if article.phrase == self.phrase
         # What if there should be two phrases in self.phrase?
         if self.article is None and self.phrase is not None:
-            scraper = Scraper(phrase=self.phrase)
+            from wiki_scraper.scraper import Scraper
+
+            scraper = Scraper(phrase=self.phrase, cache=self._get_cache(),
+                              fetch_mode=getattr(self.args, "fetch", "html"))
             self.article = scraper.scrape()
+
+    def _get_checkpoint(self):
+        from wiki_scraper.checkpoint import CrawlCheckpoint, DEFAULT_EVERY
+
+        return CrawlCheckpoint(
+            path=getattr(self.args, "checkpoint", None),
+            every=getattr(self.args, "checkpoint_every", DEFAULT_EVERY),
+            resume=getattr(self.args, "resume", False)
+        )
+
+    def _get_store(self):
+        if self.store is None:
+            backend = getattr(self.args, "store", "json")
+            self.store = get_word_count_store(backend)
+        return self.store
+
+    def _get_cache(self):
+        if self.cache is None and not getattr(self.args, "no_cache", True):
+            from wiki_scraper.cache import (PageCache, cache_dir,
+                                            DEFAULT_TTL, DEFAULT_MAX_BYTES)
+
+            ttl = self.args.cache_ttl
+            size = self.args.cache_size
+            self.cache = PageCache(
+                directory=self.args.cache_dir or cache_dir,
+                ttl=DEFAULT_TTL if ttl is None else ttl,
+                max_bytes=(DEFAULT_MAX_BYTES if size is None
+                           else int(size * 1024 * 1024)),
+                offline=self.args.offline
+            )
+        return self.cache
@@ -0,0 +1,193 @@
+# Module containing the concurrent (asyncio) crawl engine.
+# It is the concurrent counterpart of `utils.auto_count_words`:
+# pages are fetched and parsed in worker threads, several at a time,
+# while results are committed in exactly the same order
+# as the serial crawl would commit them.
+# With `parse_workers`, parsing runs in a pool of processes instead:
+# fetched HTML is handed over to them (at most two pages per worker
+# wait for a free one) and only word counts and links come back.
+import asyncio
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+from wiki_scraper.article import Article
+from wiki_scraper.frontier import Frontier
+from wiki_scraper.mediawiki import TitleResolver
+from wiki_scraper.ratelimit import AdaptiveRateLimiter, DEFAULT_MAX_RATE
+from wiki_scraper.scraper import Scraper
+from wiki_scraper.session import HttpPool, get_default_pool
+from wiki_scraper.utils import (BULBAPEDIA_URL, WordCountStore,
+                                format_phrase, get_url_from_phrase,
+                                get_phrase_from_url, update_word_counts)
+
+
+def async_auto_count_words(start_phrase: str, depth: int, wait: float,
+                           concurrency: int = 8, base_url=BULBAPEDIA_URL,
+                           session=None, cache=None, store=None,
+                           checkpoint=None, parse_workers: int = 0,
+                           fetch_mode="html", resolve_titles=False,
+                           max_rate=DEFAULT_MAX_RATE) -> dict[str, int]:
+    concurrency = max(1, concurrency)
+    # The pool holds as many keep-alive connections as there can be
+    # requests in flight, so no connection is thrown away mid-crawl.
+    if session is None:
+        session = HttpPool(pool_size=concurrency)
+
+    asyncio.run(crawl(
+        start_phrase=start_phrase,
+        depth=depth,
+        wait=wait,
+        concurrency=concurrency,
+        base_url=base_url,
+        session=session,
+        cache=cache,
+        store=store,
+        checkpoint=checkpoint,
+        parse_workers=parse_workers,
+        fetch_mode=fetch_mode,
+        resolve_titles=resolve_titles,
+        max_rate=max_rate
+    ))
+    return session.stats()
+
+
+async def crawl(start_phrase: str, depth: int, wait: float,
+                concurrency: int = 8, base_url=BULBAPEDIA_URL,
+                session=None, cache=None, store=None, checkpoint=None,
+                parse_workers: int = 0, fetch_mode="html",
+                resolve_titles=False, max_rate=DEFAULT_MAX_RATE):
+    concurrency = max(1, concurrency)
+    session = get_default_pool() if session is None else session
+    own_store = store is None
+    store = WordCountStore() if own_store else store
+    # `wait` is the starting gap between requests to one host;
+    # fetching threads wait for it only before going to the network
+    limiter = AdaptiveRateLimiter(interval=wait, max_rate=max_rate)
+    loop = asyncio.get_running_loop()
+    # what every fetching thread needs to download a page
+    fetcher = (base_url, session, cache, fetch_mode, limiter)
+
+    # see `utils.auto_count_words`
+    resolver = (TitleResolver(base_url, session, headers=Scraper.headers,
+                              limiter=limiter)
+                if resolve_titles else None)
+
+    start_phrase = format_phrase(start_phrase)
+    begin_url = get_url_from_phrase(start_phrase, base_url=base_url)
+    if resolver is not None:
+        begin_url = next(iter(await loop.run_in_executor(
+            None, resolver.canonical_urls, [begin_url]
+        )), begin_url)
+
+    # Links are deduplicated when they are queued. Pages are scheduled
+    # in frontier order and new links are queued only when a page
+    # is committed, so the order matches the serial crawl.
+    to_visit = Frontier(base_url=base_url, max_depth=depth)
+    if checkpoint is None:
+        to_visit.push(begin_url, 0)
+    else:
+        checkpoint.begin(to_visit, store, begin_url, depth, base_url)
+    # pages taken from the frontier but not committed yet, oldest first
+    in_flight = deque()
+    current = None
+
+    if parse_workers > 0:
+        parsers = ProcessPoolExecutor(max_workers=parse_workers)
+        # bounds the number of fetched pages waiting for a parser
+        parse_slots = asyncio.Semaphore(2 * parse_workers)
+    else:
+        parsers = nullcontext()
+        parse_slots = None
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor, parsers:
+        try:
+            while len(to_visit) > 0 or len(in_flight) > 0:
+                while len(to_visit) > 0 and len(in_flight) < concurrency:
+                    url, current_depth = to_visit.pop()
+                    task = asyncio.create_task(_fetch(
+                        url, fetcher, loop, executor, parsers, parse_slots
+                    ))
+                    in_flight.append((task, (url, current_depth)))
+
+                # Commits the oldest page, so the store sees the same
+                # sequence of updates as with `auto_count_words`.
+                task, current = in_flight.popleft()
+                phrase, word_counts, links = await task
+                update_word_counts(word_counts, store=store, article=phrase)
+
+                urls = [get_url_from_phrase(href, base_url=base_url)
+                        for href in links]
+                if resolver is not None and current[1] < depth:
+                    # the frontier isn't changed while this runs
+                    urls = await loop.run_in_executor(
+                        executor, resolver.canonical_urls, urls,
+                        to_visit.seen
+                    )
+                for full_url in urls:
+                    to_visit.push(full_url, current[1] + 1)
+                current = None
+
+                if checkpoint is not None:
+                    checkpoint.page_done(to_visit, store,
+                                         head=[item for _, item in in_flight])
+        except BaseException as e:
+            # unfinished pages are retried on `--resume` (unless missing)
+            if checkpoint is not None:
+                checkpoint.stop(to_visit, store, e, current=current,
+                                head=[item for _, item in in_flight])
+            raise
+        else:
+            if checkpoint is not None:
+                checkpoint.finish(store)
+        finally:
+            for task, _ in in_flight:
+                task.cancel()
+            to_visit.close()
+            # counts of pages committed so far are kept
+            if own_store:
+                store.close()
+
+
+async def _fetch(url, fetcher, loop, executor, parsers=None,
+                 parse_slots=None):
+    phrase = get_phrase_from_url(url, base_url=fetcher[0])
+    if parse_slots is None:
+        return await loop.run_in_executor(
+            executor, _scrape_page, phrase, *fetcher
+        )
+
+    html_content = await loop.run_in_executor(
+        executor, _download_page, phrase, *fetcher
+    )
+    async with parse_slots:
+        word_counts, links = await loop.run_in_executor(
+            parsers, parse_page, html_content, phrase
+        )
+    return phrase, word_counts, links
+
+
+def _scrape_page(phrase: str, base_url: str, session, cache, fetch_mode,
+                 limiter):
+    # Runs in a worker thread: downloading, parsing and counting
+    # of one page happen here, outside of the event loop.
+    html_content = _download_page(phrase, base_url, session, cache,
+                                  fetch_mode, limiter)
+    return (phrase, *parse_page(html_content, phrase))
+
+
+def _download_page(phrase: str, base_url: str, session, cache, fetch_mode,
+                   limiter):
+    # `scrape` only downloads; the article is parsed lazily
+    article = Scraper(phrase=phrase, base_url=base_url, session=session,
+                      cache=cache, fetch_mode=fetch_mode,
+                      limiter=limiter).scrape()
+    return article.html_content
+
+
+def parse_page(html_content, phrase: str):
+    # Runs in a worker thread or process; returns only what the crawl
+    # needs (word counts and links), which is much smaller than the tree.
+    article = Article(html_content, phrase)
+    # links need the full tree, which `count_words` then reuses
+    links = article.get_wiki_links()
+    return article.count_words(), links
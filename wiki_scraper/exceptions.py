@@ -2,3 +2,40 @@
 
 class ArticleNotFound(Exception):
     pass
+
+
+class PageUnavailable(ArticleNotFound):
+    # The article may exist, but it couldn't be fetched now
+    # (network errors, the server too busy), so it's worth retrying
+    pass
+
+
+class InvalidCheckpoint(Exception):
+    pass
+
+
+class MissingDependency(Exception):
+    pass
+
+
+class InvalidDump(Exception):
+    pass
+
+
+# Errors reported to the user (instead of a traceback),
+# with their descriptions
+REPORTED_ERRORS = (
+    (ArticleNotFound, "Article not found"),
+    (InvalidCheckpoint, "Cannot resume the crawl"),
+    (MissingDependency, "Missing dependency"),
+    (InvalidDump, "Cannot ingest the dump"),
+)
+
+
+def describe_error(error: Exception) -> str:
+    return next(text for kind, text in REPORTED_ERRORS
+                if isinstance(error, kind))
+
+
+def reported_error_types() -> tuple:
+    return tuple(kind for kind, _ in REPORTED_ERRORS)
@@ -0,0 +1,98 @@
+# Module containing implementation of class `FrequencyTable`.
+# It is an on-disk lookup table of `wordfreq` frequencies
+# (`word_frequency` of every word of the language's word list),
+# built once, kept in `.wiki_cache/` and loaded once per process,
+# so frequencies of many words are looked up with one vectorized
+# call instead of one `word_frequency` call per word.
+import io
+import threading
+from importlib.metadata import version
+from pathlib import Path
+import numpy as np
+from pandas import Index
+from wordfreq import get_frequency_dict, word_frequency
+from wiki_scraper.utils import atomic_write, repo_root
+
+table_dir = repo_root / ".wiki_cache"
+
+# Tables loaded in this process, by language
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+class FrequencyTable:
+    def __init__(self, words: list[str], frequencies, lang: str = "en"):
+        self.lang = lang
+        self.words = Index(words)
+        self.frequencies = np.asarray(frequencies, dtype=np.float64)
+
+    @classmethod
+    def build(cls, lang: str = "en", words=None):
+        # Takes a while (one `word_frequency` call per word),
+        # so it is done once and saved
+        if words is None:
+            words = get_frequency_dict(lang)
+        words = list(dict.fromkeys(words))
+        frequencies = [word_frequency(word, lang) for word in words]
+        return cls(words, frequencies, lang=lang)
+
+    @classmethod
+    def load(cls, path):
+        # Returns `None` if there is no table at `path`, or it was built
+        # with another version of `wordfreq`
+        try:
+            with np.load(path) as data:
+                if str(data["version"]) != version("wordfreq"):
+                    return None
+                words = data["words"].tobytes().decode("utf-8")
+                return cls(words.split("\n"), data["frequencies"],
+                           lang=str(data["lang"]))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def save(self, path):
+        # Words are kept as one UTF-8 blob, which loads much faster
+        # than an array of Python strings
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        words = "\n".join(self.words).encode("utf-8")
+        data = io.BytesIO()
+        np.savez(
+            data,
+            words=np.frombuffer(words, dtype=np.uint8),
+            frequencies=self.frequencies,
+            lang=np.array(self.lang),
+            version=np.array(version("wordfreq")),
+        )
+        atomic_write(path, data.getvalue())
+
+    def lookup(self, words) -> np.ndarray:
+        # Frequencies of `words`, the same as `word_frequency` gives;
+        # words which are not in the table (very rare ones, or made
+        # of a few tokens) are asked from `wordfreq` one by one.
+        words = list(words)
+        positions = self.words.get_indexer(words)
+        frequencies = self.frequencies.take(positions, mode="clip")
+
+        missing = np.flatnonzero(positions < 0)
+        for i in missing:
+            frequencies[i] = word_frequency(words[i], self.lang)
+        return frequencies
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+
+def get_frequency_table(lang: str = "en", path=None) -> FrequencyTable:
+    # The table of `lang`, read from disk (or built and saved there)
+    # on the first call only
+    path = Path(table_dir / f"wordfreq-{lang}.npz" if path is None else path)
+    with _tables_lock:
+        table = _tables.get((lang, path))
+        if table is None:
+            table = FrequencyTable.load(path)
+            if table is None or table.lang != lang:
+                table = FrequencyTable.build(lang)
+                table.save(path)
+            _tables[(lang, path)] = table
+        return table
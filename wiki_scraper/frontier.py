@@ -0,0 +1,141 @@
+# Module containing implementation of class `Frontier`.
+# It is the queue of pages waiting to be crawled, shared by both crawlers.
+# URLs are canonicalized and deduplicated when they are enqueued,
+# so every page is queued at most once and the queue never holds
+# duplicates of link-dense pages. When the queue grows very long,
+# its tail is spilled to a temporary file.
+import re
+import tempfile
+from collections import deque
+from urllib.parse import quote, unquote
+from wiki_scraper.utils import BULBAPEDIA_URL, format_phrase
+
+# Characters which MediaWiki leaves unescaped in article URLs
+URL_SAFE_CHARS = ";:@$!*(),/~'"
+
+# Number of items kept in memory before the rest is spilled to disk
+MAX_IN_MEMORY = 100_000
+
+
+def canonicalize_url(url: str, base_url=BULBAPEDIA_URL) -> str | None:
+    # Returns one spelling of the article's URL (no fragment or query,
+    # underscores instead of spaces, the first letter upper-cased,
+    # percent-encoded the way MediaWiki does it),
+    # or `None` if the URL doesn't point to an article under `base_url`.
+    url = url.split("#", 1)[0].split("?", 1)[0]
+    if not url.startswith(base_url):
+        return None
+
+    phrase = unquote(url[len(base_url):])
+    phrase = re.sub(r"[\s_]+", "_", phrase).strip("_")
+    if len(phrase) == 0:
+        return None
+
+    return base_url + quote(format_phrase(phrase), safe=URL_SAFE_CHARS)
+
+
+class Frontier:
+    def __init__(self, base_url=BULBAPEDIA_URL, max_depth: int | None = None,
+                 max_in_memory: int = MAX_IN_MEMORY):
+        # URLs deeper than `max_depth` (or outside `base_url`) are not queued
+        self.base_url = base_url
+        self.max_depth = max_depth
+        self.max_in_memory = max(1, max_in_memory)
+
+        self._queue = deque()
+        self._seen = set()
+
+        # Items which didn't fit into memory, oldest first
+        self._spill = None
+        self._spilled = 0
+        self._read_offset = 0
+
+    def push(self, url: str, depth: int) -> bool:
+        # Returns whether the URL was queued (it wasn't seen before)
+        if self.max_depth is not None and depth > self.max_depth:
+            return False
+
+        url = canonicalize_url(url, base_url=self.base_url)
+        if url is None or url in self._seen:
+            return False
+        self._seen.add(url)
+
+        # Once something was spilled, newer items have to follow it
+        if self._spilled > 0 or len(self._queue) >= self.max_in_memory:
+            self._spill_item(url, depth)
+        else:
+            self._queue.append((url, depth))
+        return True
+
+    def pop(self) -> tuple[str, int]:
+        if len(self._queue) == 0 and self._spilled > 0:
+            self._refill()
+        return self._queue.popleft()
+
+    def dump(self, head=()) -> dict:
+        # JSON-serializable state; `head` are items taken from the frontier
+        # but not finished yet, which go back to its front.
+        queue = [list(item) for item in head]
+        queue.extend([url, depth] for url, depth in self._queue)
+        queue.extend([url, depth] for url, depth in self._read_spilled())
+        return {"queue": queue, "seen": sorted(self._seen)}
+
+    def load(self, state: dict):
+        # Restores the state returned by `dump` (replacing the current one)
+        self._queue.clear()
+        self._seen = set(state["seen"])
+        if self._spill is not None:
+            self._spill.seek(0)
+            self._spill.truncate()
+        self._spilled = 0
+        self._read_offset = 0
+
+        for url, depth in state["queue"]:
+            if len(self._queue) >= self.max_in_memory:
+                self._spill_item(url, depth)
+            else:
+                self._queue.append((url, depth))
+
+    def seen(self, url: str) -> bool:
+        return canonicalize_url(url, base_url=self.base_url) in self._seen
+
+    def __len__(self) -> int:
+        return len(self._queue) + self._spilled
+
+    def close(self):
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+    def _spill_item(self, url: str, depth: int):
+        if self._spill is None:
+            self._spill = tempfile.TemporaryFile(prefix="frontier-")
+        self._spill.seek(0, 2)
+        self._spill.write(f"{depth}\t{url}\n".encode("utf-8"))
+        self._spilled += 1
+
+    def _read_spilled(self):
+        if self._spilled == 0:
+            return
+        self._spill.seek(self._read_offset)
+        for _ in range(self._spilled):
+            yield self._parse_line(self._spill.readline())
+
+    @staticmethod
+    def _parse_line(line: bytes) -> tuple[str, int]:
+        depth, url = line.decode("utf-8").rstrip("\n").split("\t", 1)
+        return url, int(depth)
+
+    def _refill(self):
+        # Moves the oldest spilled items back into memory
+        self._spill.seek(self._read_offset)
+        for _ in range(min(self._spilled, self.max_in_memory)):
+            self._queue.append(self._parse_line(self._spill.readline()))
+            self._spilled -= 1
+        self._read_offset = self._spill.tell()
+
+        if self._spilled == 0:
+            # everything was read back, the file can start over
+            self._spill.seek(0)
+            self._spill.truncate()
+            self._read_offset = 0
@@ -0,0 +1,137 @@
+# Module containing bulk ingestion of local HTML dumps.
+# A dump is a directory, a tar archive (possibly compressed)
+# or a zip archive of saved articles; every `.html` / `.htm` file
+# is one article, named after the file. Pages are parsed and counted
+# in a pool of processes and merged into the word-count store
+# as results come, in one pass over the dump and with no HTTP.
+import os
+import sys
+import tarfile
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from urllib.parse import unquote
+from wiki_scraper.article import Article
+from wiki_scraper.exceptions import InvalidDump
+from wiki_scraper.scraper import check_utf8, map_file
+from wiki_scraper.utils import WordCountStore, format_phrase
+
+HTML_SUFFIXES = (".html", ".htm")
+
+# Progress is reported every that many pages
+PROGRESS_EVERY = 500
+
+
+def iter_dump(path):
+    # Yields (phrase, source) for every page of the dump, where
+    # `source` is a path of a file (read by the worker) or its content.
+    path = Path(path)
+    if not path.exists():
+        raise InvalidDump(f"'{path}' not found.")
+    if path.is_dir():
+        for file_path in sorted(path.rglob("*")):
+            if _is_page(file_path.name) and file_path.is_file():
+                yield _phrase_from_name(file_path.name), str(file_path)
+    elif zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if _is_page(info.filename) and not info.is_dir():
+                    yield (_phrase_from_name(info.filename),
+                           archive.read(info))
+    elif tarfile.is_tarfile(path):
+        # streamed, so compressed archives are read only once
+        with tarfile.open(path, "r|*") as archive:
+            for member in archive:
+                if _is_page(member.name) and member.isfile():
+                    yield (_phrase_from_name(member.name),
+                           archive.extractfile(member).read())
+    else:
+        raise InvalidDump(f"'{path}' is not a directory, "
+                          f"a tar or a zip archive.")
+
+
+def count_page(phrase: str, source) -> tuple[str, dict[str, int] | None]:
+    # Runs in a worker process. Files are memory-mapped and their
+    # bytes go straight to the parser, as in `Scraper.scrape_from_file`.
+    # Pages which aren't UTF-8 give `None` (they are skipped).
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            source = map_file(f)
+    try:
+        check_utf8(source)
+    except UnicodeDecodeError:
+        return phrase, None
+    return phrase, Article(source, phrase).count_words()
+
+
+def ingest_dump(path, workers: int | None = None, store=None,
+                progress=sys.stderr) -> dict[str, float]:
+    # `workers=0` parses in this process. `progress` is a stream
+    # for progress lines (or `None`). Returns counters of the run.
+    # A page which can't be read is reported and skipped, so that
+    # the run doesn't stop with only a part of the dump counted
+    # (running it again would count that part twice).
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    own_store = store is None
+    store = WordCountStore() if own_store else store
+
+    pages = 0
+    skipped = 0
+    start = time.perf_counter()
+    try:
+        for phrase, counts in _count_pages(iter_dump(path), workers):
+            if counts is None:
+                skipped += 1
+                if progress is not None:
+                    print(f"skipped '{phrase}': not valid UTF-8",
+                          file=progress, flush=True)
+                continue
+            store.add(counts, article=phrase)
+            pages += 1
+            if progress is not None and pages % PROGRESS_EVERY == 0:
+                elapsed = time.perf_counter() - start
+                print(f"{pages} pages, {pages / elapsed:.1f} pages/s",
+                      file=progress, flush=True)
+    finally:
+        if own_store:
+            store.close()
+        else:
+            store.flush()
+
+    seconds = time.perf_counter() - start
+    return {
+        "pages": pages,
+        "skipped": skipped,
+        "seconds": round(seconds, 2),
+        "pages/s": round(pages / seconds, 1) if seconds > 0 else 0.0,
+    }
+
+
+def _count_pages(items, workers: int):
+    # Yields results in the order of `items`, keeping only a few
+    # pages per worker in flight (dumps don't fit in memory).
+    if workers <= 0:
+        for phrase, source in items:
+            yield count_page(phrase, source)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        for phrase, source in items:
+            in_flight.append(executor.submit(count_page, phrase, source))
+            if len(in_flight) >= 4 * workers:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+def _is_page(name: str) -> bool:
+    return name.lower().endswith(HTML_SUFFIXES)
+
+
+def _phrase_from_name(name: str) -> str:
+    # e.g. `dump/Farfetch%27d.html` -> `Farfetch'd`
+    stem = name.replace("\\", "/").rsplit("/", 1)[-1].rsplit(".", 1)[0]
+    return format_phrase(unquote(stem))
@@ -1,7 +1,7 @@
 # Main module.
 from wiki_scraper.cli import get_args
 from wiki_scraper.controller import Controller
-from wiki_scraper.exceptions import ArticleNotFound
+from wiki_scraper.exceptions import describe_error, reported_error_types
 from wiki_scraper.utils import OK
 
 
@@ -11,8 +11,8 @@ def main(argv=None):
     try:
         if controller.run() == OK:
             print("\nOK: wiki_scraper exited successfully!")
-    except ArticleNotFound as e:
-        print("\nERROR: Article not found. Message:\n", str(e))
+    except reported_error_types() as e:
+        print(f"\nERROR: {describe_error(e)}. Message:\n", str(e))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,213 @@
+# Module containing helpers for the MediaWiki API (`api.php`).
+# In the `api` fetch mode articles are downloaded with `action=parse`,
+# which returns the rendered content only (no skin, navigation,
+# sidebars or scripts), so much less is transferred than in `html` mode.
+# The content is wrapped in the article container again,
+# so that `Article` reads it the same way as a whole page.
+# `TitleResolver` asks the API (`action=query`) for canonical titles
+# of many links at once, so that redirects aren't crawled twice.
+# `FETCH_MODES` is read by the CLI, so the module imports nothing heavy.
+import threading
+import time
+from json import loads
+from urllib.parse import unquote, urlencode, urlsplit, urlunsplit
+from wiki_scraper.exceptions import ArticleNotFound
+from wiki_scraper.frontier import canonicalize_url
+from wiki_scraper.ratelimit import BACKOFF_STATUSES, parse_retry_after
+
+FETCH_MODES = ("html", "api")
+
+# Number of titles the API resolves in one request (its limit for bots
+# is higher, but 50 is the limit for everyone)
+TITLES_PER_QUERY = 50
+
+
+def get_api_url(base_url: str) -> str:
+    # e.g. `https://bulbapedia.bulbagarden.net/wiki/`
+    #   -> `https://bulbapedia.bulbagarden.net/w/api.php`
+    scheme, netloc, path, _, _ = urlsplit(base_url)
+    path = path.rstrip("/").removesuffix("/wiki")
+    return urlunsplit((scheme, netloc, path + "/w/api.php", "", ""))
+
+
+def get_parse_url(api_url: str, phrase: str) -> str:
+    params = {
+        "action": "parse",
+        # phrases of links come percent-encoded (e.g. `Pok%C3%A9mon`)
+        "page": unquote(phrase).replace("_", " "),
+        "prop": "text",
+        # redirects are followed like on the wiki itself
+        "redirects": "1",
+        "disableeditsection": "1",
+        "disablelimitreport": "1",
+        "format": "json",
+        "formatversion": "2",
+    }
+    return api_url + "?" + urlencode(params)
+
+
+def get_query_url(api_url: str, titles: list[str]) -> str:
+    params = {
+        "action": "query",
+        "titles": "|".join(titles),
+        "redirects": "1",
+        "format": "json",
+        "formatversion": "2",
+    }
+    return api_url + "?" + urlencode(params)
+
+
+def titles_from_query_response(text: str,
+                               titles: list[str]) -> dict[str, str | None]:
+    # Maps every title to its canonical title (after normalization
+    # and redirects), or to `None` if there is no such page.
+    query = loads(text).get("query", {})
+    normalized = {n["from"]: n["to"] for n in query.get("normalized", [])}
+    redirects = {r["from"]: r["to"] for r in query.get("redirects", [])}
+    missing = {page["title"] for page in query.get("pages", [])
+               if page.get("missing") or page.get("invalid")}
+
+    canonical = {}
+    for title in titles:
+        target = normalized.get(title, title)
+        # a chain of redirects is listed hop by hop
+        hops = 0
+        while target in redirects and hops < len(redirects):
+            target = redirects[target]
+            hops += 1
+        canonical[title] = None if target in missing else target
+    return canonical
+
+
+class TitleResolver:
+    # Resolves titles of links through the API, in batches,
+    # remembering every answer for the rest of the crawl.
+    # With a `limiter` (the crawl's), queries wait for their turn
+    # and report answers like the scrapers' requests do.
+    timeout = 10
+
+    def __init__(self, base_url: str, session, headers=None, limiter=None):
+        self.base_url = base_url
+        self.api_url = get_api_url(base_url)
+        self.session = session
+        self.headers = headers
+        self.limiter = limiter
+
+        self.num_queries = 0
+        self._known = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, titles: list[str]) -> dict[str, str | None]:
+        with self._lock:
+            unknown = [t for t in dict.fromkeys(titles)
+                       if t not in self._known]
+
+        for start in range(0, len(unknown), TITLES_PER_QUERY):
+            batch = unknown[start:start + TITLES_PER_QUERY]
+            answer = self._query(batch)
+            with self._lock:
+                self._known.update(answer)
+
+        with self._lock:
+            # titles of a failed query are left as they are
+            return {t: self._known.get(t, t) for t in titles}
+
+    def canonical_urls(self, urls: list[str], seen=None) -> list[str]:
+        # Canonical URLs of articles behind `urls` (in the same order),
+        # without missing ones. URLs for which `seen(url)` holds
+        # are already queued and aren't resolved again.
+        titles = {}
+        for url in urls:
+            url = canonicalize_url(url, base_url=self.base_url)
+            if url is not None and not (seen is not None and seen(url)):
+                titles[url] = _title_from_url(url, self.base_url)
+
+        resolved = self.resolve(list(titles.values()))
+
+        canonical = []
+        for url in urls:
+            url = canonicalize_url(url, base_url=self.base_url)
+            if url not in titles:
+                # outside the wiki or already queued
+                if url is not None:
+                    canonical.append(url)
+                continue
+
+            title = resolved[titles[url]]
+            if title is not None:
+                canonical.append(canonicalize_url(
+                    self.base_url + title, base_url=self.base_url
+                ))
+        return canonical
+
+    def _query(self, titles: list[str]) -> dict[str, str | None]:
+        import requests
+
+        url = get_query_url(self.api_url, titles)
+        if self.limiter is not None:
+            self.limiter.wait(url)
+        started = time.monotonic()
+        response = None
+        try:
+            response = self.session.get(url, headers=self.headers,
+                                        timeout=self.timeout)
+            self._observe(url, response, started)
+            response.raise_for_status()
+            answer = titles_from_query_response(response.text, titles)
+        except (requests.RequestException, ValueError, KeyError):
+            if response is None:
+                # no answer at all, which the limiter learns from too
+                self._observe(url, None, started)
+            # the crawl goes on without resolving these titles
+            return {}
+        finally:
+            with self._lock:
+                self.num_queries += 1
+        return answer
+
+    def _observe(self, url: str, response, started: float):
+        # See `Scraper._back_off`: 429 and 503 slow the limiter down
+        # (honouring `Retry-After`), other answers speed it up again.
+        if self.limiter is None:
+            return
+        status = None if response is None else response.status_code
+        retry_after = None
+        if status in BACKOFF_STATUSES:
+            retry_after = parse_retry_after(
+                response.headers.get("Retry-After"))
+        self.limiter.observe(url, status, time.monotonic() - started,
+                             retry_after=retry_after)
+
+
+def _title_from_url(url: str, base_url: str) -> str:
+    return unquote(url[len(base_url):]).replace("_", " ")
+
+
+def html_from_parse_response(text: str, phrase: str) -> str:
+    # Returns a page with the article's content from the JSON answer
+    # to `action=parse`; API errors (e.g. a missing page) are mapped
+    # to `ArticleNotFound`.
+    from wiki_scraper.parsers import CONTAINER_CLASS
+
+    try:
+        data = loads(text)
+    except ValueError:
+        raise ArticleNotFound(f"Invalid API response for '{phrase}'.")
+
+    if "error" in data:
+        error = data["error"]
+        raise ArticleNotFound(
+            f"API error for '{phrase}': {error.get('code')} "
+            f"({error.get('info')})."
+        )
+
+    content = data.get("parse", {}).get("text")
+    # `formatversion=1` nests the HTML under `*`
+    if isinstance(content, dict):
+        content = content.get("*")
+    if not isinstance(content, str):
+        raise ArticleNotFound(f"No content in API response for '{phrase}'.")
+
+    return ("<!DOCTYPE html><html><body>"
+            f'<div class="{CONTAINER_CLASS}">{content}</div>'
+            "</body></html>")
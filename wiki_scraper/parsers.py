@@ -0,0 +1,333 @@
+# Module containing HTML parsing backends used by class `Article`.
+# Each backend knows how to find the article container in a page
+# and how to walk it (paragraphs, tables, text, links).
+# `LxmlParser` works on the lxml tree directly and is the default;
+# `SoupParser` is the BeautifulSoup-based one, kept for compatibility.
+# Backends can also answer single questions (the first paragraph,
+# chosen tables) with a scan that stops as soon as the answer is known,
+# without building the whole clean tree. Tables are handed over
+# as lxml elements, which `wiki_scraper.tables` reads.
+# Pages are given as `str` or as UTF-8 bytes (any bytes-like object,
+# e.g. a memory-mapped file), which are decoded by the parser itself.
+import lxml.html
+from lxml import etree
+
+CONTAINER_CLASS = "mw-content-ltr mw-parser-output"
+
+# Tags removed from the container before anything is read from it
+REMOVED_TAGS = ("style", "script")
+
+# Text inside these tags is not a part of the article's text
+# (BeautifulSoup doesn't return it from `get_text` either).
+SKIPPED_TEXT_TAGS = frozenset(("rt", "rp", "template") + REMOVED_TAGS)
+
+# Number of characters (or bytes) fed to the incremental parser at once
+CHUNK_SIZE = 64 * 1024
+
+# Encoding of pages given as bytes
+ENCODING = "utf-8"
+
+
+class BaseParser:
+    # Scans used by `Article` before (and instead of) the full parse.
+    # Backends without an early-stopping parser just parse everything.
+    def scan_first_paragraph(self, html_content) -> str | None:
+        container = self.parse(html_content)
+        if container is None:
+            return None
+        return self.first_paragraph(container)
+
+    def scan_tables(self, html_content, indices=None) -> dict:
+        # Tables number `indices` (counted from 1 in document order,
+        # nested ones included; all if `None`) as lxml elements
+        container = self.parse(html_content)
+        if container is None:
+            return {}
+        return self.pick_tables(self.tables(container), indices)
+
+    def pick_tables(self, tables: list, indices=None) -> dict:
+        if indices is None:
+            indices = range(1, len(tables) + 1)
+        return {index: self.table_element(tables[index - 1])
+                for index in sorted(set(indices))
+                if 1 <= index <= len(tables)}
+
+    def scan_strings(self, html_content):
+        container = self.parse(html_content)
+        if container is None:
+            return iter(())
+        return self.strings(container)
+
+
+class SoupParser(BaseParser):
+    def __init__(self, features: str = "html.parser"):
+        self.features = features
+        self.name = features
+
+    def parse(self, html_content):
+        # bs4 is imported only when this backend is used
+        from bs4 import BeautifulSoup
+
+        if isinstance(html_content, str) or len(html_content) == 0:
+            parsed_content = BeautifulSoup(html_content or "", self.features)
+        else:
+            parsed_content = BeautifulSoup(bytes(html_content), self.features,
+                                           from_encoding=ENCODING)
+        container = parsed_content.find("div", class_=CONTAINER_CLASS)
+
+        if container is None:
+            return None
+
+        # Cleans unwanted tags from the container
+        # (stored as nodes in the BeautifulSoup tree)
+        for tag in container.find_all(list(REMOVED_TAGS)):
+            tag.decompose()
+
+        return container
+
+    def first_paragraph(self, container) -> str | None:
+        paragraph = container.find("p")
+        if paragraph is None:
+            return None
+        return paragraph.get_text(separator=" ", strip=True)
+
+    def tables(self, container) -> list:
+        return container.find_all("table")
+
+    def table_html(self, table) -> str:
+        return str(table)
+
+    def table_element(self, table):
+        # The table as an lxml element, for `wiki_scraper.tables`
+        return lxml.html.fragment_fromstring(str(table))
+
+    def strings(self, container):
+        return container.stripped_strings
+
+    def links(self, container):
+        for link in container.find_all("a", href=True):
+            yield link['href']
+
+
+class LxmlParser(BaseParser):
+    name = "lxml"
+
+    def parse(self, html_content):
+        try:
+            if isinstance(html_content, str):
+                root = lxml.html.document_fromstring(html_content)
+            else:
+                root = _parse_bytes(html_content)
+        except etree.LxmlError:
+            # e.g. an empty document
+            return None
+        if root is None:
+            return None
+
+        container = next(filter(_is_container, root.iter("div")), None)
+
+        if container is None:
+            return None
+
+        remove_tags(container)
+        return container
+
+    def scan_first_paragraph(self, html_content) -> str | None:
+        paragraph = None
+        for event, element in container_events(html_content):
+            if paragraph is None:
+                if event == "start" and element.tag == "p":
+                    paragraph = element
+            elif event == "end" and element is paragraph:
+                break
+
+        if paragraph is None:
+            return None
+        # `<style>` and `<script>` are skipped by `strings` anyway
+        return " ".join(self.strings(paragraph))
+
+    def scan_tables(self, html_content, indices=None) -> dict:
+        # The page is parsed only up to the end of the last wanted table
+        wanted = None if indices is None else {i for i in indices if i >= 1}
+        if wanted is not None and len(wanted) == 0:
+            return {}
+
+        found = {}
+        # wanted tables which were started but haven't ended yet
+        open_tables = []
+        seen = 0
+        for event, element in container_events(html_content):
+            if element.tag != "table":
+                continue
+            if event == "start":
+                seen += 1
+                if wanted is None or seen in wanted:
+                    open_tables.append((element, seen))
+            elif open_tables and open_tables[-1][0] is element:
+                _, index = open_tables.pop()
+                remove_tags(element)
+                found[index] = element
+                if wanted is not None and len(found) == len(wanted):
+                    break
+
+        return dict(sorted(found.items()))
+
+    def scan_strings(self, html_content):
+        # Yields the same strings as `strings(container)` (in another
+        # order), freeing parts of the tree which were already read.
+        # An element's own text and the tails of its children are
+        # complete at its end; its descendants were read before.
+        skipped = 0
+        for event, element in container_events(html_content):
+            if element.tag in SKIPPED_TEXT_TAGS:
+                skipped += 1 if event == "start" else -1
+                continue
+            if event == "start" or skipped > 0:
+                continue
+
+            text = element.text and element.text.strip()
+            if text:
+                yield text
+            for child in element:
+                text = child.tail and child.tail.strip()
+                if text:
+                    yield text
+            del element[:]
+
+    def first_paragraph(self, container) -> str | None:
+        paragraph = next(container.iter("p"), None)
+        if paragraph is None:
+            return None
+        return " ".join(self.strings(paragraph))
+
+    def tables(self, container) -> list:
+        return list(container.iter("table"))
+
+    def table_html(self, table) -> str:
+        return lxml.html.tostring(table, encoding="unicode", with_tail=False)
+
+    def table_element(self, table):
+        return table
+
+    def strings(self, element):
+        # Yields stripped, non-empty text nodes in document order,
+        # like BeautifulSoup's `stripped_strings`.
+        for text in iter_text(element):
+            text = text.strip()
+            if text:
+                yield text
+
+    def links(self, container):
+        for link in container.iter("a"):
+            href = link.get("href")
+            if href is not None:
+                yield href
+
+
+def remove_tags(element):
+    # Removed tags are replaced by empty comments instead of being
+    # dropped, so that the text before and after them is not glued
+    # into one text node (as it is not in BeautifulSoup).
+    for tag in list(element.iter(*REMOVED_TAGS)):
+        placeholder = etree.Comment()
+        placeholder.tail = tag.tail
+        tag.getparent().replace(tag, placeholder)
+
+
+def container_events(html_content):
+    # Parses the page incrementally and yields ("start" | "end", element)
+    # for elements inside the article container, and finally the "end"
+    # of the container itself. The caller can stop earlier,
+    # leaving the rest of the page unparsed.
+    container = None
+    for event, element in _pull_events(html_content):
+        if container is None:
+            if event == "start" and element.tag == "div" and \
+                    _is_container(element):
+                container = element
+        else:
+            yield event, element
+            if element is container:
+                return
+
+
+def _parse_bytes(html_content):
+    # Bytes are fed in chunks, so a memory-mapped file is never copied
+    # as a whole; returns `None` for an empty document.
+    parser = lxml.html.HTMLParser(encoding=ENCODING)
+    for start in range(0, len(html_content), CHUNK_SIZE):
+        parser.feed(html_content[start:start + CHUNK_SIZE])
+    return parser.close()
+
+
+def _pull_events(html_content):
+    encoding = None if isinstance(html_content, str) else ENCODING
+    parser = etree.HTMLPullParser(events=("start", "end"), encoding=encoding)
+    for start in range(0, len(html_content), CHUNK_SIZE):
+        parser.feed(html_content[start:start + CHUNK_SIZE])
+        yield from parser.read_events()
+
+    try:
+        parser.close()
+    except etree.LxmlError:
+        # e.g. an empty document
+        return
+    yield from parser.read_events()
+
+
+def _is_container(div) -> bool:
+    # Same matching as BeautifulSoup's `class_=...`
+    return " ".join(div.get("class", "").split()) == CONTAINER_CLASS
+
+
+def iter_text(element):
+    # Comments and processing instructions are skipped,
+    # but the text following them is not.
+    if element.tag in SKIPPED_TEXT_TAGS:
+        return
+
+    # lxml's own (compiled) iteration is used when nothing has to be skipped
+    if next(element.iter(*SKIPPED_TEXT_TAGS), None) is None:
+        yield from element.itertext()
+        return
+
+    # Iterative walk (pages can be nested deeper than the recursion limit)
+    if element.text:
+        yield element.text
+
+    stack = [(element, iter(element))]
+    while stack:
+        parent, children = stack[-1]
+        child = next(children, None)
+
+        if child is None:
+            stack.pop()
+            # the tail of `element` itself lies outside of it
+            if stack and parent.tail:
+                yield parent.tail
+        elif isinstance(child.tag, str) and \
+                child.tag not in SKIPPED_TEXT_TAGS:
+            if child.text:
+                yield child.text
+            stack.append((child, iter(child)))
+        elif child.tail:
+            yield child.tail
+
+
+PARSERS = {
+    "lxml": LxmlParser,
+    "html.parser": SoupParser,
+    "bs4-lxml": lambda: SoupParser("lxml"),
+}
+
+DEFAULT_PARSER = "lxml"
+
+
+def get_parser(parser=DEFAULT_PARSER):
+    # `parser` is a name from `PARSERS` or an already built backend
+    if not isinstance(parser, str):
+        return parser
+    if parser not in PARSERS:
+        raise ValueError(f"Unknown parser '{parser}', "
+                         f"choose one of: {', '.join(PARSERS)}.")
+    return PARSERS[parser]()
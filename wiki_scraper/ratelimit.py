@@ -0,0 +1,132 @@
+# Module containing rate limiting helpers shared by crawlers.
+# Requests are spaced per host, so that fetching from one wiki
+# doesn't slow down fetching from another one.
+# `AdaptiveRateLimiter` also adjusts the spacing to the server:
+# it backs off on `429`/`503` (honoring `Retry-After`)
+# and speeds up again while answers come quickly.
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+# Answers meaning "slow down"
+BACKOFF_STATUSES = (429, 503)
+
+# Requests per second to one host which `AdaptiveRateLimiter`
+# never exceeds by itself
+DEFAULT_MAX_RATE = 4.0
+
+
+class HostRateLimiter:
+    def __init__(self, interval: float):
+        # `interval` is the minimal number of seconds
+        # between the starts of two requests to the same host.
+        self.interval = max(0.0, interval)
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, url: str) -> float:
+        # Books the nearest free slot for the host of `url`
+        # and returns how many seconds the caller has to wait for it.
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        return slot - now
+
+    def wait(self, url: str):
+        delay = self.reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+
+
+class AdaptiveRateLimiter(HostRateLimiter):
+    # Token bucket per host (in its "theoretical arrival time" form):
+    # a token comes every `interval` seconds and at most `burst`
+    # of them are saved up. `interval` starts at the given value
+    # and changes after every answer, see `observe`.
+    # Only requests which go to the network take tokens,
+    # so pages served from a cache never wait.
+
+    # smallest interval after the first back off (seconds)
+    backoff_interval = 1.0
+    # answers slower than that (seconds, on average) slow the crawl down
+    target_latency = 1.0
+
+    def __init__(self, interval: float, max_rate: float | None =
+                 DEFAULT_MAX_RATE, max_interval: float = 60.0,
+                 burst: int = 1):
+        # The interval never gets below `interval` itself
+        # or `1 / max_rate`, whichever is smaller.
+        super().__init__(interval)
+        fastest = 0.0 if max_rate is None else 1.0 / max_rate
+        self.min_interval = min(self.interval, fastest)
+        self.max_interval = max(max_interval, self.interval)
+        self.burst = max(1, burst)
+
+        self._intervals = {}
+        self._latencies = {}
+        self._blocked_until = {}
+
+    def reserve(self, url: str) -> float:
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            interval = self._intervals.get(host, self.interval)
+            arrival = max(now, self._next_slot.get(host, now),
+                          self._blocked_until.get(host, now))
+            # up to `burst` requests may start at once
+            slot = max(now, arrival - (self.burst - 1) * interval)
+            self._next_slot[host] = arrival + interval
+        return slot - now
+
+    def observe(self, url: str, status: int | None, latency: float,
+                retry_after: float | None = None):
+        # Called after every request; `status` is `None`
+        # if there was no answer at all (e.g. connection error).
+        host = urlsplit(url).netloc
+        with self._lock:
+            interval = self._intervals.get(host, self.interval)
+
+            if status is None or status in BACKOFF_STATUSES:
+                interval = max(2 * interval, self.backoff_interval)
+                if retry_after is not None:
+                    self._blocked_until[host] = max(
+                        self._blocked_until.get(host, 0.0),
+                        time.monotonic() + retry_after
+                    )
+            else:
+                # exponential moving average of the latency
+                average = 0.8 * self._latencies.get(host, latency) \
+                    + 0.2 * latency
+                self._latencies[host] = average
+                if average <= self.target_latency:
+                    interval *= 0.9
+                else:
+                    interval *= 1.25
+
+            self._intervals[host] = min(self.max_interval,
+                                        max(self.min_interval, interval))
+
+    def current_interval(self, url: str) -> float:
+        with self._lock:
+            return self._intervals.get(urlsplit(url).netloc, self.interval)
+
+
+def parse_retry_after(value) -> float | None:
+    # `Retry-After` is a number of seconds or an HTTP date;
+    # returns seconds to wait, or `None` if it is missing or invalid.
+    if not isinstance(value, str) or not value.strip():
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date is None or date.tzinfo is None:
+        return None
+    return max(0.0, date.timestamp() - time.time())
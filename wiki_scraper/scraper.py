@@ -1,9 +1,16 @@
 # Module containing implementation of class `Scraper`.
 # This class is responsible for scraping content from an appropriate file or a web-page.
+import codecs
+import mmap
+import os
 import requests
 import time
 from wiki_scraper.article import Article
-from wiki_scraper.exceptions import ArticleNotFound
+from wiki_scraper.exceptions import ArticleNotFound, PageUnavailable
+from wiki_scraper.mediawiki import (FETCH_MODES, get_api_url, get_parse_url,
+                                   html_from_parse_response)
+from wiki_scraper.ratelimit import BACKOFF_STATUSES, parse_retry_after
+from wiki_scraper.session import CachedPage, get_default_pool
 from wiki_scraper.utils import BULBAPEDIA_URL
 
 
@@ -19,13 +26,27 @@ class Scraper:
     }
 
     def __init__(self, phrase: str, base_url=BULBAPEDIA_URL,
-                 use_local_file=False):
+                 use_local_file=False, session=None, cache=None,
+                 fetch_mode="html", limiter=None):
         # if `use_local_file=True`, then path to local file
         # should be given in `base_url`.
         # In such case, encoding is assumed to be `utf-8`.
+        # `session` is an `HttpPool`; by default all scrapers share one.
+        # `cache` is an optional `PageCache` consulted before the web.
+        # `fetch_mode` is `html` (the whole page) or `api` (the content
+        # only, through the wiki's `api.php`, see `mediawiki.py`).
+        # `limiter` is an optional rate limiter (`ratelimit.py`) shared
+        # with other scrapers; requests (never cache hits) wait for it.
+        if fetch_mode not in FETCH_MODES:
+            raise ValueError(f"Unknown fetch mode '{fetch_mode}', "
+                             f"choose one of: {', '.join(FETCH_MODES)}.")
         self.base_url = base_url
         self.phrase = phrase
         self.use_local_file = use_local_file
+        self.session = get_default_pool() if session is None else session
+        self.cache = cache
+        self.fetch_mode = fetch_mode
+        self.limiter = limiter
 
     def scrape(self) -> Article:
         if self.use_local_file:
@@ -34,9 +55,12 @@ class Scraper:
             return self.scrape_from_web()
 
     def scrape_from_file(self) -> Article:
+        # The file is memory-mapped and its bytes go straight
+        # to the parser, instead of being read and decoded first.
         try:
-            with open(self.base_url, "r", encoding="utf-8") as f:
-                html_content = f.read()
+            with open(self.base_url, "rb") as f:
+                html_content = map_file(f)
+            check_utf8(html_content)
             return Article(html_content=html_content, phrase=self.phrase)
         except FileNotFoundError:
             raise ArticleNotFound(
@@ -56,35 +80,71 @@ class Scraper:
             raise ArticleNotFound("Phrase is None.")
 
         self.base_url = self.base_url.rstrip("/")
-        url = f"{self.base_url}/{self.phrase.replace(' ', '_')}"
+        if self.fetch_mode == "api":
+            # API answers are cached apart from whole pages
+            cache_base_url = get_api_url(self.base_url)
+            url = get_parse_url(cache_base_url, self.phrase)
+        else:
+            cache_base_url = self.base_url
+            url = f"{self.base_url}/{self.phrase.replace(' ', '_')}"
+
+        cached = None
+        if self.cache is not None:
+            key = self.cache.key(cache_base_url, self.phrase)
+            cached = self.cache.get(key)
+
+            if cached is not None and \
+                    (self.cache.offline or self.cache.is_fresh(cached)):
+                return self._make_article(cached.text)
+
+            if self.cache.offline:
+                raise ArticleNotFound(
+                    f"'{url}' is not cached and the cache is offline."
+                )
 
         response = None
+        # whether the server answered with an error (the page is missing),
+        # rather than not at all (it may be there next time)
+        refused = False
         for attempt in range(self.num_attempts):
+            if self.limiter is not None:
+                self.limiter.wait(url)
+            started = time.monotonic()
             try:
-                response = requests.get(url, headers=self.headers,
-                                        timeout=self.requests_timeout)
-                # Retry only on 429 -- Too Many Requests
-                if response.status_code == 429:
-                    retry_after = response.headers.get("Retry-After")
-
-                    wait = (
-                        float(retry_after)
-                        if retry_after and retry_after.isdigit()
-                        else self.wait_seconds
-                    )
-                    time.sleep(wait)
-                    continue
+                response = self.session.get(url, headers=self.headers,
+                                            timeout=self.requests_timeout,
+                                            cached=cached)
+            except requests.RequestException:
+                response = None
+                self._back_off(url, None, started)
+                continue
+
+            # Retry on 429 -- Too Many Requests, 503 -- Service Unavailable
+            if response.status_code in BACKOFF_STATUSES:
+                self._back_off(url, response, started)
+                continue
+            if self.limiter is not None:
+                self.limiter.observe(url, response.status_code,
+                                     time.monotonic() - started)
 
+            try:
                 response.raise_for_status()
                 break
             except requests.RequestException:
                 response = None
-                time.sleep(self.wait_seconds)
+                refused = True
+                if self.limiter is None:
+                    time.sleep(self.wait_seconds)
 
         if response is None:
-            raise ArticleNotFound(
+            error = ArticleNotFound if refused else PageUnavailable
+            raise error(
                 f"Failed to fetch '{url}' after {self.num_attempts} attempts."
             )
+        if response.status_code in BACKOFF_STATUSES:
+            raise PageUnavailable(
+                f"HTTP {response.status_code} when fetching '{url}'."
+            )
 
         # Map other error codes to ArticleNotFound explicitly
         if response.status_code >= 400:
@@ -92,5 +152,58 @@ class Scraper:
                 f"HTTP {response.status_code} when fetching '{url}'."
             )
 
-        html_content = response.text
-        return Article(html_content=html_content, phrase=self.phrase)
+        # `304 Not Modified` is answered with the cached copy
+        html_content = self.session.read_text(url, response, cached=cached,
+                                              remember=self.cache is None)
+        # API errors come with `200 OK`, so they are found before caching
+        article = self._make_article(html_content)
+
+        if self.cache is not None:
+            if response.status_code == 304 and cached is not None:
+                self.cache.touch(key)
+            else:
+                self.cache.put(key, CachedPage(
+                    text=html_content,
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified")
+                ))
+
+        return article
+
+    def _back_off(self, url: str, response, started: float):
+        # After a failed request: the shared limiter slows down
+        # (and waits before the next one), or this scraper sleeps.
+        retry_after = (None if response is None else
+                       parse_retry_after(response.headers.get("Retry-After")))
+        if self.limiter is not None:
+            status = None if response is None else response.status_code
+            self.limiter.observe(url, status, time.monotonic() - started,
+                                 retry_after=retry_after)
+        else:
+            time.sleep(self.wait_seconds if retry_after is None
+                       else retry_after)
+
+    def _make_article(self, text: str) -> Article:
+        # `text` is a page, or an answer of the API in `api` mode
+        if self.fetch_mode == "api":
+            text = html_from_parse_response(text, self.phrase)
+        return Article(html_content=text, phrase=self.phrase)
+
+
+def map_file(f):
+    # Read-only memory map of an open file (it stays valid
+    # after the file is closed); empty files can't be mapped.
+    if os.fstat(f.fileno()).st_size == 0:
+        return b""
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def check_utf8(data, chunk_size: int = 1024 * 1024):
+    # Raises `UnicodeDecodeError` if `data` isn't valid UTF-8.
+    # Chunks are decoded one by one and thrown away,
+    # so no decoded copy of the whole file is kept.
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    view = memoryview(data)
+    for start in range(0, len(view), chunk_size):
+        decoder.decode(view[start:start + chunk_size])
+    decoder.decode(b"", final=True)
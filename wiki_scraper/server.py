@@ -0,0 +1,356 @@
+# Module containing the server mode (the `serve` command).
+# `WikiServer` is a long-running process answering commands over HTTP
+# on localhost, so that they don't pay interpreter start-up, imports
+# and cold caches every time: the HTTP pool (keep-alive connections),
+# the page cache, the word-count stores (one per backend) and the table
+# of wordfreq frequencies stay in memory between requests.
+# `POST /run` takes `{"argv": [...], "cwd": "..."}` (a command as for
+# `wiki_scraper.py`, and the directory its relative paths are in)
+# and answers `{"ok": ..., "output": ..., "error": ..., "message": ...}`;
+# `GET /status` tells how many requests were served.
+# Requests are handled in threads, each with its own output.
+# Any web page can make a browser send requests to localhost, so
+# requests with an `Origin`, a `Host` other than localhost (DNS
+# rebinding) or a body other than JSON are refused. Any local user can
+# connect to the TCP port, so files are written only in `output_root`
+# (fixed when the server starts), under the `cwd` of the request.
+# A Unix socket (`socket_path`, which only its owner can connect to)
+# keeps other users of the machine out altogether.
+# The thin client is `wiki_scraper/client.py`.
+import json
+import os
+import socketserver
+import stat
+import sys
+import threading
+import time
+from contextlib import contextmanager, redirect_stdout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from wiki_scraper.cli import (DEFAULT_HOST, DEFAULT_PORT, SERVED_COMMANDS,
+                              parse_command_quietly)
+from wiki_scraper.exceptions import describe_error, reported_error_types
+from wiki_scraper.utils import BULBAPEDIA_URL, get_word_count_store
+
+# Values of `Host` (without the port) sent by local clients
+LOCAL_HOSTS = ("localhost", "127.0.0.1", "[::1]")
+
+
+class ThreadOutput:
+    # Stand-in for `sys.stdout`: what a thread prints while capturing
+    # goes to its own buffer, the rest to `stream`
+    def __init__(self, stream):
+        self.stream = stream
+        self._local = threading.local()
+
+    def write(self, text: str) -> int:
+        return self._target().write(text)
+
+    def flush(self):
+        self._target().flush()
+
+    def __getattr__(self, name):
+        # `encoding`, `isatty` etc. of the real stream
+        return getattr(self.stream, name)
+
+    @contextmanager
+    def capture(self):
+        buffer = StringIO()
+        self._local.buffer = buffer
+        try:
+            yield buffer
+        finally:
+            self._local.buffer = None
+
+    def _target(self):
+        buffer = getattr(self._local, "buffer", None)
+        return self.stream if buffer is None else buffer
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn,
+                              socketserver.UnixStreamServer):
+    # `ThreadingHTTPServer` on a Unix socket
+    daemon_threads = True
+
+    def server_bind(self):
+        # a socket left by a server which died is replaced
+        try:
+            if stat.S_ISSOCK(os.stat(self.server_address).st_mode):
+                os.unlink(self.server_address)
+        except FileNotFoundError:
+            pass
+        super().server_bind()
+        os.chmod(self.server_address, 0o600)
+
+
+class WikiServer:
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 base_url=BULBAPEDIA_URL, session=None, cache=None,
+                 pool_size: int = 10, socket_path=None, output_root=None):
+        # `port=0` picks a free port (see `url`); with `socket_path`
+        # the server listens on that Unix socket instead.
+        # Commands write files only in `output_root` (by default
+        # the current directory).
+        # `cache` is a `PageCache` shared by all requests; the server
+        # doesn't close it.
+        from wiki_scraper.session import HttpPool
+
+        self.base_url = base_url
+        self.own_session = session is None
+        self.session = HttpPool(pool_size=pool_size) if session is None \
+            else session
+        self.cache = cache
+        self.output_root = os.path.realpath(
+            os.getcwd() if output_root is None else output_root
+        )
+        self.stores = {}
+        self.num_requests = 0
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+        self._output = None
+        self._thread = None
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # keep-alive, so that a client can send many commands
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                if self.refuse():
+                    return
+                if self.path == "/status":
+                    self.send_json(200, server.status())
+                else:
+                    self.send_json(404, {"ok": False, "error": "Not found",
+                                         "message": self.path})
+
+            def do_POST(self):
+                # the body is read even if it isn't used, so that
+                # the next request on the connection is read from its start
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length)
+                if self.path != "/run":
+                    self.send_json(404, {"ok": False, "error": "Not found",
+                                         "message": self.path})
+                    return
+                if self.refuse(body="application/json"):
+                    return
+                try:
+                    request = json.loads(body)
+                    argv = [str(arg) for arg in request["argv"]]
+                    cwd = request.get("cwd")
+                except (ValueError, KeyError, TypeError) as e:
+                    self.send_json(400, {"ok": False,
+                                         "error": "Invalid request",
+                                         "message": str(e)})
+                    return
+                self.send_json(*server.run(argv, cwd=cwd))
+
+            def refuse(self, body=None) -> bool:
+                # Answers a request which isn't served; `body` is
+                # the required content type of its body
+                refused = refused_request(self.headers, body)
+                if refused is not None:
+                    status, message = refused
+                    self.send_json(status, {"ok": False,
+                                            "error": "Request refused",
+                                            "message": message})
+                return refused is not None
+
+            def send_json(self, status: int, answer: dict):
+                body = json.dumps(answer, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type",
+                                 "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # commands report their own errors
+                pass
+
+        self.socket_path = socket_path
+        if socket_path is not None:
+            self._httpd = ThreadingUnixHTTPServer(str(socket_path), Handler)
+        else:
+            self._httpd = ThreadingHTTPServer((host, port), Handler)
+            self._httpd.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        # what `--server` of the client takes, with `http://` for TCP
+        if self.socket_path is not None:
+            return f"unix:{self.socket_path}"
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def run(self, argv: list[str], cwd=None) -> tuple[int, dict]:
+        # Runs one command; returns (HTTP status, answer)
+        with self._lock:
+            self.num_requests += 1
+
+        args, error = parse_command_quietly(argv)
+        if args is None:
+            return 400, {"ok": False, "error": "Invalid command",
+                         "message": error}
+        if args.cmd not in SERVED_COMMANDS:
+            return 400, {"ok": False, "error": "Invalid command",
+                         "message": f"`{args.cmd}` isn't served, choose one "
+                                    f"of: {', '.join(SERVED_COMMANDS)}."}
+        # files are written where the client is, and nowhere else
+        try:
+            set_output_dir(args, self.output_root if cwd is None else cwd,
+                           self.output_root)
+        except ValueError as e:
+            return 400, {"ok": False, "error": "Invalid command",
+                         "message": str(e)}
+
+        with self._capture() as buffer:
+            try:
+                self._run_command(args)
+            except reported_error_types() as e:
+                return 200, {"ok": False, "output": buffer.getvalue(),
+                             "error": describe_error(e), "message": str(e)}
+            except Exception as e:
+                # the server keeps serving other commands
+                return 500, {"ok": False, "output": buffer.getvalue(),
+                             "error": "Internal error",
+                             "message": f"{type(e).__name__}: {e}"}
+        return 200, {"ok": True, "output": buffer.getvalue()}
+
+    def status(self) -> dict:
+        return {"ok": True, "requests": self.num_requests,
+                "uptime": round(time.monotonic() - self.started, 3),
+                "http": self.session.stats()}
+
+    def serve_forever(self):
+        # Serves until `shutdown` (or Ctrl+C, in the main thread)
+        self._output = ThreadOutput(sys.stdout)
+        sys.stdout = self._output
+        try:
+            self._httpd.serve_forever()
+        finally:
+            sys.stdout = self._output.stream
+            self._output = None
+
+    def shutdown(self):
+        self._httpd.shutdown()
+
+    def close(self):
+        self._httpd.server_close()
+        if self.socket_path is not None:
+            try:
+                os.unlink(self.socket_path)
+            except FileNotFoundError:
+                pass
+        for store in self.stores.values():
+            store.close()
+        self.stores.clear()
+        if self.own_session:
+            self.session.close()
+
+    def __enter__(self):
+        # serves in a background thread
+        self._thread = threading.Thread(target=self.serve_forever,
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+        self._thread.join()
+        self.close()
+
+    @contextmanager
+    def _capture(self):
+        if self._output is None:
+            # not serving, so the caller's thread is the only one
+            buffer = StringIO()
+            with redirect_stdout(buffer):
+                yield buffer
+        else:
+            with self._output.capture() as buffer:
+                yield buffer
+
+    def _run_command(self, args):
+        from wiki_scraper.batch import ARTICLE_COMMANDS, download_article
+        from wiki_scraper.controller import Controller
+
+        article = None
+        if args.cmd in ARTICLE_COMMANDS:
+            # downloads of many requests run at the same time
+            article = download_article(args.phrase,
+                                       getattr(args, "fetch", "html"),
+                                       self.base_url, self.session,
+                                       self.cache)
+        store = self._get_store(args)
+        Controller(args, article=article, cache=self.cache,
+                   store=store).run()
+        if store is not None and args.cmd == "count-words":
+            # counts survive the server being killed
+            store.flush()
+
+    def _get_store(self, args):
+        if not hasattr(args, "store"):
+            return None
+        with self._lock:
+            if args.store not in self.stores:
+                self.stores[args.store] = get_word_count_store(args.store)
+            return self.stores[args.store]
+
+
+def refused_request(headers, body=None) -> tuple[int, str] | None:
+    # (HTTP status, message) if a request with `headers` isn't served.
+    # Browsers send `Origin` with cross-site requests, and can't send
+    # a JSON body to another site without asking it first (CORS).
+    if headers.get("Origin") is not None:
+        return 403, "Requests from web pages aren't served."
+    host = headers.get("Host", "").strip().lower()
+    if not host.endswith("]"):
+        # without the port (but not inside `[::1]`)
+        host = host.rsplit(":", 1)[0]
+    if host not in LOCAL_HOSTS:
+        return 403, f"Host '{headers.get('Host')}' isn't served."
+    if body is not None and headers.get_content_type() != body:
+        return 415, f"The body must be `{body}`."
+    return None
+
+
+def set_output_dir(args, cwd: str, root: str):
+    # Makes files of the command be written under `cwd`, which must
+    # be in `root` (raises `ValueError` for paths outside of them)
+    if args.cmd != "table" and getattr(args, "chart", None) is None:
+        # no files to write
+        return
+    if not os.path.isabs(cwd):
+        raise ValueError(f"'{cwd}' isn't an absolute path.")
+    cwd = inside_dir(root, cwd)
+    args.output_dir = cwd
+    if args.cmd == "table":
+        inside_dir(cwd, args.phrase + "." + args.format)
+    if getattr(args, "chart", None) is not None:
+        args.chart = [inside_dir(cwd, path) for path in args.chart]
+
+
+def inside_dir(directory: str, path: str) -> str:
+    # `path` relative to `directory`, if it doesn't leave it
+    # (symbolic links are followed)
+    directory = os.path.realpath(directory)
+    full_path = os.path.realpath(os.path.join(directory, path))
+    if os.path.commonpath([directory, full_path]) != directory:
+        raise ValueError(f"'{path}' is outside of '{directory}'.")
+    return full_path
+
+
+def warm_up(lang: str = "en"):
+    # Imports what commands use and loads the table of frequencies,
+    # so the first requests are as quick as the next ones
+    from importlib import import_module
+    from wiki_scraper.freq_table import get_frequency_table
+
+    for module in ("lxml.html", "pandas", "matplotlib.figure",
+                   "matplotlib.backends.backend_agg"):
+        import_module(module)
+    get_frequency_table(lang)
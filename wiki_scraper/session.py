@@ -0,0 +1,155 @@
+# Module containing implementation of class `HttpPool`.
+# It is a shared, pooled HTTP session used by every `Scraper`,
+# so that connections are kept alive and reused across a whole crawl.
+# Pages fetched before are revalidated with conditional requests.
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+import requests
+from requests.adapters import HTTPAdapter
+
+
+@dataclass
+class CachedPage:
+    text: str
+    etag: str | None = None
+    last_modified: str | None = None
+    size: int = 0
+    fetched_at: float = 0.0
+
+
+class HttpPool:
+    def __init__(self, pool_size: int = 10,
+                 max_cached_bytes: int = 16 * 1024 * 1024):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size,
+                              pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # Remembers validators (and bodies) of recently fetched pages,
+        # so that they can be revalidated instead of downloaded again.
+        # A body is needed to answer `304 Not Modified`, so bodies are
+        # kept, the least recently used ones dropped beyond
+        # `max_cached_bytes` in total.
+        self.max_cached_bytes = max_cached_bytes
+        self._cached = OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+
+        self.num_requests = 0
+        self.num_not_modified = 0
+        self.bytes_saved = 0
+
+    def get(self, url: str, headers: dict, timeout: float, cached=None):
+        # `cached` is a copy kept elsewhere (e.g. in a `PageCache`);
+        # if not given, the pool's own memory is consulted.
+        if cached is None:
+            cached = self.get_cached(url)
+        if cached is not None:
+            headers = {**headers, **conditional_headers(cached)}
+
+        response = self.session.get(url, headers=headers, timeout=timeout)
+
+        with self._lock:
+            self.num_requests += 1
+        return response
+
+    def read_text(self, url: str, response, cached=None,
+                  remember: bool = True) -> str:
+        # Returns the body of `response`, taking it from the cached copy
+        # if the server answered `304 Not Modified`. Without `remember`
+        # the page isn't kept in memory (e.g. a `PageCache` keeps it).
+        if response.status_code == 304:
+            if cached is None:
+                cached = self.get_cached(url)
+            if cached is not None:
+                with self._lock:
+                    self.num_not_modified += 1
+                    self.bytes_saved += cached.size
+                return cached.text
+
+        text = response.text
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+
+        if remember and (etag is not None or last_modified is not None):
+            self.put_cached(url, CachedPage(
+                text=text,
+                etag=etag,
+                last_modified=last_modified,
+                size=len(response.content)
+            ))
+        return text
+
+    def get_cached(self, url: str) -> CachedPage | None:
+        with self._lock:
+            cached = self._cached.get(url)
+            if cached is not None:
+                self._cached.move_to_end(url)
+            return cached
+
+    def put_cached(self, url: str, page: CachedPage):
+        with self._lock:
+            old_page = self._cached.pop(url, None)
+            if old_page is not None:
+                self._cached_bytes -= _cached_size(old_page)
+            if _cached_size(page) > self.max_cached_bytes:
+                # it would push out everything else
+                return
+            self._cached[url] = page
+            self._cached_bytes += _cached_size(page)
+            while self._cached_bytes > self.max_cached_bytes:
+                _, evicted = self._cached.popitem(last=False)
+                self._cached_bytes -= _cached_size(evicted)
+
+    def stats(self) -> dict[str, int]:
+        opened = 0
+        served = 0
+        # the same adapter is mounted for both `http://` and `https://`
+        adapters = {id(a): a for a in self.session.adapters.values()}
+        for adapter in adapters.values():
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is not None:
+                    opened += pool.num_connections
+                    served += pool.num_requests
+
+        return {
+            "requests": self.num_requests,
+            "connections opened": opened,
+            "connections reused": max(0, served - opened),
+            "not modified": self.num_not_modified,
+            "bytes saved": self.bytes_saved,
+        }
+
+    def close(self):
+        self.session.close()
+
+
+def _cached_size(page: CachedPage) -> int:
+    # Bytes of the body (as downloaded, if known)
+    return page.size or len(page.text)
+
+
+def conditional_headers(cached: CachedPage) -> dict[str, str]:
+    headers = {}
+    if cached.etag is not None:
+        headers["If-None-Match"] = cached.etag
+    if cached.last_modified is not None:
+        headers["If-Modified-Since"] = cached.last_modified
+    return headers
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_default_pool() -> HttpPool:
+    # Pool shared by all scrapers which weren't given their own one.
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = HttpPool()
+        return _default_pool
@@ -0,0 +1,122 @@
+# Module containing the binary snapshot of word-count totals.
+# A snapshot is a directory with the sorted vocabulary (UTF-8 bytes)
+# and the counts as `.npy` files, read memory-mapped, and a stamp
+# of the JSON file it was made of. `WordCountStore` keeps one next
+# to `word-counts.json`, so queries don't parse the JSON file.
+# It is a module of its own, so that NumPy is imported only
+# by commands which read counts.
+import io
+from json import dumps, load
+from pathlib import Path
+import numpy as np
+from wiki_scraper.utils import atomic_write
+
+
+def empty_snapshot():
+    return np.array([], dtype="S1"), np.array([], dtype=np.int64)
+
+
+def read_snapshot(directory: Path, stamp):
+    # Returns (words, counts), or `None` if there is no snapshot
+    # of the JSON file with `stamp`
+    try:
+        with open(directory / "stamp.json", "r") as f:
+            if load(f) != stamp:
+                return None
+        words = np.load(directory / "words.npy", mmap_mode="r")
+        counts = np.load(directory / "counts.npy", mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+
+    if len(words) != len(counts):
+        return None
+    return words, counts
+
+
+def write_snapshot(directory: Path, counts: dict[str, int], stamp):
+    # Words are sorted (by their UTF-8 bytes, which is the order
+    # of `str`), so they are found by binary search.
+    # The stamp is written last: until then the snapshot is stale.
+    vocabulary = sorted(counts)
+    words = np.array([word.encode("utf-8") for word in vocabulary],
+                     dtype=bytes if vocabulary else "S1")
+    values = np.array([counts[word] for word in vocabulary],
+                      dtype=np.int64)
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        for name, array in (("words.npy", words), ("counts.npy", values)):
+            data = io.BytesIO()
+            np.save(data, array)
+            atomic_write(directory / name, data.getvalue())
+        atomic_write(directory / "stamp.json", dumps(stamp).encode("utf-8"))
+    except OSError:
+        # queries still work, they are just not cached
+        pass
+    return words, values
+
+
+def find_in_snapshot(vocabulary: np.ndarray, words: list[str]):
+    # Positions of `words` in the sorted vocabulary and whether
+    # each of them is there at all
+    keys = np.array([word.encode("utf-8") for word in words], dtype=bytes)
+    if len(vocabulary) == 0:
+        return np.zeros(len(words), dtype=np.intp), \
+            np.zeros(len(words), dtype=bool)
+    positions = np.searchsorted(vocabulary, keys)
+    clipped = np.minimum(positions, len(vocabulary) - 1)
+    hits = (positions < len(vocabulary)) & (vocabulary[clipped] == keys)
+    return clipped, hits
+
+
+def snapshot_lookup(vocabulary: np.ndarray, counts: np.ndarray,
+                    words: list[str]) -> np.ndarray:
+    # Counts of `words` in a snapshot (0 for missing ones)
+    found = np.zeros(len(words), dtype=np.int64)
+    if len(words) == 0:
+        return found
+    positions, hits = find_in_snapshot(vocabulary, words)
+    found[hits] = counts[positions[hits]]
+    return found
+
+
+def merge_delta(vocabulary: np.ndarray, counts: np.ndarray,
+                delta: dict[str, int]):
+    # Snapshot with `delta` added, still sorted by word
+    words = list(delta)
+    values = np.array([delta[word] for word in words], dtype=np.int64)
+    positions, hits = find_in_snapshot(vocabulary, words)
+
+    counts = np.array(counts, dtype=np.int64)
+    np.add.at(counts, positions[hits], values[hits])
+
+    new_words = [word.encode("utf-8")
+                 for word, hit in zip(words, hits) if not hit]
+    if len(new_words) == 0:
+        return vocabulary, counts
+    vocabulary = np.concatenate((vocabulary, np.array(new_words)))
+    counts = np.concatenate((counts, values[~hits]))
+    order = np.argsort(vocabulary, kind="stable")
+    return vocabulary[order], counts[order]
+
+
+def top_n_indices(counts: np.ndarray, n: int) -> np.ndarray:
+    # Indices of the `n` largest counts, largest first, ties in the order
+    # of `counts` (as in `Counter.most_common`). Only the top `n` are
+    # sorted; the rest is just partitioned away.
+    size = len(counts)
+    n = max(0, min(n, size))
+    if n == 0:
+        return np.empty(0, dtype=np.intp)
+
+    if n < size:
+        # the n-th largest count; of counts equal to it,
+        # only the earliest ones make it to the top
+        kth = np.partition(counts, size - n)[size - n]
+        above = np.flatnonzero(counts > kth)
+        ties = np.flatnonzero(counts == kth)[:n - len(above)]
+        chosen = np.concatenate((above, ties))
+        chosen.sort()
+    else:
+        chosen = np.arange(size)
+
+    return chosen[np.argsort(-counts[chosen], kind="stable")]
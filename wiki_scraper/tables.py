@@ -0,0 +1,256 @@
+# Module containing the table-extraction engine used by `Article`.
+# Tables (lxml elements) are read straight into rows of cell texts
+# (header, body and footer, with `rowspan` / `colspan` expanded)
+# and turned into DataFrames by pandas' `TextParser`, with the same
+# rules `pandas.read_html` follows, but without serializing the table
+# and parsing it again. Only rows of the table itself are read:
+# a nested table is a table of its own (and text of the cell it's in),
+# while `read_html` would also mix its rows into the outer table.
+# Tables are written as CSV, or into columnar Parquet / Feather files
+# (these need pyarrow, an optional dependency).
+import re
+from importlib.util import find_spec
+from wiki_scraper.exceptions import MissingDependency
+
+# Same whitespace clean-up as in `read_html`
+WHITESPACE = re.compile(r"[\r\n]+|\s{2,}")
+
+# Tags whose text is not a part of a cell
+SKIPPED_TAGS = frozenset(("style", "script"))
+
+# Output formats of tables, with modules they need
+TABLE_FORMATS = ("csv", "parquet", "feather")
+FORMAT_DEPENDENCIES = {"parquet": "pyarrow", "feather": "pyarrow"}
+
+
+def parse_table(table) -> tuple[list, list, list]:
+    # Returns (header, body, footer) rows of the table's cell texts
+    header_rows, body_rows, footer_rows = _table_rows(table)
+
+    if not header_rows:
+        # No `<thead>`: rows of `<th>` cells on top make the header
+        while body_rows and all(cell.tag == "th"
+                                for cell in _row_cells(body_rows[0])):
+            header_rows.append(body_rows.pop(0))
+
+    header, remainder = expand_spans(header_rows)
+    body, remainder = expand_spans(body_rows, remainder=remainder,
+                                   overflow=len(footer_rows) > 0)
+    footer, _ = expand_spans(footer_rows, remainder=remainder,
+                             overflow=False)
+    return header, body, footer
+
+
+def table_to_frame(sections):
+    # DataFrame of (header, body, footer) rows; the header is inferred,
+    # and values are converted (numbers, `NaN`s) as by `read_html`
+    from pandas import DataFrame
+    from pandas.io.parsers import TextParser
+
+    header_rows, body_rows, footer_rows = sections
+    header = None
+    if header_rows:
+        if len(header_rows) == 1:
+            header = 0
+        else:
+            # rows with no text at all are not a part of the header
+            header = [i for i, row in enumerate(header_rows) if any(row)]
+    rows = header_rows + body_rows + footer_rows
+    if not any(any(row) for row in rows):
+        return DataFrame()
+
+    # ragged rows are filled up with empty cells
+    width = max(len(row) for row in rows)
+    rows = [row + [""] * (width - len(row)) for row in rows]
+
+    with TextParser(rows, header=header, thousands=",",
+                    decimal=".") as parser:
+        return parser.read()
+
+
+def expand_spans(rows, remainder=None, overflow: bool = True):
+    # Texts of `<tr>`s with the text of a cell spanning many columns
+    # or rows copied to all of them. `remainder` are cells spanning
+    # rows of a previous section, as (column, text, rows left).
+    # Without `overflow`, rows made of such cells only are appended,
+    # otherwise they are returned as the new remainder.
+    remainder = [] if remainder is None else remainder
+    texts_of_rows = []
+
+    for row in rows:
+        texts = []
+        next_remainder = []
+        column = 0
+        for cell in _row_cells(row):
+            # cells of rows above which come before this one
+            while remainder and remainder[0][0] <= column:
+                prev_column, text, rows_left = remainder.pop(0)
+                texts.append(text)
+                if rows_left > 1:
+                    next_remainder.append((prev_column, text, rows_left - 1))
+                column += 1
+
+            text = cell_text(cell)
+            rowspan = _span(cell, "rowspan")
+            for _ in range(_span(cell, "colspan")):
+                texts.append(text)
+                if rowspan > 1:
+                    next_remainder.append((column, text, rowspan - 1))
+                column += 1
+
+        # cells of rows above at the end of this one
+        for prev_column, text, rows_left in remainder:
+            texts.append(text)
+            if rows_left > 1:
+                next_remainder.append((prev_column, text, rows_left - 1))
+
+        texts_of_rows.append(texts)
+        remainder = next_remainder
+
+    if not overflow:
+        while remainder:
+            texts_of_rows.append([text for _, text, _ in remainder])
+            remainder = [(column, text, rows_left - 1)
+                         for column, text, rows_left in remainder
+                         if rows_left > 1]
+
+    return texts_of_rows, remainder
+
+
+def cell_text(cell) -> str:
+    # Text of the cell (`<br>` is a line break) without hidden elements,
+    # `<style>` and `<script>`, with whitespace squeezed
+    parts = [cell.text] if cell.text else []
+
+    # Iterative walk (cells can be nested deeper than the recursion limit)
+    stack = [(cell, iter(cell))]
+    while stack:
+        parent, children = stack[-1]
+        child = next(children, None)
+
+        if child is None:
+            stack.pop()
+            # the tail of `cell` itself lies outside of it
+            if stack and parent.tail:
+                parts.append(parent.tail)
+        elif not isinstance(child.tag, str) or child.tag in SKIPPED_TAGS \
+                or not _is_shown(child):
+            # comments and skipped elements leave their tails only
+            if child.tail:
+                parts.append(child.tail)
+        elif child.tag == "br":
+            parts.append("\n" + (child.tail or ""))
+        else:
+            if child.text:
+                parts.append(child.text)
+            stack.append((child, iter(child)))
+
+    return WHITESPACE.sub(" ", "".join(parts).strip())
+
+
+def check_table_format(fmt: str):
+    # Raises `MissingDependency` if the format can't be written here
+    # (checked before any download)
+    module = FORMAT_DEPENDENCIES.get(fmt)
+    if module is not None and find_spec(module) is None:
+        raise MissingDependency(f"Writing {fmt} files needs {module} "
+                                f"(pip install {module}).")
+
+
+def write_table(df, path, fmt: str = "csv"):
+    check_table_format(fmt)
+    if fmt == "csv":
+        df.to_csv(path, index=False)
+    elif fmt == "parquet":
+        df.to_parquet(path, index=False)
+    elif fmt == "feather":
+        df.to_feather(path)
+    else:
+        raise ValueError(f"Unsupported table format '{fmt}', "
+                         f"choose one of: {', '.join(TABLE_FORMATS)}.")
+
+
+def _table_rows(table):
+    # `<tr>`s of the table itself, by section (not of nested tables)
+    header_rows, body_rows, footer_rows, root_rows = [], [], [], []
+    for child in table:
+        if not isinstance(child.tag, str) or not _is_shown(child):
+            continue
+        if child.tag == "thead":
+            header_rows.extend(_section_rows(child))
+            # a `<thead>` with cells but no `<tr>` is a row itself
+            if any(cell.tag in ("td", "th") for cell in child):
+                header_rows.append(child)
+        elif child.tag == "tbody":
+            body_rows.extend(_section_rows(child))
+        elif child.tag == "tfoot":
+            footer_rows.extend(_section_rows(child))
+        elif child.tag == "tr":
+            root_rows.append(child)
+    return header_rows, body_rows + root_rows, footer_rows
+
+
+def _section_rows(section) -> list:
+    return [row for row in section
+            if row.tag == "tr" and _is_shown(row)]
+
+
+def _row_cells(row) -> list:
+    return [cell for cell in row
+            if cell.tag in ("td", "th") and _is_shown(cell)]
+
+
+def _is_shown(element) -> bool:
+    style = element.get("style")
+    return style is None or "display:none" not in style.replace(" ", "")
+
+
+def _span(cell, name: str) -> int:
+    try:
+        return int(cell.get(name) or 1)
+    except ValueError:
+        # not a number, e.g. `colspan="two"`
+        return 1
+
+
+def value_counts(df):
+    # Counts of values in all cells of the table (`NaN`s skipped),
+    # as `Series(df.values.ravel()).value_counts()` gives them (equal
+    # counts in the order of first appearance, row by row), but counted
+    # per column on categorical codes, so no flattened copy is made
+    from numpy import bincount, concatenate, full, lexsort, maximum, minimum
+    from pandas import Index, Series, factorize
+
+    values, counts, firsts = [], [], []
+    width = df.shape[1]
+    for position in range(width):
+        # codes of a categorical column are used as they are; other
+        # columns are encoded with codes in the order of appearance
+        codes, uniques = factorize(df.iloc[:, position])
+        rows = (codes >= 0).nonzero()[0]
+        codes = codes[rows]
+        # a code seen for the first time is bigger than all before it
+        first_seen = codes > maximum.accumulate(concatenate(([-1],
+                                                              codes[:-1])))
+        first_codes = codes[first_seen]
+
+        values.append(Index(uniques).take(first_codes))
+        counts.append(bincount(codes, minlength=len(uniques))[first_codes])
+        # first row of every value, as a position of a cell
+        firsts.append(rows[first_seen] * width + position)
+
+    if not values:
+        # a table with no columns (flattening it copies nothing)
+        return Series(df.values.ravel()).value_counts()
+
+    # values of many columns (e.g. `1` and `1.0`) are merged
+    merged = values[0].append(values[1:])
+    groups, uniques = factorize(merged)
+    totals = bincount(groups, weights=concatenate(counts),
+                      minlength=len(uniques)).astype("int64")
+    first = full(len(uniques), df.size)
+    minimum.at(first, groups, concatenate(firsts))
+
+    order = lexsort((first, -totals))
+    return Series(totals[order], index=Index(uniques).take(order),
+                  name="count")
@@ -1,94 +1,347 @@
 # Module containing utility stuff.
-from json import load, dump
-from wordfreq import word_frequency, top_n_list
-from pandas import DataFrame
-import time
-import matplotlib.pyplot as plt
+from collections import Counter
+from json import load, loads, dumps
+import os
+import stat
+import tempfile
+import threading
 from pathlib import Path
+from wiki_scraper.ratelimit import AdaptiveRateLimiter, DEFAULT_MAX_RATE
 
 OK = 0
 BULBAPEDIA_URL = "https://bulbapedia.bulbagarden.net/wiki/"
 repo_root = Path(__file__).resolve().parent.parent
 dict_path = repo_root / "wiki_scraper" / "word-counts.json"
 
-
-def update_word_counts(to_add: dict[str, int]):
-    existing_counts = {}
-
-    if dict_path.exists():
-        with open(dict_path, "r", encoding="utf-8") as f:
-            existing_counts = load(f)
-
-    existing_counts.update(to_add)
-
-    with open(dict_path, "w", encoding="utf-8") as f:
-        dump(existing_counts, f, indent=4, ensure_ascii=False)
-
-
-def analyze_relative_word_freq(mode: str, n: int, chart_path=None):
-    data = get_relative_freq_table(mode=mode, n=n)
+# The umask can only be read by setting it, which isn't safe while
+# other threads create files, so it's read once, on import
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+
+# First record of a delta log: `["base", <stamp of the JSON file>]`
+LOG_HEADER = "base"
+
+
+class WordCountStore:
+    # Additive store of word counts kept in `word-counts.json`.
+    # Updates are buffered in memory and flushed in batches
+    # to an append-only delta log (one JSON object per line, after
+    # a header naming the JSON file it adds to), which is compacted
+    # into the JSON file once it grows big enough (and on `close`).
+    # The JSON file is always replaced atomically.
+    # Next to it a binary snapshot of the totals is kept (sorted
+    # vocabulary and counts in `.npy` files), rebuilt whenever the JSON
+    # file changes; `total`, `top` and `lookup` read it memory-mapped
+    # instead of parsing the JSON file.
+    def __init__(self, path=None, flush_every: int = 20,
+                 compact_bytes: int = 8 * 1024 * 1024):
+        self.path = Path(dict_path if path is None else path)
+        self.log_path = self.path.with_name(self.path.name + ".log")
+        # log being compacted
+        self.old_log_path = self.path.with_name(self.path.name + ".log.old")
+        self.snapshot_dir = self.path.with_name(self.path.name + ".snapshot")
+        self.flush_every = flush_every
+        self.compact_bytes = compact_bytes
+
+        self._pending = Counter()
+        self._pending_adds = 0
+        self._lock = threading.Lock()
+
+    def add(self, counts: dict[str, int], article: str | None = None):
+        # `article` is accepted for compatibility with the SQLite store;
+        # this store keeps totals only, so counting an article twice
+        # adds its counts twice.
+        with self._lock:
+            self._pending.update(counts)
+            self._pending_adds += 1
+            if self._pending_adds >= self.flush_every:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def compact(self):
+        with self._lock:
+            self._flush()
+            self._compact()
+
+    def load(self) -> dict[str, int]:
+        # Current totals: the JSON file, the delta logs and pending updates
+        with self._lock:
+            counts = self._load_compacted()
+            for log_path in self._logs():
+                for delta in _read_log(log_path):
+                    counts.update(delta)
+            counts.update(self._pending)
+            return dict(counts)
+
+    def total(self) -> int:
+        with self._lock:
+            _, counts, delta = self._snapshot_with_delta()
+            return int(counts.sum()) + sum(delta.values())
+
+    def top(self, n: int) -> list[tuple[str, int]]:
+        # Ties are in alphabetical order (as in the SQLite store)
+        from wiki_scraper.snapshot import merge_delta, top_n_indices
+
+        with self._lock:
+            words, counts, delta = self._snapshot_with_delta()
+        if delta:
+            words, counts = merge_delta(words, counts, delta)
+        return [(words[i].decode("utf-8"), int(counts[i]))
+                for i in top_n_indices(counts, n)]
+
+    def lookup(self, words: list[str]) -> dict[str, int]:
+        from wiki_scraper.snapshot import snapshot_lookup
+
+        with self._lock:
+            vocabulary, counts, delta = self._snapshot_with_delta()
+        found = snapshot_lookup(vocabulary, counts, words)
+        return {word: int(count) + delta.get(word, 0)
+                for word, count in zip(words, found)}
+
+    def close(self):
+        self.compact()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _flush(self):
+        if not self._pending:
+            self._pending_adds = 0
+            return
+
+        line = dumps(self._pending, ensure_ascii=False) + "\n"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if not self.log_path.exists():
+            # A new log starts with the stamp of the JSON file it adds
+            # to; the JSON file doesn't change while the log is in use,
+            # so a log left by an interrupted compaction is settled first.
+            self._settle_old_log()
+            line = dumps([LOG_HEADER, self._json_stamp()]) + "\n" + line
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(line)
+            size = f.tell()
+
+        self._pending = Counter()
+        self._pending_adds = 0
+
+        if size >= self.compact_bytes:
+            self._compact()
+
+    def _compact(self):
+        # 1. the log is moved aside, so new deltas go to a fresh one,
+        # 2. totals are written atomically to the JSON file,
+        # 3. the old log is removed.
+        # If this is interrupted after 2., the old log is recognized
+        # as merged (the JSON file isn't the one in its header anymore)
+        # and dropped, see `_settle_old_log`.
+        self._settle_old_log()
+        if not self.log_path.exists():
+            return
+        os.replace(self.log_path, self.old_log_path)
+        self._merge_old_log()
+
+    def _merge_old_log(self):
+        counts = self._load_compacted()
+        for delta in _read_log(self.old_log_path):
+            counts.update(delta)
+
+        data = dumps(counts, ensure_ascii=False, separators=(",", ":"))
+        atomic_write(self.path, data.encode("utf-8"))
+        self._write_snapshot(counts)
+        self.old_log_path.unlink(missing_ok=True)
+
+    def _settle_old_log(self):
+        # An old log left by an interrupted compaction
+        if not self.old_log_path.exists():
+            return
+        if self._old_log_merged():
+            self.old_log_path.unlink()
+        else:
+            self._merge_old_log()
+
+    def _old_log_merged(self) -> bool:
+        # Logs of older versions have no header; they are merged
+        # (an interrupted compaction of one may count it twice)
+        header = _read_log_header(self.old_log_path)
+        return header is not None and header[1] != self._json_stamp()
+
+    def _logs(self) -> list[Path]:
+        # Delta logs not merged into the JSON file yet
+        if self.old_log_path.exists() and not self._old_log_merged():
+            return [self.old_log_path, self.log_path]
+        return [self.log_path]
+
+    def _load_compacted(self) -> Counter:
+        counts = Counter()
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                counts.update(load(f))
+        return counts
+
+    def _snapshot_with_delta(self):
+        # Snapshot of the JSON file (vocabulary, counts)
+        # and what the delta logs and pending updates add to it
+        words, counts = self._read_snapshot()
+        delta = Counter()
+        for log_path in self._logs():
+            for log_delta in _read_log(log_path):
+                delta.update(log_delta)
+        delta.update(self._pending)
+        return words, counts, delta
+
+    def _json_stamp(self) -> list[int] | None:
+        # Identifies the version of the JSON file the snapshot was made of
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return [stat.st_ino, stat.st_mtime_ns, stat.st_size]
+
+    def _read_snapshot(self):
+        from wiki_scraper.snapshot import (empty_snapshot, read_snapshot,
+                                           write_snapshot)
+
+        stamp = self._json_stamp()
+        if stamp is None:
+            return empty_snapshot()
+
+        snapshot = read_snapshot(self.snapshot_dir, stamp)
+        if snapshot is not None:
+            return snapshot
+
+        # missing, or the JSON file was changed since
+        with open(self.path, "r", encoding="utf-8") as f:
+            return write_snapshot(self.snapshot_dir, load(f), stamp)
+
+    def _write_snapshot(self, counts: dict[str, int]):
+        from wiki_scraper.snapshot import write_snapshot
+
+        return write_snapshot(self.snapshot_dir, counts, self._json_stamp())
+
+
+def _read_log(log_path: Path):
+    # Deltas of a log (its header is skipped)
+    if not log_path.exists():
+        return
+    with open(log_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                delta = loads(line)
+            except ValueError:
+                # the last line may be cut if writing it was interrupted
+                continue
+            if isinstance(delta, dict):
+                yield delta
+
+
+def _read_log_header(log_path: Path) -> list | None:
+    # `[LOG_HEADER, stamp]` of the log, if it has one
+    try:
+        with open(log_path, "r", encoding="utf-8") as f:
+            header = loads(f.readline())
+    except (FileNotFoundError, ValueError):
+        return None
+    if isinstance(header, list) and len(header) == 2 and \
+            header[0] == LOG_HEADER:
+        return header
+    return None
+
+
+STORE_BACKENDS = ("json", "sqlite")
+
+
+def get_word_count_store(backend: str = "json", path=None):
+    if backend == "sqlite":
+        from wiki_scraper.word_index import SqliteWordCountStore
+        return SqliteWordCountStore(path)
+    return WordCountStore(path)
+
+
+def update_word_counts(to_add: dict[str, int], store=None,
+                       article: str | None = None):
+    # Adds `to_add` (counted in `article`) to the totals.
+    # Without a `store` (which batches updates),
+    # the totals on disk are updated right away.
+    if store is not None:
+        store.add(to_add, article=article)
+        return
+
+    with WordCountStore() as store:
+        store.add(to_add, article=article)
+
+
+def analyze_relative_word_freq(mode: str, n: int, chart_path=None,
+                               store=None, renderer=None):
+    # `chart_path` is a path (or a list of paths) of charts to draw,
+    # in formats told by their suffixes (`.png`, `.svg`, `.txt`).
+    # A `renderer` (`charts.ChartRenderer`) can be shared by many calls.
+    data = get_relative_freq_table(mode=mode, n=n, store=store)
 
     print(data)
 
-    if chart_path is not None:
-        dyn_width = max(10, int(n * 0.8))
-        data.plot(
-            x="word",
-            y=["frequency in the article", "frequency in the wiki language"],
-            kind="bar",
-            color=["royalblue", "indianred"],
-            title=(f"Top {n} words by relative frequency "
-                   f"(sorted by appearance in {mode})"),
-            xlabel="",
-            ylabel="Frequency",
-            legend=True,
-            figsize=(dyn_width, 6),
-            rot=0
-        )
-        plt.savefig(chart_path)
-
-
-def get_relative_freq_table(mode: str, n: int) -> DataFrame:
-    word_counts = {}
-
-    if dict_path.exists():
-        with open(dict_path, "r", encoding="utf-8") as f:
-            word_counts = load(f)
-
-    total = sum(word_counts.values())
+    if chart_path is None:
+        return
+    from wiki_scraper.charts import ChartRenderer
+
+    paths = [chart_path] if isinstance(chart_path, (str, Path)) \
+        else list(chart_path)
+    title = (f"Top {n} words by relative frequency "
+             f"(sorted by appearance in {mode})")
+    own_renderer = renderer is None
+    renderer = ChartRenderer() if own_renderer else renderer
+    try:
+        for path in paths:
+            renderer.render(data, path, title=title)
+    finally:
+        if own_renderer:
+            renderer.close()
+
+
+def get_relative_freq_table(mode: str, n: int, store=None):
+    # Only the needed counts are asked from the store
+    # (for the SQLite store these are indexed queries),
+    # and wiki-language frequencies come from the cached lookup table.
+    # Returns a `DataFrame`.
+    from pandas import DataFrame, Series
+    from wordfreq import top_n_list
+    from wiki_scraper.freq_table import get_frequency_table
+
+    store = WordCountStore() if store is None else store
+
+    total = store.total()
     if total == 0:
         total = 1
 
-    for word, count in word_counts.items():
-        word_counts[word] = count / total
-
     if mode == "article":
         df = DataFrame(
-            list(word_counts.items()),
+            store.top(n),
             columns=["word", "frequency in the article"]
         )
+        df["frequency in the article"] = \
+            df["frequency in the article"].to_numpy(dtype=float) / total
 
-        df_sorted = df.sort_values(
-            by="frequency in the article",
-            ascending=False
-        ).head(n)
-
-        df_sorted["frequency in the wiki language"] = df_sorted["word"].apply(
-            lambda w: word_frequency(w, "en")
-        )
+        df["frequency in the wiki language"] = \
+            get_frequency_table("en").lookup(df["word"])
 
-        return df_sorted.reset_index(drop=True)
+        return df.reset_index(drop=True)
     elif mode == "language":
         top_words = top_n_list("en", n)
+        word_counts = Series(store.lookup(top_words), dtype="int64")
 
         df = DataFrame({"word": top_words})
-        df["frequency in the wiki language"] = df["word"].apply(
-            lambda w: word_frequency(w, "en")
-        )
+        df["frequency in the wiki language"] = \
+            get_frequency_table("en").lookup(top_words)
 
-        df["frequency in the article"] = df["word"].apply(
-            lambda w: word_counts.get(w, 0)
-        )
+        df["frequency in the article"] = word_counts.reindex(
+            top_words, fill_value=0
+        ).to_numpy(dtype=float) / total
 
         return df.reset_index(drop=True)
     else:
@@ -96,49 +349,109 @@ def get_relative_freq_table(mode: str, n: int) -> DataFrame:
         return DataFrame()
 
 
-def auto_count_words(start_phrase: str, depth: int, wait: float):
+def auto_count_words(start_phrase: str, depth: int, wait: float,
+                     base_url=BULBAPEDIA_URL, session=None,
+                     cache=None, store=None, checkpoint=None,
+                     fetch_mode="html", resolve_titles=False,
+                     max_rate=DEFAULT_MAX_RATE) -> dict[str, int]:
+    from wiki_scraper.frontier import Frontier
+    from wiki_scraper.mediawiki import TitleResolver
     from wiki_scraper.scraper import Scraper
+    from wiki_scraper.session import get_default_pool
+
+    # One pooled session for the whole crawl, so connections are reused
+    session = get_default_pool() if session is None else session
+    # One store for the whole crawl, so counts are written in batches
+    own_store = store is None
+    store = WordCountStore() if own_store else store
+    # `wait` is the starting gap between requests; it adapts to the
+    # server, and pages served from the cache don't wait at all
+    limiter = AdaptiveRateLimiter(interval=wait, max_rate=max_rate)
+
+    # With `resolve_titles`, links are replaced by canonical titles
+    # of their articles (asking the API about 50 titles at once),
+    # so redirects to one article are crawled once.
+    resolver = (TitleResolver(base_url, session, headers=Scraper.headers,
+                              limiter=limiter)
+                if resolve_titles else None)
 
     start_phrase = format_phrase(start_phrase)
-    begin_url = get_url_from_phrase(start_phrase)
-
-    visited = set()
-    to_visit = [(begin_url, 0)]
-
-    while len(to_visit) > 0:
-        current_url, current_depth = to_visit.pop(0)
-
-        if (current_url in visited) or (current_depth > depth) \
-                or (not current_url.startswith(BULBAPEDIA_URL)):
-            continue
-
-        visited.add(current_url)
-
-        scraper = Scraper(phrase=get_phrase_from_url(current_url))
-
-        article = scraper.scrape()
+    begin_url = get_url_from_phrase(start_phrase, base_url=base_url)
+    if resolver is not None:
+        begin_url = next(iter(resolver.canonical_urls([begin_url])),
+                         begin_url)
+
+    # Links are deduplicated when they are queued, so the frontier
+    # holds every page at most once
+    to_visit = Frontier(base_url=base_url, max_depth=depth)
+    if checkpoint is None:
+        to_visit.push(begin_url, 0)
+    else:
+        checkpoint.begin(to_visit, store, begin_url, depth, base_url)
+
+    # page taken from the frontier but not committed yet
+    current = None
+    try:
+        while len(to_visit) > 0:
+            current = to_visit.pop()
+            current_url, current_depth = current
+
+            phrase = get_phrase_from_url(current_url, base_url=base_url)
+            scraper = Scraper(
+                phrase=phrase,
+                base_url=base_url,
+                session=session,
+                cache=cache,
+                fetch_mode=fetch_mode,
+                limiter=limiter
+            )
+
+            article = scraper.scrape()
+
+            # links need the full tree, which `count_words` then reuses
+            links = article.get_wiki_links()
+            word_counts = article.count_words()
+            update_word_counts(word_counts, store=store, article=phrase)
+
+            # This prefix is already in `base_url`
+            urls = [get_url_from_phrase(href, base_url=base_url)
+                    for href in links]
+            if resolver is not None and current_depth < depth:
+                urls = resolver.canonical_urls(urls, seen=to_visit.seen)
+            for full_url in urls:
+                to_visit.push(full_url, current_depth + 1)
+            current = None
+
+            if checkpoint is not None:
+                checkpoint.page_done(to_visit, store)
+    except BaseException as e:
+        # the unfinished page is retried on `--resume` (unless missing)
+        if checkpoint is not None:
+            checkpoint.stop(to_visit, store, e, current=current)
+        raise
+    else:
+        if checkpoint is not None:
+            checkpoint.finish(store)
+    finally:
+        to_visit.close()
+        # counts of pages visited so far are kept even if the crawl fails
+        if own_store:
+            store.close()
 
-        word_counts = article.count_words()
-        update_word_counts(word_counts)
+    return session.stats()
 
-        if article.container is not None:
-            for link in article.container.find_all("a", href=True):
-                href = link['href']
-                if href.startswith("/wiki/") and ':' not in href:
-                    # This prefix is already in `BULBAPEDIA_URL`
-                    full_url = get_url_from_phrase(href)
-                    to_visit.append((full_url, current_depth + 1))
 
-        time.sleep(wait)
+def format_stats(stats: dict[str, int]) -> str:
+    return ", ".join(f"{name}: {value}" for name, value in stats.items())
 
 
-def get_url_from_phrase(phrase: str) -> str:
+def get_url_from_phrase(phrase: str, base_url=BULBAPEDIA_URL) -> str:
     phrase = phrase.removeprefix("/wiki/")
-    return BULBAPEDIA_URL + phrase
+    return base_url + phrase
 
 
-def get_phrase_from_url(url: str) -> str:
-    return url.removeprefix(BULBAPEDIA_URL).removeprefix("/wiki/")
+def get_phrase_from_url(url: str, base_url=BULBAPEDIA_URL) -> str:
+    return url.removeprefix(base_url).removeprefix("/wiki/")
 
 
 def format_phrase(phrase: str) -> str | None:
@@ -147,3 +460,22 @@ def format_phrase(phrase: str) -> str | None:
 
     phrase = phrase[0].upper() + phrase[1:]
     return phrase.replace(" ", "_")
+
+
+def atomic_write(path: Path, data: bytes):
+    # Writes to a temporary file first, so readers never see half a file.
+    # `mkstemp` makes it private (0600), so it gets the mode of the file
+    # it replaces, or the one `open` would give a new file.
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            mode = 0o666 & ~_UMASK
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
@@ -0,0 +1,180 @@
+# Module containing implementation of class `SqliteWordCountStore`.
+# It is an optional SQLite backend of the word-count store,
+# which remembers how many times each article contributed each word.
+# Counting an article again replaces its rows instead of adding to them.
+# It has the same interface as `utils.WordCountStore`.
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from wiki_scraper.utils import repo_root
+
+index_path = repo_root / "wiki_scraper" / "word-counts.sqlite3"
+
+# Name under which counts not assigned to any article are kept
+ANONYMOUS_ARTICLE = ""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    phrase TEXT NOT NULL UNIQUE,
+    counted_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS article_words (
+    article_id INTEGER NOT NULL REFERENCES articles (id),
+    word TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (article_id, word)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS article_words_by_word
+    ON article_words (word, article_id);
+-- totals kept up to date on every write, so that top-N queries
+-- walk an index instead of aggregating all rows
+CREATE TABLE IF NOT EXISTS word_totals (
+    word TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS word_totals_by_count
+    ON word_totals (count DESC, word);
+"""
+
+
+class SqliteWordCountStore:
+    def __init__(self, path=None, flush_every: int = 20):
+        # Writes are committed in transactions of `flush_every` articles
+        self.path = Path(index_path if path is None else path)
+        self.flush_every = flush_every
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(self.path,
+                                           check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._connection.executescript(SCHEMA)
+        self._connection.commit()
+
+        self._pending_adds = 0
+        self._lock = threading.Lock()
+
+    def add(self, counts: dict[str, int], article: str | None = None):
+        with self._lock:
+            if article is None:
+                self._add_to_article(ANONYMOUS_ARTICLE, counts)
+            else:
+                self._replace_article(article, counts)
+
+            self._pending_adds += 1
+            if self._pending_adds >= self.flush_every:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def compact(self):
+        self.flush()
+
+    def load(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._connection.execute(
+                "SELECT word, count FROM word_totals"
+            ))
+
+    def total(self) -> int:
+        with self._lock:
+            (total,) = self._connection.execute(
+                "SELECT COALESCE(SUM(count), 0) FROM word_totals"
+            ).fetchone()
+            return total
+
+    def top(self, n: int) -> list[tuple[str, int]]:
+        with self._lock:
+            return self._connection.execute(
+                "SELECT word, count FROM word_totals "
+                "ORDER BY count DESC, word LIMIT ?", (n,)
+            ).fetchall()
+
+    def lookup(self, words: list[str]) -> dict[str, int]:
+        counts = dict.fromkeys(words, 0)
+        unique = list(counts)
+        with self._lock:
+            # SQLite limits the number of parameters of one query
+            for start in range(0, len(unique), 500):
+                chunk = unique[start:start + 500]
+                marks = ", ".join("?" * len(chunk))
+                counts.update(self._connection.execute(
+                    f"SELECT word, count FROM word_totals "
+                    f"WHERE word IN ({marks})", chunk
+                ))
+        return counts
+
+    def articles_with(self, word: str) -> list[tuple[str, int]]:
+        # Articles which contributed `word`, most contributing first
+        with self._lock:
+            return self._connection.execute(
+                "SELECT a.phrase, w.count FROM article_words AS w "
+                "JOIN articles AS a ON a.id = w.article_id "
+                "WHERE w.word = ? ORDER BY w.count DESC, a.phrase", (word,)
+            ).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _flush(self):
+        self._connection.commit()
+        self._pending_adds = 0
+
+    def _article_id(self, phrase: str) -> int:
+        self._connection.execute(
+            "INSERT INTO articles (phrase, counted_at) VALUES (?, ?) "
+            "ON CONFLICT (phrase) "
+            "DO UPDATE SET counted_at = excluded.counted_at",
+            (phrase, time.time())
+        )
+        (article_id,) = self._connection.execute(
+            "SELECT id FROM articles WHERE phrase = ?", (phrase,)
+        ).fetchone()
+        return article_id
+
+    def _replace_article(self, phrase: str, counts: dict[str, int]):
+        article_id = self._article_id(phrase)
+        execute = self._connection.execute
+
+        # previous counts of this article are taken back from the totals
+        execute(
+            "UPDATE word_totals SET count = count - ("
+            "SELECT w.count FROM article_words AS w "
+            "WHERE w.article_id = ? AND w.word = word_totals.word) "
+            "WHERE word IN (SELECT word FROM article_words "
+            "WHERE article_id = ?)", (article_id, article_id)
+        )
+        execute("DELETE FROM word_totals WHERE count <= 0")
+        execute("DELETE FROM article_words WHERE article_id = ?",
+                (article_id,))
+
+        self._add_to_article(phrase, counts, article_id=article_id)
+
+    def _add_to_article(self, phrase: str, counts: dict[str, int],
+                        article_id: int | None = None):
+        if article_id is None:
+            article_id = self._article_id(phrase)
+
+        rows = [(article_id, word, count) for word, count in counts.items()]
+        self._connection.executemany(
+            "INSERT INTO article_words (article_id, word, count) "
+            "VALUES (?, ?, ?) ON CONFLICT (article_id, word) "
+            "DO UPDATE SET count = count + excluded.count", rows
+        )
+        self._connection.executemany(
+            "INSERT INTO word_totals (word, count) VALUES (?, ?) "
+            "ON CONFLICT (word) "
+            "DO UPDATE SET count = count + excluded.count",
+            counts.items()
+        )